@@ -1,17 +1,33 @@
 import logging
 import os
+import time
+import queue
+import asyncio
+import bisect
+import threading
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 import numpy as np
 import tensorflow as tf
-import tensorflow_hub as hub
-import librosa
-from typing import Tuple
+from config import MODEL_STORE_DIR, INFERENCE_MAX_BATCH_SIZE, INFERENCE_SHAPE_BUCKET_GROWTH
+from resampler import resample_many
+from model_store import load_artifacts, ModelStoreError
+from metrics import STAGE, INFERENCE_BATCH_SIZE
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
 
 # --- Constants ---
 # YAMNet model constants
-YAMNET_MODEL_HANDLE = 'https://tfhub.dev/google/yamnet/1'
 YAMNET_SR = 16000
 YAMNET_MONO = True
 
+# YAMNet frames the 16 kHz waveform into 0.96 s patches (15600 samples incl. STFT window)
+# with a 0.48 s hop. Batched inference relies on this to keep patches from different
+# requests apart when their waveforms are concatenated into a single YAMNet call.
+YAMNET_PATCH_SAMPLES = 15600
+YAMNET_HOP_SAMPLES = 7680
+
 # V2 model input specifications
 MAX_STEPS = 20
 EMBEDDING_SIZE = 1024
@@ -23,88 +39,424 @@ logger = logging.getLogger(__name__)
 _model_v2 = None
 _class_names_v2 = None
 _yamnet_model = None
+_classifier_backend = None
+_model_info = {}
+
+# --- Classifier Backends ---
+class ClassifierBackend:
+    """
+    Runs the V2 classifier on a batch: (B, MAX_STEPS, 1024) audio + (B, 4) vibration
+    -> (B, num_classes) probabilities. All engines share this contract.
+    """
+    name = "base"
+
+    def predict(self, audio_batch: np.ndarray, vibe_batch: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+class KerasBackend(ClassifierBackend):
+    """
+    Plain tf.keras.Model.predict (original behaviour).
+    """
+    name = "keras"
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, audio_batch: np.ndarray, vibe_batch: np.ndarray) -> np.ndarray:
+        return self.model.predict([audio_batch, vibe_batch], verbose=0)
+
+class TFFunctionBackend(ClassifierBackend):
+    """
+    Calls the model through a tf.function with a fixed input signature, so it is traced
+    once and skips Model.predict's per-call data-adapter overhead. Optionally XLA-compiled.
+    """
+    name = "tf_function"
+
+    def __init__(self, model, xla: bool = False):
+        self.model = model
+        self.xla = xla
+        self._fn = tf.function(
+            lambda audio, vibe: model([audio, vibe], training=False),
+            input_signature=[
+                tf.TensorSpec(shape=[None, MAX_STEPS, EMBEDDING_SIZE], dtype=tf.float32),
+                tf.TensorSpec(shape=[None, 4], dtype=tf.float32),
+            ],
+            jit_compile=xla,
+        )
+
+    def predict(self, audio_batch: np.ndarray, vibe_batch: np.ndarray) -> np.ndarray:
+        return self._fn(tf.constant(audio_batch), tf.constant(vibe_batch)).numpy()
+
+class TFLiteBackend(ClassifierBackend):
+    """
+    TFLite interpreter path. Uses a pre-converted .tflite file when available, otherwise
+    converts the Keras model in memory at load time. Interpreters are not thread-safe,
+    so each inference worker thread gets its own, one per batch size.
+    """
+    name = "tflite"
+
+    def __init__(self, model=None, tflite_path: str = None):
+        if tflite_path and os.path.exists(tflite_path):
+            with open(tflite_path, "rb") as f:
+                self._content = f.read()
+        elif model is not None:
+            converter = tf.lite.TFLiteConverter.from_keras_model(model)
+            converter.target_spec.supported_ops = [
+                tf.lite.OpsSet.TFLITE_BUILTINS,
+                tf.lite.OpsSet.SELECT_TF_OPS,
+            ]
+            self._content = converter.convert()
+        else:
+            raise ValueError("TFLiteBackend needs a model or an existing tflite_path")
+        self._local = threading.local()
+
+    def _interpreter(self, batch_size: int):
+        """
+        This thread's interpreter for `batch_size`, created and allocated on first use.
+        Each batch size keeps its own interpreter, so alternating between warmed-up
+        sizes never resizes or reallocates tensors.
+        """
+        interpreters = getattr(self._local, "interpreters", None)
+        if interpreters is None:
+            interpreters = self._local.interpreters = {}
+        state = interpreters.get(batch_size)
+        if state is None:
+            state = SimpleNamespace(interpreter=tf.lite.Interpreter(model_content=self._content))
+            # Identify inputs by their last dimension (1024 = audio, 4 = vibration)
+            details = state.interpreter.get_input_details()
+            state.audio_idx = next(d["index"] for d in details if d["shape"][-1] == EMBEDDING_SIZE)
+            state.vibe_idx = next(d["index"] for d in details if d["shape"][-1] == 4)
+            state.output_idx = state.interpreter.get_output_details()[0]["index"]
+            state.interpreter.resize_tensor_input(state.audio_idx, [batch_size, MAX_STEPS, EMBEDDING_SIZE])
+            state.interpreter.resize_tensor_input(state.vibe_idx, [batch_size, 4])
+            state.interpreter.allocate_tensors()
+            interpreters[batch_size] = state
+        return state
+
+    def predict(self, audio_batch: np.ndarray, vibe_batch: np.ndarray) -> np.ndarray:
+        state = self._interpreter(audio_batch.shape[0])
+        interpreter = state.interpreter
+        interpreter.set_tensor(state.audio_idx, audio_batch)
+        interpreter.set_tensor(state.vibe_idx, vibe_batch)
+        interpreter.invoke()
+        return interpreter.get_tensor(state.output_idx).copy()
+
+CLASSIFIER_BACKENDS = ("keras", "tf_function", "tflite")
+
+def create_classifier_backend(name: str, model, xla: bool = False, tflite_path: str = None) -> ClassifierBackend:
+    """
+    Builds the classifier engine selected by name (see CLASSIFIER_BACKENDS).
+    """
+    if name == "keras":
+        return KerasBackend(model)
+    if name == "tf_function":
+        return TFFunctionBackend(model, xla=xla)
+    if name == "tflite":
+        return TFLiteBackend(model, tflite_path=tflite_path)
+    raise ValueError(f"Unknown inference backend '{name}'. Expected one of {CLASSIFIER_BACKENDS}")
 
 def load_ai_model_v2(
-    model_path: str = "models/noise_classification_v2.keras",
-    class_names_path: str = "models/classes_v2.npy"
+    store_dir: str = MODEL_STORE_DIR,
+    backend: str = "keras",
+    xla: bool = False,
+    tflite_path: str = None
 ) -> bool:
     """
-    Loads and caches the V2 classification model, class names, and the YAMNet model.
+    Loads and caches the V2 classification model, class names, and the YAMNet model
+    from the local model store (no network access), and builds the classifier backend
+    (`backend`: "keras", "tf_function" or "tflite").
     """
-    global _model_v2, _class_names_v2, _yamnet_model
+    global _model_v2, _class_names_v2, _yamnet_model, _classifier_backend, _model_info
     
-    if all([_model_v2 is not None, _class_names_v2 is not None, _yamnet_model is not None]):
+    if all([_model_v2 is not None, _class_names_v2 is not None, _yamnet_model is not None, _classifier_backend is not None]):
         return True
 
     try:
-        logger.info("Loading AI model V2, class names, and YAMNet model...")
-        
-        # Load custom trained V2 model
-        if os.path.exists(model_path):
-            _model_v2 = tf.keras.models.load_model(model_path)
-        else:
-            logger.error(f"Model file not found at {model_path}")
-            return False
-            
-        # Load class names
-        if os.path.exists(class_names_path):
-            _class_names_v2 = np.load(class_names_path, allow_pickle=True)
-        else:
-            logger.error(f"Class names file not found at {class_names_path}")
-            return False
-            
-        # Load YAMNet from TFHub
-        _yamnet_model = hub.load(YAMNET_MODEL_HANDLE)
-        
-        logger.info("✅ Successfully loaded all V2 model assets.")
+        logger.info(f"Loading AI model V2, class names, and YAMNet model from {store_dir}...")
+        artifacts = load_artifacts(store_dir)
+        _model_v2 = artifacts["classifier"]
+        _class_names_v2 = artifacts["class_names"]
+        _yamnet_model = artifacts["yamnet"]
+
+        t0 = time.perf_counter()
+        _classifier_backend = create_classifier_backend(backend, _model_v2, xla=xla, tflite_path=tflite_path)
+        artifacts["load_seconds"]["backend"] = round(time.perf_counter() - t0, 3)
+
+        _model_info = {
+            "backend": _classifier_backend.name,
+            "xla": xla,
+            "versions": artifacts["versions"],
+            "load_seconds": artifacts["load_seconds"],
+        }
+        logger.info(f"✅ Successfully loaded all V2 model assets: {_model_info}")
         return True
+    except ModelStoreError as e:
+        logger.error(f"❌ Model store error: {e}")
+        _model_v2, _class_names_v2, _yamnet_model, _classifier_backend = None, None, None, None
+        return False
     except Exception as e:
         logger.exception(f"❌ Critical error loading V2 model assets: {e}")
-        _model_v2, _class_names_v2, _yamnet_model = None, None, None
+        _model_v2, _class_names_v2, _yamnet_model, _classifier_backend = None, None, None, None
         return False
-def preprocess_audio_for_v2(audio_data: np.ndarray, sr: int) -> np.ndarray:
+
+def get_model_info() -> dict:
     """
-    Preprocesses audio data: Resample to 16kHz -> YAMNet -> Embeddings -> Pad/Crop
-    Returns: (1, MAX_STEPS, 1024) tensor or None on failure.
+    Backend, artifact versions and per-artifact load times of the loaded models.
+    """
+    return dict(_model_info)
+
+def _pad_embeddings(embeddings_np: np.ndarray) -> np.ndarray:
+    """
+    Pads or truncates YAMNet embeddings (N, 1024) to (MAX_STEPS, 1024).
+    """
+    padded = np.zeros((MAX_STEPS, EMBEDDING_SIZE), dtype=np.float32)
+    steps = min(MAX_STEPS, embeddings_np.shape[0])
+    padded[:steps] = embeddings_np[:steps]
+    return padded
+
+def _vibration_features(vibration_z: list) -> np.ndarray:
     """
+    Statistical vibration features (Mean, Std, Max, RMS) with shape (4,).
+    """
+    vibe_np = np.asarray(vibration_z)
+
+    if vibe_np.size == 0:
+        # Handle empty vibration data gracefully (e.g., zeros)
+        return np.zeros(4)
+
+    mean_val = np.mean(vibe_np)
+    std_val = np.std(vibe_np)
+    max_val = np.max(vibe_np)
+    rms_val = np.sqrt(np.mean(vibe_np**2))
+    return np.array([mean_val, std_val, max_val, rms_val])
+
+def _yamnet_patch_count(num_samples: int) -> int:
+    """
+    Number of patches YAMNet produces for a waveform of `num_samples` (16 kHz).
+    """
+    extra = max(0, num_samples - YAMNET_PATCH_SAMPLES)
+    return 1 + int(np.ceil(extra / YAMNET_HOP_SAMPLES))
+
+def _yamnet_slot_samples(n_patches: int) -> int:
+    """
+    Shortest hop-aligned length that holds `n_patches` YAMNet patches.
+    """
+    needed = YAMNET_PATCH_SAMPLES + (n_patches - 1) * YAMNET_HOP_SAMPLES
+    return int(np.ceil(needed / YAMNET_HOP_SAMPLES)) * YAMNET_HOP_SAMPLES
+
+def _geometric_buckets(first: int, limit: int, growth: float) -> Tuple[int, ...]:
+    """
+    Increasing sizes starting at `first`, each at least `growth` times the previous,
+    ending with the first size >= `limit`.
+    """
+    sizes = [first]
+    while sizes[-1] < limit:
+        sizes.append(max(sizes[-1] + 1, int(np.ceil(sizes[-1] * growth))))
+    return tuple(sizes)
+
+def _bucket(size: int, buckets: Tuple[int, ...]) -> int:
+    """
+    Smallest bucket >= size, or size itself when it exceeds every bucket.
+    """
+    i = bisect.bisect_left(buckets, size)
+    return buckets[i] if i < len(buckets) else size
+
+# --- Shape Buckets ---
+# Waveforms are cropped to the samples that yield MAX_STEPS patches (later embeddings are
+# discarded by _pad_embeddings anyway), and each YAMNet call is zero-padded to one of a few
+# lengths. Classifier batches are padded to power-of-two sizes. Both sets are run once at
+# startup (InferenceScheduler.warm_up), so live packets never meet a new input shape.
+YAMNET_MAX_SAMPLES = YAMNET_PATCH_SAMPLES + (MAX_STEPS - 1) * YAMNET_HOP_SAMPLES
+YAMNET_LENGTH_BUCKETS = tuple(hops * YAMNET_HOP_SAMPLES for hops in _geometric_buckets(
+    _yamnet_slot_samples(1) // YAMNET_HOP_SAMPLES,
+    INFERENCE_MAX_BATCH_SIZE * _yamnet_slot_samples(MAX_STEPS) // YAMNET_HOP_SAMPLES,
+    INFERENCE_SHAPE_BUCKET_GROWTH,
+))
+CLASSIFIER_BATCH_BUCKETS = _geometric_buckets(1, INFERENCE_MAX_BATCH_SIZE, 2.0)
+
+def _yamnet_embed_batch(waveforms: List[np.ndarray]) -> List[np.ndarray]:
+    """
+    Runs YAMNet once over several 16 kHz waveforms.
+
+    Each waveform is cropped to YAMNET_MAX_SAMPLES and zero-padded into a slot whose length
+    is a multiple of the patch hop, so every slot starts on a patch boundary. Patches that
+    lie entirely inside a slot are identical to what a standalone YAMNet call would produce
+    for that waveform; patches straddling two slots are discarded. The concatenated input
+    is zero-padded to the next YAMNET_LENGTH_BUCKETS entry and the trailing patches dropped.
+
+    Returns:
+        list: One (N_i, 1024) embedding array per input waveform (N_i <= MAX_STEPS).
+    """
+    layout = []  # (sample offset, waveform, number of patches) per waveform
+    offset = 0
+    for wf in waveforms:
+        wf = np.asarray(wf, dtype=np.float32).reshape(-1)[:YAMNET_MAX_SAMPLES]
+        n_patches = _yamnet_patch_count(wf.size)
+        layout.append((offset, wf, n_patches))
+        offset += _yamnet_slot_samples(n_patches)
+
+    signal = np.zeros(_bucket(offset, YAMNET_LENGTH_BUCKETS), dtype=np.float32)
+    for start, wf, _ in layout:
+        signal[start:start + wf.size] = wf
+
+    _, embeddings, _ = _yamnet_model(tf.convert_to_tensor(signal))
+    embeddings_np = embeddings.numpy()
+    return [embeddings_np[start // YAMNET_HOP_SAMPLES:start // YAMNET_HOP_SAMPLES + count]
+            for start, _, count in layout]
+
+@dataclass
+class FeatureBundle:
+    """
+    Features derived once from one raw sensor packet and shared by every later stage
+    (classification, signature extraction, reporting).
+
+    Attributes:
+        raw_audio: Packet audio samples as received (float32)
+        sr: Original sampling rate of raw_audio
+        vibration_z: Z-axis acceleration values (float)
+        vibration_features: (4,) Mean, Std, Max, RMS of vibration_z
+        waveform: raw_audio resampled to 16 kHz, or None if resampling failed
+        embeddings: (N, 1024) YAMNet embeddings (N <= MAX_STEPS), or None before/without YAMNet
+        tensor: (MAX_STEPS, 1024) padded classifier input, or None
+    """
+    raw_audio: np.ndarray
+    sr: int
+    vibration_z: np.ndarray
+    vibration_features: np.ndarray
+    waveform: Optional[np.ndarray] = None
+    embeddings: Optional[np.ndarray] = None
+    tensor: Optional[np.ndarray] = None
+
+    @property
+    def vibration_max(self) -> float:
+        """Pure shock: peak |z| after removing the 1.0g gravity component."""
+        return float(np.max(np.abs(self.vibration_z - 1.0))) if self.vibration_z.size > 0 else 0.0
+
+    def signature(self, length: int = 300) -> List[float]:
+        """Downsampled raw waveform for dashboards and reports."""
+        if self.raw_audio.size > length:
+            indices = np.linspace(0, self.raw_audio.size - 1, length).astype(int)
+            return self.raw_audio[indices].tolist()
+        return self.raw_audio.tolist()
+
+def _new_bundle(audio_data: np.ndarray, sr: int, vibration_z: list) -> FeatureBundle:
+    """
+    Builds a bundle with everything except the resampled waveform and YAMNet outputs.
+    """
+    raw = np.asarray(audio_data, dtype=np.float32).reshape(-1)
+    vibe = np.asarray(vibration_z, dtype=np.float64).reshape(-1)
+    return FeatureBundle(raw_audio=raw, sr=sr, vibration_z=vibe, vibration_features=_vibration_features(vibe))
+
+def _failed_bundle(sr: int) -> FeatureBundle:
+    """
+    Placeholder for a packet whose audio or vibration data could not be converted.
+    """
+    empty = np.zeros(0, dtype=np.float32)
+    return FeatureBundle(raw_audio=empty, sr=sr, vibration_z=np.zeros(0), vibration_features=np.zeros(4))
+
+def extract_features_batch(items: List[Tuple[np.ndarray, int, list]]) -> List[FeatureBundle]:
+    """
+    Turns raw packets into feature bundles with a single YAMNet pass.
+
+    Args:
+        items: List of (audio_data, sr, vibration_z) tuples.
+
+    Returns:
+        list: One FeatureBundle per item, in input order. Bundles whose audio or vibration
+              data could not be processed have tensor=None; the others are unaffected.
+    """
+    bundles = []
+    usable = []
+    for i, (audio_data, sr, vibration_z) in enumerate(items):
+        try:
+            bundles.append(_new_bundle(audio_data, sr, vibration_z))
+            usable.append(bundles[-1])
+        except (TypeError, ValueError) as e:
+            logger.error(f"Invalid sensor data in batch item {i}: {e}")
+            bundles.append(_failed_bundle(sr))
+
+    # 1. Resample to 16000 Hz (cached polyphase kernels, batched per (sr, length));
+    # a waveform that fails comes back as None and only its bundle goes without features
+    with STAGE["resample"].time():
+        waveforms = resample_many([b.raw_audio for b in usable], [b.sr for b in usable], YAMNET_SR)
+    for bundle, waveform in zip(usable, waveforms):
+        bundle.waveform = waveform
+    resampled = [b for b in usable if b.waveform is not None]
+    if not resampled:
+        return bundles
+
     if _yamnet_model is None:
         logger.error("YAMNet model is not loaded.")
-        return None
+        return bundles
 
     try:
-        # 1. Resample to 16000 Hz if necessary
-        if sr != YAMNET_SR:
-            resampled_audio = librosa.resample(audio_data, orig_sr=sr, target_sr=YAMNET_SR)
-        else:
-            resampled_audio = audio_data
+        with STAGE["yamnet"].time():
+            embeddings = _yamnet_embed_batch([b.waveform for b in resampled])
+        for bundle, emb in zip(resampled, embeddings):
+            bundle.embeddings = emb
+            bundle.tensor = _pad_embeddings(emb)
+    except Exception as e:
+        logger.error(f"Error in audio preprocessing: {e}")
+    return bundles
 
-        # [핵심 수정] 2. YAMNet 모델은 무조건 1차원 데이터만 받습니다. 
-        # 혹시 모를 차원을 완전히 펴서(flatten) 전달합니다.
-        waveform = tf.convert_to_tensor(resampled_audio, dtype=tf.float32)
-        waveform = tf.reshape(waveform, [-1]) # [None] 형태로 강제 변환
+def extract_features(audio_data: np.ndarray, sr: int, vibration_z: list) -> FeatureBundle:
+    """
+    Single-packet variant of extract_features_batch.
+    """
+    return extract_features_batch([(audio_data, sr, vibration_z)])[0]
 
-        # scores, embeddings, spectrogram = model(waveform)
-        _, embeddings, _ = _yamnet_model(waveform)
-        
-        # embeddings shape: (N, 1024)
-        embeddings_np = embeddings.numpy()
-        
-        # 3. Pad or Truncate to MAX_STEPS (5 steps)
-        current_steps = embeddings_np.shape[0]
-        
-        if current_steps < MAX_STEPS:
-            padding = np.zeros((MAX_STEPS - current_steps, EMBEDDING_SIZE))
-            processed_embeddings = np.vstack([embeddings_np, padding]) if current_steps > 0 else padding
-        else:
-            processed_embeddings = embeddings_np[:MAX_STEPS, :]
-            
-        # 4. Add Batch Dimension: (1, 5, 1024)
-        return np.expand_dims(processed_embeddings, axis=0)
+def classify_features(bundles: List[FeatureBundle]) -> List[Tuple[str, float]]:
+    """
+    Runs the V2 classifier once over all bundles that have a classifier input.
+
+    Returns:
+        list: (Predicted Class Name, Probability) per bundle; ("Error", 0.0) for
+              bundles without a tensor or when inference fails.
+    """
+    results = [("Error", 0.0)] * len(bundles)
+    if _classifier_backend is None:
+        logger.error("V2 Model is not loaded.")
+        return results
+
+    valid = [i for i, b in enumerate(bundles) if b.tensor is not None]
+    if not valid:
+        return results
+
+    try:
+        # Zero rows pad the batch to a warmed-up size; their predictions are ignored
+        size = _bucket(len(valid), CLASSIFIER_BATCH_BUCKETS)
+        audio_batch = np.zeros((size, MAX_STEPS, EMBEDDING_SIZE), dtype=np.float32)
+        vibe_batch = np.zeros((size, 4), dtype=np.float32)
+        for row, i in enumerate(valid):
+            audio_batch[row] = bundles[i].tensor
+            vibe_batch[row] = bundles[i].vibration_features
 
+        # Model expects two inputs: [audio_input, vibration_input]
+        with STAGE["classifier"].time():
+            predictions = _classifier_backend.predict(audio_batch, vibe_batch)
+
+        for row, i in enumerate(valid):
+            predicted_index = int(np.argmax(predictions[row]))
+            predicted_prob = float(predictions[row][predicted_index])
+            if _class_names_v2 is not None:
+                result_label = _class_names_v2[predicted_index]
+            else:
+                result_label = f"Class {predicted_index}"
+            results[i] = (result_label, predicted_prob)
     except Exception as e:
-        # 이 로그가 찍혔던 이유를 잡았습니다!
-        logger.error(f"Error in audio preprocessing: {e}")
+        logger.exception(f"Error during V2 inference: {e}")
+
+    return results
+
+def preprocess_audio_for_v2(audio_data: np.ndarray, sr: int) -> np.ndarray:
+    """
+    Preprocesses audio data: Resample to 16kHz -> YAMNet -> Embeddings -> Pad/Crop
+    Returns: (1, MAX_STEPS, 1024) tensor or None on failure.
+    """
+    bundle = extract_features(audio_data, sr, [])
+    if bundle.tensor is None:
         return None
+    return np.expand_dims(bundle.tensor, axis=0)
 
 def predict_noise_v2(audio_data: np.ndarray, sr: int, vibration_z: list) -> Tuple[str, float]:
     """
@@ -118,51 +470,286 @@ def predict_noise_v2(audio_data: np.ndarray, sr: int, vibration_z: list) -> Tupl
     Returns:
         (Predicted Class Name, Probability)
     """
-    if _model_v2 is None:
-        logger.error("V2 Model is not loaded.")
-        return "Error", 0.0
+    return classify_features([extract_features(audio_data, sr, vibration_z)])[0]
 
-    # 1. Process Audio
-    audio_input = preprocess_audio_for_v2(audio_data, sr)
-    if audio_input is None:
-        return "Error", 0.0
+def predict_noise_v2_batch(items: List[Tuple[np.ndarray, int, list]]) -> List[Tuple[str, float]]:
+    """
+    Batched variant of predict_noise_v2: one YAMNet pass and one classifier call
+    for all requests.
 
-    # 2. Process Vibration
-    # Calculate statistical features: Mean, Std, Max, RMS
-    try:
-        vibe_np = np.array(vibration_z)
-        
-        if vibe_np.size == 0:
-            # Handle empty vibration data gracefully (e.g., zeros)
-            vibe_features = np.zeros((1, 4))
-        else:
-            mean_val = np.mean(vibe_np)
-            std_val = np.std(vibe_np)
-            max_val = np.max(vibe_np)
-            rms_val = np.sqrt(np.mean(vibe_np**2))
-            
-            # Shape: (1, 4)
-            vibe_features = np.array([[mean_val, std_val, max_val, rms_val]])
-    except Exception as e:
-        logger.error(f"Error processing vibration data: {e}")
-        return "Error", 0.0
+    Args:
+        items: List of (audio_data, sr, vibration_z) tuples.
 
-    # 3. Predict
-    try:
-        # Model expects a list of inputs: [audio_input, vibration_input]
-        predictions = _model_v2.predict([audio_input, vibe_features], verbose=0)
-        
-        # predictions shape: (1, num_classes)
-        predicted_index = np.argmax(predictions[0])
-        predicted_prob = float(predictions[0][predicted_index])
-        
-        if _class_names_v2 is not None:
-            result_label = _class_names_v2[predicted_index]
-        else:
-            result_label = f"Class {predicted_index}"
-            
-        return result_label, predicted_prob
+    Returns:
+        list: (Predicted Class Name, Probability) per request, in input order.
+    """
+    return classify_features(extract_features_batch(items))
 
-    except Exception as e:
-        logger.exception(f"Error during V2 inference: {e}")
-        return "Error", 0.0
+def analyze_batch(items: List[Tuple[np.ndarray, int, list]]) -> List[Tuple[FeatureBundle, str, float]]:
+    """
+    Feature extraction plus classification, keeping each bundle for later stages.
+    """
+    bundles = extract_features_batch(items)
+    return [(bundle, label, prob) for bundle, (label, prob) in zip(bundles, classify_features(bundles))]
+
+def warm_up_models(yamnet: bool = True) -> dict:
+    """
+    Runs YAMNet on silence for every YAMNET_LENGTH_BUCKETS entry (if `yamnet`) and the
+    classifier on zeros for every CLASSIFIER_BATCH_BUCKETS entry, on the calling thread.
+
+    Returns:
+        dict: {"yamnet": {length: seconds}, "classifier": {batch size: seconds}}
+
+    Raises:
+        RuntimeError: If the models are not loaded.
+    """
+    if _yamnet_model is None or _classifier_backend is None:
+        raise RuntimeError("V2 models are not loaded")
+    timings = {"yamnet": {}, "classifier": {}}
+    if yamnet:
+        for length in YAMNET_LENGTH_BUCKETS:
+            t0 = time.perf_counter()
+            _yamnet_model(tf.zeros([length], dtype=tf.float32))
+            timings["yamnet"][length] = round(time.perf_counter() - t0, 3)
+    for size in CLASSIFIER_BATCH_BUCKETS:
+        t0 = time.perf_counter()
+        _classifier_backend.predict(np.zeros((size, MAX_STEPS, EMBEDDING_SIZE), dtype=np.float32),
+                                    np.zeros((size, 4), dtype=np.float32))
+        timings["classifier"][size] = round(time.perf_counter() - t0, 3)
+    return timings
+
+class InferenceOverloadedError(RuntimeError):
+    """
+    Raised when the inference queue is full and a request cannot be accepted.
+    """
+
+class InferenceScheduler:
+    """
+    Micro-batching scheduler for V2 inference.
+
+    Requests submitted within `window_ms` of the first queued request (or until
+    `max_batch_size` is reached) are run together through analyze_batch.
+    Batches execute on a bounded pool of `num_workers` threads, all sharing the
+    models loaded in this process; while every worker is busy, new requests keep
+    accumulating into the next batch. At most `max_queue_size` requests may wait,
+    after which submit() raises InferenceOverloadedError instead of blocking.
+    The scheduler reports `ready` once warm_up() has run every shape bucket.
+    """
+
+    def __init__(self, window_ms: float = 10.0, max_batch_size: int = 16, num_workers: int = 2,
+                 max_queue_size: int = 256, stats_window: int = 1000):
+        self.window_s = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self._queue: "queue.Queue" = queue.Queue()
+        self._executor = None
+        self._free_workers = threading.Semaphore(num_workers)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+        self._queue_waits = deque(maxlen=stats_window)
+        self._total_requests = 0
+        self._total_batches = 0
+        self._rejected = 0
+        self._busy_workers = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+        self._warm_up = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._started_at = time.perf_counter()
+        self._executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="inference-worker")
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Inference scheduler started (window={self.window_s * 1000:.1f}ms, max_batch={self.max_batch_size}, "
+            f"workers={self.num_workers}, max_queue={self.max_queue_size})"
+        )
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def warm_up(self) -> dict:
+        """
+        Runs every shape bucket through the models on each worker thread (TFLite keeps
+        one interpreter per thread and batch size); YAMNet buckets run once, on the first worker.
+        Blocks until done. The warm-up tasks are queued on the worker pool ahead of any
+        batch submitted meanwhile, so requests that arrive wait for it instead of racing it.
+
+        Returns:
+            dict: {"seconds", "workers": [per-worker warm_up_models() timings]}
+
+        Raises:
+            RuntimeError: If the scheduler is not running or the models are not loaded.
+        """
+        if not self._running:
+            raise RuntimeError("Inference scheduler is not running")
+        started = time.perf_counter()
+        # Each task waits for the others, so every worker thread gets exactly one
+        barrier = threading.Barrier(self.num_workers)
+
+        def work(index: int) -> dict:
+            barrier.wait()
+            return warm_up_models(yamnet=index == 0)
+
+        futures = [self._executor.submit(work, i) for i in range(self.num_workers)]
+        workers = [f.result() for f in futures]
+        self._warm_up = {"seconds": round(time.perf_counter() - started, 3), "workers": workers}
+        logger.info(
+            f"Inference warm-up done in {self._warm_up['seconds']}s ({len(YAMNET_LENGTH_BUCKETS)} YAMNet lengths, "
+            f"{len(CLASSIFIER_BATCH_BUCKETS)} batch sizes, {self.num_workers} workers)"
+        )
+        return self._warm_up
+
+    @property
+    def ready(self) -> bool:
+        return self._running and self._warm_up is not None
+
+    @property
+    def warm_up_info(self) -> Optional[dict]:
+        return self._warm_up
+
+    def submit(self, audio_data: np.ndarray, sr: int, vibration_z: list) -> Future:
+        """
+        Queues one request and returns a Future resolving to (FeatureBundle, label, probability).
+
+        Raises:
+            InferenceOverloadedError: If the scheduler is not running or the queue is full.
+        """
+        if not self._running:
+            raise InferenceOverloadedError("Inference scheduler is not running")
+        if self._queue.qsize() >= self.max_queue_size:
+            with self._lock:
+                self._rejected += 1
+            raise InferenceOverloadedError(f"Inference queue is full ({self.max_queue_size} pending)")
+        future = Future()
+        self._queue.put((time.perf_counter(), (audio_data, sr, vibration_z), future))
+        return future
+
+    async def analyze(self, audio_data: np.ndarray, sr: int, vibration_z: list) -> Tuple[FeatureBundle, str, float]:
+        """
+        Awaitable wrapper around submit() for use from async handlers.
+        """
+        return await asyncio.wrap_future(self.submit(audio_data, sr, vibration_z))
+
+    async def predict(self, audio_data: np.ndarray, sr: int, vibration_z: list) -> Tuple[str, float]:
+        """
+        Like analyze(), but returns only (label, probability).
+        """
+        _, label, prob = await self.analyze(audio_data, sr, vibration_z)
+        return label, prob
+
+    def _collect_batch(self, first) -> list:
+        batch = [first]
+        deadline = first[0] + self.window_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while self._running:
+            # Wait for a free worker first so requests keep batching while all are busy
+            self._free_workers.acquire()
+            first = self._queue.get()
+            if first is None:
+                self._free_workers.release()
+                break
+            batch = self._collect_batch(first)
+            self._executor.submit(self._run_batch, batch)
+
+        # Fail anything left behind so callers don't hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and not item[2].cancelled():
+                item[2].set_result((None, "Error", 0.0))
+
+    def _run_batch(self, batch: list):
+        started = time.perf_counter()
+        with self._lock:
+            self._busy_workers += 1
+        try:
+            results = analyze_batch([item[1] for item in batch])
+        except Exception as e:
+            logger.exception(f"Inference batch failed: {e}")
+            results = [(None, "Error", 0.0)] * len(batch)
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self._busy_workers -= 1
+                self._busy_seconds += finished - started
+                self._total_batches += 1
+                self._total_requests += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                INFERENCE_BATCH_SIZE.observe(len(batch))
+                for enqueued, _, _ in batch:
+                    self._queue_waits.append(started - enqueued)
+            self._free_workers.release()
+
+        for (_, _, future), result in zip(batch, results):
+            if not future.cancelled():
+                future.set_result(result)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def busy_workers(self) -> int:
+        return self._busy_workers
+
+    def stats(self) -> dict:
+        """
+        Batch-size, queue-wait, queue-depth and worker-utilisation statistics.
+        """
+        with self._lock:
+            waits_ms = np.array(self._queue_waits) * 1000.0
+            uptime = time.perf_counter() - self._started_at if self._started_at else 0.0
+            return {
+                "window_ms": self.window_s * 1000.0,
+                "max_batch_size": self.max_batch_size,
+                "ready": self.ready,
+                "warm_up_seconds": self._warm_up["seconds"] if self._warm_up else None,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_size": self.max_queue_size,
+                "rejected": self._rejected,
+                "workers": self.num_workers,
+                "busy_workers": self._busy_workers,
+                "worker_utilisation": round(self._busy_seconds / (uptime * self.num_workers), 4) if uptime else 0.0,
+                "total_requests": self._total_requests,
+                "total_batches": self._total_batches,
+                "mean_batch_size": round(self._total_requests / self._total_batches, 2) if self._total_batches else 0.0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "queue_wait_ms": {
+                    "mean": round(float(waits_ms.mean()), 3) if waits_ms.size else 0.0,
+                    "p50": round(float(np.percentile(waits_ms, 50)), 3) if waits_ms.size else 0.0,
+                    "p95": round(float(np.percentile(waits_ms, 95)), 3) if waits_ms.size else 0.0,
+                    "max": round(float(waits_ms.max()), 3) if waits_ms.size else 0.0,
+                },
+            }
@@ -0,0 +1,98 @@
+"""
+Compares per-packet notification decode time: today's path against notification_decoder.
+
+    python benchmarks/bench_decode.py [--repeat 500]
+
+For each packet length, times:
+- baseline:     json.loads(body) + json.loads(con) + np.array(sound_raw, float32)
+- list:         notification_decoder with the same `sound_raw` int list
+- pcm16_base64: notification_decoder with `sound_pcm16` (base64 int16 PCM)
+- binary:       decode_binary_packet on an application/octet-stream body
+
+Prints one JSON object with per-packet timings (ms) and body sizes, and exits
+non-zero if any decoded audio differs from the baseline.
+"""
+import argparse
+import base64
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import notification_decoder  # noqa: E402
+
+LENGTHS = [1000, 16000, 44100]
+
+def _packet(samples: np.ndarray, pcm16: bool) -> dict:
+    payload = {"vibration": {"z": [1.0] * 100}, "raw_max_amplitude": int(np.abs(samples).max())}
+    if pcm16:
+        payload["sound_pcm16"] = base64.b64encode(samples.astype("<i2").tobytes()).decode("ascii")
+    else:
+        payload["sound_raw"] = samples.tolist()
+    return {
+        "house_id": "101",
+        "timestamp": "2026-01-01T00:00:00",
+        "meta": {"sampling_rate": "16000Hz", "vibration_unit": "g", "sound_unit": "raw"},
+        "payload": payload,
+    }
+
+def _notification(packet: dict) -> bytes:
+    con = json.dumps(packet)
+    return json.dumps({"m2m:sgn": {"nev": {"rep": {"m2m:cin": {"con": con}}, "net": 3}}}).encode("utf-8")
+
+def _binary(packet: dict, samples: np.ndarray) -> bytes:
+    header = json.dumps(packet).encode("utf-8")
+    return struct.pack("<I", len(header)) + header + samples.astype("<i2").tobytes()
+
+def _baseline(body: bytes) -> np.ndarray:
+    notification = json.loads(body)
+    con = json.loads(notification["m2m:sgn"]["nev"]["rep"]["m2m:cin"]["con"])
+    return np.array(con["payload"]["sound_raw"], dtype=np.float32)
+
+def _decoder(body: bytes) -> np.ndarray:
+    packet = notification_decoder.decode_notification(body)
+    return notification_decoder.decode_sound(packet["payload"])
+
+def _time_ms(func, repeat: int) -> float:
+    func()  # warm caches
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000.0 / repeat
+
+def run(repeat: int) -> dict:
+    rng = np.random.default_rng(0)
+    results = {"json_backend": notification_decoder.JSON_BACKEND, "cases": []}
+    for n in LENGTHS:
+        samples = rng.integers(-32768, 32768, size=n).astype(np.int16)
+        list_body = _notification(_packet(samples, pcm16=False))
+        b64_body = _notification(_packet(samples, pcm16=True))
+        bin_packet = _packet(samples, pcm16=False)
+        del bin_packet["payload"]["sound_raw"]
+        bin_body = _binary(bin_packet, samples)
+
+        expected = _baseline(list_body)
+        outputs = [_decoder(list_body), _decoder(b64_body), notification_decoder.decode_binary_packet(bin_body)[1]]
+        results["cases"].append({
+            "samples": n,
+            "body_bytes": {"list": len(list_body), "pcm16_base64": len(b64_body), "binary": len(bin_body)},
+            "baseline_ms": round(_time_ms(lambda: _baseline(list_body), repeat), 4),
+            "list_ms": round(_time_ms(lambda: _decoder(list_body), repeat), 4),
+            "pcm16_base64_ms": round(_time_ms(lambda: _decoder(b64_body), repeat), 4),
+            "binary_ms": round(_time_ms(lambda: notification_decoder.decode_binary_packet(bin_body), repeat), 4),
+            "matches_baseline": all(np.array_equal(expected, out) for out in outputs),
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(c["matches_baseline"] for c in report["cases"]) else 1)
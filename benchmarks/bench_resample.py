@@ -0,0 +1,76 @@
+"""
+Compares the cached polyphase resampler against librosa.resample.
+
+    python benchmarks/bench_resample.py [--repeat 200] [--batch 16]
+
+Prints one JSON object with per-call timings (ms) for each (orig_sr, length)
+case and the relative RMS error against librosa, and exits non-zero if any
+case exceeds resampler.RESAMPLE_TOLERANCE.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import librosa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import resampler  # noqa: E402
+
+TARGET_SR = 16000
+CASES = [(22050, 1000), (22050, 22050), (44100, 1000), (44100, 44100)]
+
+def _test_signal(sr: int, n: int, rng: np.random.Generator) -> np.ndarray:
+    """Sum of random tones below 0.8 x the 16 kHz Nyquist, scaled like raw sensor ints."""
+    t = np.arange(n) / sr
+    freqs = rng.uniform(50, 0.8 * TARGET_SR / 2, size=8)
+    phases = rng.uniform(0, 2 * np.pi, size=8)
+    return (1000 * np.sin(2 * np.pi * freqs[:, None] * t + phases[:, None]).sum(axis=0)).astype(np.float32)
+
+def _time_ms(func, repeat: int) -> float:
+    func()  # warm caches
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) * 1000.0 / repeat
+
+def run(repeat: int, batch: int) -> dict:
+    rng = np.random.default_rng(0)
+    results = {"target_sr": TARGET_SR, "tolerance": resampler.RESAMPLE_TOLERANCE, "cases": []}
+    for sr, n in CASES:
+        x = _test_signal(sr, n, rng)
+        xb = np.stack([_test_signal(sr, n, rng) for _ in range(batch)])
+
+        ref = librosa.resample(x, orig_sr=sr, target_sr=TARGET_SR)
+        ours = resampler.resample(x, sr, TARGET_SR)
+        m = min(ref.size, ours.size)
+        # Ignore filter edge effects at both ends
+        edge = min(64, m // 8)
+        diff = ours[edge:m - edge] - ref[edge:m - edge]
+        rel_rms = float(np.sqrt(np.mean(diff ** 2)) / np.sqrt(np.mean(ref[edge:m - edge] ** 2)))
+
+        results["cases"].append({
+            "orig_sr": sr,
+            "samples": n,
+            "librosa_ms": round(_time_ms(lambda: librosa.resample(x, orig_sr=sr, target_sr=TARGET_SR), repeat), 4),
+            "polyphase_ms": round(_time_ms(lambda: resampler.resample(x, sr, TARGET_SR), repeat), 4),
+            "librosa_batch_ms": round(_time_ms(lambda: [librosa.resample(r, orig_sr=sr, target_sr=TARGET_SR) for r in xb], max(1, repeat // batch)), 4),
+            "polyphase_batch_ms": round(_time_ms(lambda: resampler.resample_batch(xb, sr, TARGET_SR), max(1, repeat // batch)), 4),
+            "batch": batch,
+            "output_len": {"librosa": int(ref.size), "polyphase": int(ours.size)},
+            "rel_rms_error": round(rel_rms, 6),
+            "within_tolerance": rel_rms <= resampler.RESAMPLE_TOLERANCE,
+        })
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=16)
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.batch)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(c["within_tolerance"] for c in report["cases"]) else 1)
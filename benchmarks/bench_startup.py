@@ -0,0 +1,92 @@
+"""
+Import time and resident memory of the server module, with and without the report stack.
+
+    python benchmarks/bench_startup.py [--repeat 5]
+
+Each measurement runs in a fresh interpreter, started from the repository root:
+
+- ingest:  `import main` as the server starts today (report modules load on first use)
+- eager:   `import main` plus everything the old main.py loaded at import time:
+           pandas, matplotlib.pyplot, ReportLab and font registration
+- reports: the eager variant minus `import main`, i.e. the report stack alone
+
+Prints one JSON object with the median wall time (s) and RSS (MB) after the
+imports for each variant, the eager - ingest difference, and the report-related
+modules that were already loaded after a plain `import main`. That list should be empty.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REPORT_MODULES = ("report_renderer", "pandas", "matplotlib", "reportlab")
+
+_PROBE = r"""
+import json, sys, time
+started = time.perf_counter()
+{imports}
+elapsed = time.perf_counter() - started
+rss_kb = 0
+with open("/proc/self/status") as f:
+    for line in f:
+        if line.startswith("VmRSS:"):
+            rss_kb = int(line.split()[1])
+loaded = sorted(m for m in sys.modules if m.split(".")[0] in {report_modules!r})
+print(json.dumps({{"seconds": elapsed, "rss_mb": rss_kb / 1024.0, "report_modules": loaded}}))
+"""
+
+_REPORT_STACK = """
+import pandas
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot
+import reportlab.platypus
+import report_renderer
+report_renderer._font_name()
+"""
+
+VARIANTS = {
+    "ingest": "import main",
+    "eager": "import main\n" + _REPORT_STACK,
+    "reports": _REPORT_STACK,
+}
+
+def _measure(imports: str) -> dict:
+    code = _PROBE.format(imports=imports, report_modules=REPORT_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, timeout=600)
+    if proc.returncode != 0:
+        raise RuntimeError(f"probe failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def run(repeat: int) -> dict:
+    results = {}
+    for name, imports in VARIANTS.items():
+        samples = [_measure(imports) for _ in range(repeat)]
+        results[name] = {
+            "seconds": round(statistics.median(s["seconds"] for s in samples), 3),
+            "rss_mb": round(statistics.median(s["rss_mb"] for s in samples), 1),
+            "report_modules_loaded": len(samples[-1]["report_modules"]),
+        }
+        if name == "ingest":
+            results[name]["report_modules"] = samples[-1]["report_modules"]
+    return {
+        "repeat": repeat,
+        "variants": results,
+        "saved_by_lazy_reports": {
+            "seconds": round(results["eager"]["seconds"] - results["ingest"]["seconds"], 3),
+            "rss_mb": round(results["eager"]["rss_mb"] - results["ingest"]["rss_mb"], 1),
+        },
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    report = run(args.repeat)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if not report["variants"]["ingest"]["report_modules"] else 1)
@@ -0,0 +1,375 @@
+"""
+Stage-level microbenchmarks for the analysis pipeline.
+
+    python benchmarks/run.py [--stages decode,resample,...] [--repeat 200] [--events 10000,100000]
+                             [--output results.json] [--baseline old.json] [--threshold 1.25]
+
+Run from the repository root, so the model store (models/store) is found. Every
+stage is timed separately on synthetic sensor packets shaped like real ones:
+
+    decode          notification JSON + nested con + sound_raw -> float32 (notification_decoder)
+    resample        22.05 kHz packet -> 16 kHz (resampler)
+    yamnet          YAMNet embedding of one 16 kHz waveform          (needs the model store)
+    classifier      V2 classifier on one padded embedding tensor     (needs the model store)
+    vibration       vibration features, pure-shock max and peak count
+    grading         grade_packet(): legal thresholds, Leq update and house state machine
+    noise_metrics   update_noise_metrics() alone
+    report_csv      full CSV report over N stored events, per --events size
+    report_pdf      PDF report over N stored events (first call renders charts, later calls hit the chart cache)
+
+Prints one JSON object (and writes it to --output) with per-stage mean/p50/p95/min
+in milliseconds, plus the git commit and library versions, so results from two
+commits can be compared. With --baseline, each stage's p50 is compared against the
+baseline file and the exit status is non-zero if any stage is slower than
+--threshold x the baseline.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STAGES = ["decode", "resample", "yamnet", "classifier", "vibration", "grading", "noise_metrics", "report_csv", "report_pdf"]
+PACKET_SR = 22050
+PACKET_SAMPLES = 22050
+VIBRATION_SAMPLES = 100
+REPORT_HOUSE = "bench_house"
+
+def _summary(samples_ms: list) -> dict:
+    arr = np.asarray(samples_ms, dtype=np.float64)
+    return {
+        "n": int(arr.size),
+        "mean_ms": round(float(arr.mean()), 4),
+        "p50_ms": round(float(np.percentile(arr, 50)), 4),
+        "p95_ms": round(float(np.percentile(arr, 95)), 4),
+        "min_ms": round(float(arr.min()), 4),
+    }
+
+def _time_each(func, repeat: int, warmup: int = 1) -> dict:
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return _summary(samples)
+
+def _synthetic_packet(rng: np.random.Generator, house_id: str = "101", timestamp: str = "2026-01-01T12:00:00") -> dict:
+    """A sensor packet in the format the gateway sends (ints for sound, g for vibration)."""
+    t = np.arange(PACKET_SAMPLES) / PACKET_SR
+    tone = 3000 * np.sin(2 * np.pi * rng.uniform(80, 400) * t)
+    thump = np.zeros(PACKET_SAMPLES)
+    thump[PACKET_SAMPLES // 3:PACKET_SAMPLES // 3 + 800] = 12000 * np.exp(-np.arange(800) / 120.0)
+    sound = np.clip(tone + thump + rng.normal(0, 300, PACKET_SAMPLES), -32768, 32767).astype(np.int16)
+    vibration = (1.0 + rng.normal(0, 0.03, VIBRATION_SAMPLES)).round(4)
+    vibration[VIBRATION_SAMPLES // 3] += 0.4
+    return {
+        "house_id": house_id,
+        "timestamp": timestamp,
+        "meta": {"sampling_rate": f"{PACKET_SR}Hz", "vibration_unit": "g", "sound_unit": "raw"},
+        "payload": {
+            "vibration": {"z": vibration.tolist()},
+            "sound_raw": sound.tolist(),
+            "raw_max_amplitude": int(np.abs(sound.astype(np.int32)).max()),
+        },
+    }
+
+def _notification_body(packet: dict) -> bytes:
+    con = json.dumps(packet)
+    return json.dumps({"m2m:sgn": {"nev": {"rep": {"m2m:cin": {"con": con}}, "net": 3}, "sur": "bench"}}).encode("utf-8")
+
+def _synthetic_events(n: int, rng: np.random.Generator, end: datetime) -> list:
+    """n analysis events for one house, one every ~30 s back from `end`, shaped like main's out_dict."""
+    labels = ["footsteps", "hammer", "furniture_moving", "door_slam", "siren"]
+    severities = ["Green", "Yellow", "Red"]
+    events = []
+    for i in range(n):
+        ts = end - timedelta(seconds=30 * i + int(rng.integers(0, 30)))
+        sev = severities[int(rng.choice(3, p=[0.6, 0.3, 0.1]))]
+        db = float(rng.uniform(30, 80))
+        events.append({
+            "event_id": f"EVT_{REPORT_HOUSE}_{i:08d}",
+            "house_id": REPORT_HOUSE,
+            "timestamp": ts.isoformat(),
+            "analysis": {
+                "result": labels[i % len(labels)], "probability": float(rng.uniform(0.4, 1.0)), "db_level": db,
+                "avg_1min": db - 3, "avg_5min": db - 6, "lmax_5min": db + 2, "lmax_exceed_5min": 0,
+                "severity": sev, "is_external": False, "duration": 0.0, "vibration_peaks": 1,
+                "vibration_max": float(rng.uniform(0, 0.4)),
+                "audio_signature": rng.normal(0, 1000, 300).round(1).tolist() if sev == "Red" else [],
+            },
+            "action": {"mediation_sent": sev != "Green", "target": sev},
+            "legal_review": "법적 기준 이내 (정상)",
+            "lmax_count": 0,
+        })
+    return events
+
+def bench_decode(ctx: dict, repeat: int) -> dict:
+    import notification_decoder
+
+    body = _notification_body(ctx["packet"])
+
+    def run():
+        packet = notification_decoder.decode_notification(body)
+        notification_decoder.decode_sound(packet["payload"])
+
+    return {**_time_each(run, repeat), "body_bytes": len(body), "json_backend": notification_decoder.JSON_BACKEND}
+
+def bench_resample(ctx: dict, repeat: int) -> dict:
+    import resampler
+
+    audio = ctx["audio"]
+    return _time_each(lambda: resampler.resample(audio, PACKET_SR, 16000), repeat)
+
+def _require_models(ctx: dict):
+    import ai_engine
+    from config import MODEL_STORE_DIR, INFERENCE_BACKEND, INFERENCE_XLA, TFLITE_MODEL_PATH
+
+    if "models_loaded" not in ctx:
+        ctx["models_loaded"] = ai_engine.load_ai_model_v2(MODEL_STORE_DIR, backend=INFERENCE_BACKEND,
+                                                          xla=INFERENCE_XLA, tflite_path=TFLITE_MODEL_PATH)
+    return ctx["models_loaded"]
+
+def bench_yamnet(ctx: dict, repeat: int) -> dict:
+    import ai_engine
+    import resampler
+
+    if not _require_models(ctx):
+        return {"skipped": "model store could not be loaded"}
+    waveform = resampler.resample(ctx["audio"], PACKET_SR, ai_engine.YAMNET_SR)
+    return _time_each(lambda: ai_engine._yamnet_embed_batch([waveform]), repeat, warmup=3)
+
+def bench_classifier(ctx: dict, repeat: int) -> dict:
+    import ai_engine
+
+    if not _require_models(ctx):
+        return {"skipped": "model store could not be loaded"}
+    bundle = ai_engine.extract_features(ctx["audio"], PACKET_SR, ctx["packet"]["payload"]["vibration"]["z"])
+    if bundle.tensor is None:
+        return {"skipped": "feature extraction failed"}
+    return {**_time_each(lambda: ai_engine.classify_features([bundle]), repeat, warmup=3),
+            "backend": ai_engine.get_model_info().get("backend")}
+
+def bench_vibration(ctx: dict, repeat: int) -> dict:
+    import ai_engine
+    import main
+
+    vibration_z = ctx["packet"]["payload"]["vibration"]["z"]
+
+    def run():
+        vibe = np.asarray(vibration_z, dtype=np.float64)
+        ai_engine._vibration_features(vibe)
+        float(np.max(np.abs(vibe - 1.0)))
+        main.analyze_vibration_peaks(vibe)
+
+    return _time_each(run, repeat)
+
+def bench_grading(ctx: dict, repeat: int) -> dict:
+    import main
+
+    payload = ctx["packet"]["payload"]
+    vibe = np.asarray(payload["vibration"]["z"], dtype=np.float64)
+    vibration_max = float(np.max(np.abs(vibe - 1.0)))
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    timestamps = [(start + timedelta(seconds=i)).isoformat() for i in range(repeat + 1)]
+    it = iter(timestamps)
+    main.house_states.pop("bench_grading", None)
+    main.noise_metrics.pop("bench_grading", None)
+    return _time_each(lambda: main.grade_packet("bench_grading", next(it), payload["raw_max_amplitude"], vibe,
+                                                vibration_max, "footsteps", 0.9), repeat)
+
+def bench_noise_metrics(ctx: dict, repeat: int) -> dict:
+    import main
+
+    rng = np.random.default_rng(1)
+    start = datetime(2026, 1, 1, 12, 0, 0)
+    items = [(start + timedelta(seconds=0.5 * i), float(rng.uniform(30, 80))) for i in range(repeat + 1)]
+    it = iter(items)
+    main.noise_metrics.pop("bench_metrics", None)
+
+    def run():
+        ts, db = next(it)
+        main.update_noise_metrics("bench_metrics", db, ts, exceeded=db >= 57.0)
+
+    return _time_each(run, repeat)
+
+def _report_log(ctx: dict, n: int):
+    """EventLog plus NoiseAggregates holding n synthetic events, in a temporary directory."""
+    from event_log import EventLog
+    from noise_aggregates import NoiseAggregates
+
+    cache = ctx.setdefault("report_logs", {})
+    if n not in cache:
+        path = os.path.join(ctx["tmpdir"], f"events_{n}.sqlite3")
+        log = EventLog(path)
+        aggregates = NoiseAggregates()
+        log.add_listener(aggregates.add_many)
+        events = _synthetic_events(n, np.random.default_rng(n), ctx["report_end"])
+        for i in range(0, n, 5000):
+            log.write_now(events[i:i + 5000])
+        cache[n] = (log, aggregates, min(e["timestamp"] for e in events))
+    return cache[n]
+
+def _report_range(ctx: dict, first_ts: str):
+    start = datetime.fromisoformat(first_ts).replace(hour=0, minute=0, second=0, microsecond=0)
+    return start, ctx["report_end"]
+
+def bench_report_csv(ctx: dict, repeat: int) -> dict:
+    from report_renderer import iter_csv_report
+
+    results = {}
+    for n in ctx["event_counts"]:
+        log, _, first_ts = _report_log(ctx, n)
+        start, end = _report_range(ctx, first_ts)
+        size = [0]
+
+        def run():
+            size[0] = sum(len(part) for part in iter_csv_report(log, REPORT_HOUSE, start, end))
+
+        results[str(n)] = {**_time_each(run, max(1, repeat // 50), warmup=0), "chars": size[0]}
+    return {"events": results}
+
+def bench_report_pdf(ctx: dict, repeat: int) -> dict:
+    from config import REPORT_RENDER_WORKERS, REPORT_PDF_MAX_ROWS, REPORT_PDF_TABLE_CHUNK_ROWS
+    from report_renderer import ReportRenderer
+
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=2)
+    for n in ctx["event_counts"]:
+        log, aggregates, first_ts = _report_log(ctx, n)
+        start, end = _report_range(ctx, first_ts)
+        renderer = ReportRenderer(log, aggregates, workers=REPORT_RENDER_WORKERS,
+                                  table_max_rows=REPORT_PDF_MAX_ROWS, table_chunk_rows=REPORT_PDF_TABLE_CHUNK_ROWS)
+        renderer.start()
+        size = [0]
+
+        def run():
+            pdf = asyncio.run(renderer.render_pdf(REPORT_HOUSE, start, end, executor))
+            pdf.seek(0, os.SEEK_END)
+            size[0] = pdf.tell()
+            pdf.close()
+
+        try:
+            started = time.perf_counter()
+            run()
+            cold_ms = (time.perf_counter() - started) * 1000.0
+            results[str(n)] = {"cold_ms": round(cold_ms, 4), **_time_each(run, max(1, repeat // 50), warmup=0),
+                               "bytes": size[0]}
+        finally:
+            renderer.stop()
+    executor.shutdown(wait=True)
+    return {"events": results}
+
+BENCHMARKS = {
+    "decode": bench_decode,
+    "resample": bench_resample,
+    "yamnet": bench_yamnet,
+    "classifier": bench_classifier,
+    "vibration": bench_vibration,
+    "grading": bench_grading,
+    "noise_metrics": bench_noise_metrics,
+    "report_csv": bench_report_csv,
+    "report_pdf": bench_report_pdf,
+}
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+def _flatten(stages: dict) -> dict:
+    """{"stage" or "stage/events": p50_ms} for comparison against a baseline."""
+    flat = {}
+    for name, result in stages.items():
+        if "p50_ms" in result:
+            flat[name] = result["p50_ms"]
+        for n, sub in (result.get("events") or {}).items():
+            flat[f"{name}/{n}"] = sub["p50_ms"]
+    return flat
+
+def compare(current: dict, baseline: dict, threshold: float) -> dict:
+    """
+    Per-stage p50 ratio current/baseline; a stage regresses when the ratio exceeds `threshold`.
+    """
+    now, before = _flatten(current["stages"]), _flatten(baseline["stages"])
+    rows = {}
+    for key in sorted(now.keys() & before.keys()):
+        ratio = now[key] / before[key] if before[key] > 0 else float("inf")
+        rows[key] = {"baseline_p50_ms": before[key], "p50_ms": now[key], "ratio": round(ratio, 3),
+                     "regressed": ratio > threshold}
+    return {"baseline_commit": baseline.get("environment", {}).get("commit"), "threshold": threshold, "stages": rows}
+
+def run(stages: list, repeat: int, event_counts: list) -> dict:
+    rng = np.random.default_rng(0)
+    packet = _synthetic_packet(rng)
+    results = {"environment": _environment(), "repeat": repeat,
+               "packet": {"sampling_rate": PACKET_SR, "samples": PACKET_SAMPLES, "vibration_samples": VIBRATION_SAMPLES},
+               "stages": {}}
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmpdir:
+        ctx = {
+            "packet": packet,
+            "audio": np.asarray(packet["payload"]["sound_raw"], dtype=np.float32),
+            "tmpdir": tmpdir,
+            "event_counts": event_counts,
+            "report_end": datetime(2026, 1, 31, 23, 59, 59),
+        }
+        for name in stages:
+            started = time.perf_counter()
+            results["stages"][name] = BENCHMARKS[name](ctx, repeat)
+            logging.getLogger("benchmarks").warning(f"{name}: done in {time.perf_counter() - started:.1f}s")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma-separated subset of {STAGES}")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--events", default="10000,100000", help="stored event counts for the report stages")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio above which a stage counts as regressed")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = sorted(set(stages) - set(BENCHMARKS))
+    if unknown:
+        parser.error(f"unknown stages: {unknown}")
+    os.chdir(ROOT)
+    # The grading stage logs every decision at INFO; configuring WARNING first turns
+    # main's logging.basicConfig into a no-op and keeps the console (and timings) quiet
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run(stages, args.repeat, [int(n) for n in args.events.split(",") if n])
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            report["comparison"] = compare(report, json.load(f), args.threshold)
+        exit_code = int(any(row["regressed"] for row in report["comparison"]["stages"].values()))
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+    sys.exit(exit_code)
@@ -1,9 +1,12 @@
 # Mobius oneM2M Platform Configuration
 # ------------------------------------
 # This file contains the configuration for connecting to the Mobius oneM2M platform.
+import os
 
-# The base URL of the Mobius oneM2M platform
-MOBIUS_URL = "https://onem2m.iotcoss.ac.kr"
+# The base URL of the Mobius oneM2M platform.
+# Override with the MOBIUS_URL environment variable, e.g. http://127.0.0.1:7579 for
+# the local emulator in loadtest/mobius_emulator.py.
+MOBIUS_URL = os.environ.get("MOBIUS_URL", "https://onem2m.iotcoss.ac.kr")
 
 # The name of the Common Service Entity (CSE) - typically "Mobius"
 CSE_NAME = "Mobius"
@@ -31,7 +34,10 @@ APOLOGY_CONTAINER_NAME = CNT_APOLOGY
 
 # The publicly accessible URL of this AI server for Mobius to send notifications to.
 # Replace 'YOUR_SERVER_IP' with the actual public or local IP address of the machine running this server.
-AI_SERVER_URL = "https://8ce841b24568.ngrok-free.app"
+AI_SERVER_URL = os.environ.get("AI_SERVER_URL", "https://8ce841b24568.ngrok-free.app")
+
+# Notification URL the server subscribes to on startup (Mobius POSTs new content instances here)
+NOTIFICATION_URL = os.environ.get("NOTIFICATION_URL", "https://88d0c49bd9cc.ngrok-free.app/notification")
 
 # AI Model Configuration
 # ----------------------
@@ -45,11 +51,102 @@ DEFAULT_SAMPLING_RATE = 22050
 # Number of MFCCs to extract for audio features
 MFCC_COUNT = 20
 
+# Local model artifact store (YAMNet, classifier, class names). Populate it once with
+# `python model_store.py export --version <v>`; the server never downloads models at startup.
+MODEL_STORE_DIR = "models/store"
+
+# Classifier engine for the V2 model:
+#   "keras"       - tf.keras.Model.predict (slowest per call)
+#   "tf_function" - tf.function with a fixed input signature (set INFERENCE_XLA to XLA-compile it)
+#   "tflite"      - TFLite interpreter; uses TFLITE_MODEL_PATH if present, else converts at startup
+INFERENCE_BACKEND = "tf_function"
+INFERENCE_XLA = False
+TFLITE_MODEL_PATH = "models/noise_classification_v2.tflite"
+
+# Inference micro-batching: concurrent notifications arriving within this window
+# (or until the batch is full) share one YAMNet pass and one classifier call.
+INFERENCE_BATCH_WINDOW_MS = 10
+INFERENCE_MAX_BATCH_SIZE = 16
+
+# Inference worker pool: threads sharing the loaded models. Requests beyond
+# INFERENCE_MAX_QUEUE_SIZE are rejected (HTTP 503) instead of blocking the event loop.
+INFERENCE_WORKERS = 2
+INFERENCE_MAX_QUEUE_SIZE = 256
+
+# Shape buckets: YAMNet inputs are zero-padded to a fixed set of lengths growing by this
+# factor, and classifier batches to powers of two up to INFERENCE_MAX_BATCH_SIZE. Every
+# bucket is run once per worker at startup; GET /ready returns 503 until that is done.
+INFERENCE_SHAPE_BUCKET_GROWTH = 1.5
+
+# Threads for remaining blocking calls made from async handlers
+BLOCKING_IO_WORKERS = 8
+
+# Persistent event log (SQLite, WAL mode). Writes are batched on a background thread.
+EVENT_LOG_PATH = "data/events.sqlite3"
+EVENT_LOG_BATCH_SIZE = 500
+EVENT_LOG_FLUSH_INTERVAL = 0.5  # seconds
+EVENT_LOG_MAX_QUEUE_SIZE = 100000  # queued events beyond this are dropped (counted in /stats/event_log)
+
+# CSV report export: rows read from the event log and written per chunk
+CSV_CHUNK_SIZE = 2000
+
+# PDF reports: charts are rendered by a process pool and cached per (house, range, data version).
+# The event table spans multiple pages; rows beyond REPORT_PDF_MAX_ROWS are left to the CSV export.
+REPORT_RENDER_WORKERS = 2
+REPORT_CHART_CACHE_SIZE = 256
+REPORT_PDF_MAX_ROWS = 5000
+REPORT_PDF_TABLE_CHUNK_ROWS = 500
+REPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024  # PDFs larger than this are spooled to a temp file
+
+# Report jobs (POST /reports -> GET /reports/{id} -> GET /reports/{id}/download).
+# Identical queued/running requests share one job; artifacts are deleted after the TTL.
+REPORT_JOB_DIR = "data/reports"
+REPORT_JOB_MAX_CONCURRENT = 2   # jobs rendering at once
+REPORT_JOB_MAX_PENDING = 32     # queued + running jobs before new requests get HTTP 503
+REPORT_JOB_TTL_SECONDS = 3600
+
 # Network Configuration
 # ---------------------
 # Timeout for network requests (seconds)
 REQUEST_TIMEOUT = 10
 
+# Async Mobius client: keep-alive connection pool and retry policy
+MOBIUS_POOL_LIMIT = 100          # total open connections
+MOBIUS_POOL_LIMIT_PER_HOST = 20  # open connections per host
+MOBIUS_KEEPALIVE_TIMEOUT = 30    # seconds an idle connection is kept
+MOBIUS_MAX_RETRIES = 3           # retries on connection errors, timeouts, 429 and 5xx
+MOBIUS_RETRY_BACKOFF = 0.2       # base backoff (s), doubled per attempt, full jitter
+MOBIUS_RETRY_BACKOFF_MAX = 2.0   # backoff cap (s)
+
+# Write-behind uploads to CNT_STATUS / CNT_NOISE. Failed uploads are spooled to an
+# append-only journal on disk and replayed in order once Mobius recovers.
+WRITE_BEHIND_MAX_IN_FLIGHT = 8
+WRITE_BEHIND_QUEUE_SIZE = 10000
+WRITE_BEHIND_SPOOL_PATH = "spool/mobius_journal.jsonl"
+WRITE_BEHIND_REPLAY_INTERVAL = 5.0  # seconds between replay attempts while Mobius is down
+WRITE_BEHIND_FSYNC = False          # fsync each batch of spooled records (safer, slower)
+WRITE_BEHIND_SPOOL_MAX_BYTES = 256 * 1024 * 1024  # journal cap; new records are dropped (and logged) beyond it
+
+# Incremental mirror of CNT_NOISE into the event log: only content instances created
+# after the stored cursor are fetched, in pages of MOBIUS_SYNC_PAGE_SIZE.
+MOBIUS_SYNC_INTERVAL = 60.0  # seconds between sync runs
+MOBIUS_SYNC_PAGE_SIZE = 500
+
+# Dashboard WebSocket fan-out: per-client bounded send queue. When a client's queue is
+# full, WS_OVERFLOW_POLICY is "drop_oldest", "drop_newest" or "disconnect".
+WS_QUEUE_SIZE = 256
+WS_OVERFLOW_POLICY = "drop_oldest"
+WS_SEND_TIMEOUT = 5.0  # seconds; a client whose send takes longer is disconnected
+
+# Prometheus /metrics: a house counts as active while its last packet is newer than this
+METRICS_ACTIVE_HOUSE_WINDOW = 300.0  # seconds
+
+# On-demand profiler (GET /admin/profile). Disabled unless PROFILER_ADMIN_TOKEN is set;
+# requests must send it in the X-Admin-Token header.
+PROFILER_ADMIN_TOKEN = os.environ.get("PROFILER_ADMIN_TOKEN")
+PROFILER_MAX_SECONDS = 60.0
+PROFILER_MAX_HZ = 250.0
+
 # MOCK DATA MODE Configuration
 # -----------------------------
 # Set to True to enable mock data generation for frontend development
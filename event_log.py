@@ -0,0 +1,423 @@
+"""
+Persistent, append-only event log on local disk (SQLite in WAL mode).
+
+Every analysis and apology event is written here so history survives restarts
+and reports no longer depend on downloading Mobius containers. Rows are indexed
+by (house_id, ts) and by (severity, house_id, ts). The report columns are stored
+as real columns and the full event dict as JSON.
+
+Writes never happen on the request path: append() only queues the event, and a
+background writer thread inserts queued events in batches (one transaction per
+batch). Events are de-duplicated per house by (house_id, event_id) with INSERT OR
+IGNORE. Older event ids (e.g. EVT_%Y%m%d%H%M%S) carry no house id, so equal ids
+from different houses are different events. The queue is
+bounded: when it is full, new events are dropped and counted. Malformed events are
+skipped and counted; a batch that fails to commit is retried once and then written
+event by event, so one bad row cannot take the others (or the writer) down.
+"""
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_EVENTS_TABLE = """
+CREATE TABLE IF NOT EXISTS events (
+    event_id       TEXT NOT NULL,
+    house_id       TEXT NOT NULL,
+    ts             REAL NOT NULL,
+    timestamp      TEXT NOT NULL,
+    kind           TEXT NOT NULL,
+    severity       TEXT,
+    result         TEXT,
+    probability    REAL,
+    db_level       REAL,
+    avg_1min       REAL,
+    avg_5min       REAL,
+    vibration_max  REAL,
+    mediation_sent INTEGER,
+    legal_review   TEXT,
+    lmax_count     INTEGER,
+    payload        TEXT NOT NULL,
+    PRIMARY KEY (house_id, event_id)
+);
+"""
+
+_SCHEMA = _EVENTS_TABLE + """
+CREATE INDEX IF NOT EXISTS idx_events_house_ts ON events(house_id, ts);
+CREATE INDEX IF NOT EXISTS idx_events_severity ON events(severity, house_id, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_COLUMN_NAMES = {
+    "event_id", "house_id", "ts", "timestamp", "kind", "severity", "result", "probability", "db_level",
+    "avg_1min", "avg_5min", "vibration_max", "mediation_sent", "legal_review", "lmax_count", "payload",
+}
+
+# Computed columns accepted by iter_chunks (timestamp is always valid ISO 8601, checked on insert)
+_DERIVED_COLUMNS = {
+    "hour": "CAST(substr(timestamp, 12, 2) AS INTEGER)",
+}
+
+_INSERT = """
+INSERT OR IGNORE INTO events (
+    event_id, house_id, ts, timestamp, kind, severity, result, probability, db_level,
+    avg_1min, avg_5min, vibration_max, mediation_sent, legal_review, lmax_count, payload
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+def _to_row(event: dict) -> Optional[tuple]:
+    """
+    Flattens an analysis or apology event dict into an events row, or None if unusable.
+    """
+    if not isinstance(event, dict):
+        return None
+    house_id = event.get("house_id")
+    timestamp = event.get("timestamp")
+    if not house_id or not isinstance(house_id, str) or not timestamp or not isinstance(timestamp, str):
+        return None
+    try:
+        ts = datetime.fromisoformat(timestamp.replace("Z", "")).timestamp()
+    except (ValueError, OverflowError, OSError):
+        return None
+    try:
+        payload = json.dumps(event, ensure_ascii=False)
+    except (TypeError, ValueError):
+        return None
+
+    if event.get("event") == "apology":
+        event_id = event.get("event_id") or f"APO_{house_id}_{timestamp}"
+        return (event_id, house_id, ts, timestamp, "apology", event.get("severity"), None, None, None,
+                None, None, None, None, event.get("message"), None, payload)
+
+    event_id = event.get("event_id")
+    if not event_id:
+        return None
+    a = event.get("analysis", {})
+    action = event.get("action", {})
+    if not isinstance(a, dict) or not isinstance(action, dict):
+        return None
+    return (
+        event_id, house_id, ts, timestamp, "analysis", a.get("severity"), a.get("result"),
+        a.get("probability"), a.get("db_level"), a.get("avg_1min", 0.0), a.get("avg_5min", 0.0),
+        a.get("vibration_max", 0.0), int(bool(action.get("mediation_sent"))),
+        event.get("legal_review", ""), event.get("lmax_count", 0), payload,
+    )
+
+def is_storable(event) -> bool:
+    """
+    True if the event has what the events table needs (see _to_row).
+    """
+    return _to_row(event) is not None
+
+class EventLog:
+    """
+    SQLite-backed persistent event log with a batched background writer.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.5, max_queue_size: int = 100000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._written = 0
+        self._batches = 0
+        self._rejected = 0  # malformed events skipped
+        self._dropped = 0   # events lost to a full queue or a failed write
+        self._failed_batches = 0
+        self._listeners: List[Callable[[List[dict]], None]] = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            self._migrate(conn)
+            conn.executescript(_SCHEMA)
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """
+        Rebuilds an events table keyed by event_id alone (earlier schema) with the
+        (house_id, event_id) key, keeping every row.
+        """
+        key = [row[1] for row in sorted(conn.execute("PRAGMA table_info(events)"), key=lambda r: r[5]) if row[5]]
+        if not key or key == ["house_id", "event_id"]:
+            return
+        logger.info(f"Migrating event log {self.path} to (house_id, event_id) keys")
+        conn.executescript(
+            "BEGIN;"
+            "ALTER TABLE events RENAME TO events_old;"
+            "DROP INDEX IF EXISTS idx_events_house_ts;"
+            "DROP INDEX IF EXISTS idx_events_severity;"
+            + _EVENTS_TABLE +
+            "INSERT INTO events SELECT * FROM events_old;"
+            "DROP TABLE events_old;"
+            "COMMIT;"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Flushes everything queued so far and stops the writer.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    def append(self, event: dict):
+        """
+        Queues one event for the background writer. Never blocks; drops (and counts)
+        the event when the queue is full.
+        """
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._dropped += 1
+            if self._dropped == 1 or self._dropped % 1000 == 0:
+                logger.error(f"❌ Event log queue full ({self._queue.maxsize}); {self._dropped} events dropped so far")
+
+    def append_many(self, events: Iterable[dict]):
+        for event in events:
+            self.append(event)
+
+    def add_listener(self, listener: Callable[[List[dict]], None]):
+        """
+        Registers listener(new_events), called after each commit with the events that were
+        actually inserted (duplicates excluded). Runs on the writing thread; keep it cheap.
+        """
+        self._listeners.append(listener)
+
+    def _insert(self, conn: sqlite3.Connection, events: Iterable[dict]) -> List[dict]:
+        """
+        Inserts events inside the caller's transaction and returns the ones that were new.
+        """
+        new = []
+        for event in events:
+            row = _to_row(event)
+            if row is None:
+                self._rejected += 1
+            elif conn.execute(_INSERT, row).rowcount == 1:
+                new.append(event)
+        return new
+
+    def _notify(self, new: List[dict]):
+        if not new:
+            return
+        for listener in self._listeners:
+            try:
+                listener(new)
+            except Exception as e:
+                logger.exception(f"Event log listener failed: {e}")
+
+    def write_now(self, events: Iterable[dict]) -> int:
+        """
+        Synchronously inserts events (for bulk imports off the request path).
+
+        Returns:
+            int: Number of new rows (duplicates by (house_id, event_id) are ignored).
+        """
+        with self._connect() as conn:
+            new = self._insert(conn, events)
+        self._notify(new)
+        return len(new)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+        finally:
+            conn.close()
+
+    def write_now_with_meta(self, events: Iterable[dict], key: str, value: str) -> int:
+        """
+        write_now() plus a meta key update in the same transaction (e.g. a sync cursor
+        that must only advance together with the rows it covers).
+        """
+        with self._connect() as conn:
+            new = self._insert(conn, events)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self._notify(new)
+        return len(new)
+
+    def _run(self):
+        conn = self._connect()
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+
+                new = self._write_batch(conn, batch)
+                self._written += len(new)
+                self._batches += 1
+                self._notify(new)
+        finally:
+            conn.close()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[dict]) -> List[dict]:
+        """
+        Commits a batch in one transaction, retrying once (e.g. after a busy timeout);
+        if that fails too, writes the events one per transaction and drops only the ones
+        that still fail. Never raises, so the writer thread keeps running.
+        """
+        for attempt in range(2):
+            try:
+                with conn:
+                    return self._insert(conn, batch)
+            except Exception as e:
+                logger.error(f"❌ Event log write failed ({len(batch)} events, attempt {attempt + 1}): {e}")
+                time.sleep(self.flush_interval)
+        self._failed_batches += 1
+        new = []
+        for event in batch:
+            try:
+                with conn:
+                    new.extend(self._insert(conn, [event]))
+            except Exception as e:
+                self._dropped += 1
+                logger.error(f"❌ Event log dropped event {event.get('event_id') if isinstance(event, dict) else event!r}: {e}")
+        return new
+
+    def query(self, house_id: str, start: datetime, end: datetime, newest_first: bool = True,
+              severities: Optional[List[str]] = None, limit: Optional[int] = None) -> List[dict]:
+        """
+        Events of one house with start <= timestamp <= end, via the (house_id, ts) index.
+        """
+        sql = "SELECT payload FROM events WHERE house_id = ? AND ts BETWEEN ? AND ?"
+        params: list = [house_id, start.timestamp(), end.timestamp()]
+        if severities:
+            sql += f" AND severity IN ({','.join('?' * len(severities))})"
+            params.extend(severities)
+        sql += " ORDER BY ts DESC" if newest_first else " ORDER BY ts ASC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        conn = self._connect()
+        try:
+            return [json.loads(payload) for (payload,) in conn.execute(sql, params)]
+        finally:
+            conn.close()
+
+    def iter_chunks(self, house_id: str, start: datetime, end: datetime, columns: List[str],
+                    chunk_size: int = 2000, newest_first: bool = True) -> Iterator[List[tuple]]:
+        """
+        Streams one house's events in time order as chunks of row tuples (`columns` only;
+        "hour" is also accepted and gives the local hour of the event timestamp).
+
+        Uses keyset pagination on (ts, event_id) with a short-lived connection per chunk,
+        so memory is bounded by chunk_size and no read transaction stays open while the
+        consumer (e.g. an HTTP response) is slow. Safe to consume from any thread.
+        """
+        unknown = set(columns) - _COLUMN_NAMES - set(_DERIVED_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown event log columns: {sorted(unknown)}")
+        select = ", ".join([_DERIVED_COLUMNS.get(c, c) for c in columns] + ["ts", "event_id"])
+        base = f"SELECT {select} FROM events WHERE house_id = ? AND ts BETWEEN ? AND ?"
+        after = " AND (ts, event_id) < (?, ?)" if newest_first else " AND (ts, event_id) > (?, ?)"
+        order = " ORDER BY ts DESC, event_id DESC" if newest_first else " ORDER BY ts ASC, event_id ASC"
+        params = [house_id, start.timestamp(), end.timestamp()]
+        last = None
+        while True:
+            sql = base + (after if last else "") + order + " LIMIT ?"
+            conn = self._connect()
+            try:
+                rows = conn.execute(sql, params + (list(last) if last else []) + [chunk_size]).fetchall()
+            finally:
+                conn.close()
+            if not rows:
+                return
+            yield [row[:-2] for row in rows]
+            if len(rows) < chunk_size:
+                return
+            last = rows[-1][-2:]
+
+    def _fetch(self, sql: str, params: list) -> list:
+        conn = self._connect()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def data_version(self, house_id: str, start: datetime, end: datetime) -> str:
+        """
+        Cheap fingerprint of a house/range (row count and newest rowid); changes whenever
+        an event in the range is added. Used as a cache key for rendered report artifacts.
+        """
+        ((count, newest),) = self._fetch(
+            "SELECT COUNT(*), MAX(rowid) FROM events WHERE house_id = ? AND ts BETWEEN ? AND ?",
+            [house_id, start.timestamp(), end.timestamp()],
+        )
+        return f"{count}:{newest or 0}"
+
+    def daily_rollup(self) -> dict:
+        """
+        Per-house, per-day aggregates of analysis events, for rebuilding in-memory counters:
+        {"hourly": [(house, day, hour, severity, n)], "classes": [(house, day, result, n)],
+        "lmax": [(house, day, max_db)]}, with day as "YYYY-MM-DD".
+        """
+        where = "FROM events WHERE kind = 'analysis'"
+        return {
+            "hourly": self._fetch(
+                "SELECT house_id, substr(timestamp, 1, 10), CAST(substr(timestamp, 12, 2) AS INTEGER), severity, COUNT(*) "
+                f"{where} GROUP BY 1, 2, 3, 4", []),
+            "classes": self._fetch(f"SELECT house_id, substr(timestamp, 1, 10), result, COUNT(*) {where} GROUP BY 1, 2, 3", []),
+            "lmax": self._fetch(f"SELECT house_id, substr(timestamp, 1, 10), MAX(db_level) {where} GROUP BY 1, 2", []),
+        }
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        conn = self._connect()
+        try:
+            (rows,) = conn.execute("SELECT COUNT(*) FROM events").fetchone()
+        finally:
+            conn.close()
+        return {
+            "path": self.path,
+            "rows": rows,
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "written": self._written,
+            "batches": self._batches,
+            "failed_batches": self._failed_batches,
+            "rejected": self._rejected,
+            "dropped": self._dropped,
+        }
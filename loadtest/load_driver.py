@@ -0,0 +1,247 @@
+"""
+Open-loop load driver: raw-sensor notifications for N houses at a target rate.
+
+    python loadtest/load_driver.py --target http://127.0.0.1:8000 --houses 50 --rate 20 --duration 60
+    python loadtest/load_driver.py --mode mobius --mobius http://127.0.0.1:7579 --target http://127.0.0.1:8000 ...
+
+Modes:
+- direct (default): POST each packet, wrapped as a Mobius notification, straight to
+  {target}/notification. Latency is the full request time of the analysis pipeline.
+- mobius: subscribe {target}/notification to a container on the emulator
+  (loadtest/mobius_emulator.py) and create one content instance per packet there;
+  the emulator then delivers the notification. Latency is the cin create time, and
+  the emulator's notification delivery percentiles are reported alongside.
+
+Packets are sent on a fixed schedule whether or not earlier ones have finished
+(open loop), so a slow server shows up as latency, not as a lower offered rate.
+At most --max-in-flight requests are outstanding. A packet that finds no free
+slot is counted as "not_sent" and skipped.
+
+Prints one JSON object with offered and achieved throughput, response status
+counts, and p50/p95/p99/max latency in ms.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+import aiohttp
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CSE_NAME, AE_NAME, CNT_RAW  # noqa: E402
+
+VARIANTS = 16
+VIBRATION_SAMPLES = 100
+
+def _sound_variants(rng: np.random.Generator, sr: int, samples: int) -> list:
+    """Pre-rendered audio clips (hum + optional impact + noise) so packets differ without per-send synthesis."""
+    t = np.arange(samples) / sr
+    variants = []
+    for i in range(VARIANTS):
+        sound = 2000 * np.sin(2 * np.pi * rng.uniform(80, 400) * t) + rng.normal(0, 300, samples)
+        if i % 2:
+            start = int(rng.integers(0, max(1, samples - 800)))
+            length = min(800, samples - start)
+            sound[start:start + length] += 12000 * np.exp(-np.arange(length) / 120.0)
+        variants.append(np.clip(sound, -32768, 32767).astype(np.int16))
+    return variants
+
+class PacketFactory:
+    """
+    Builds sensor packets ({"house_id", "timestamp", "meta", "payload"}) as JSON text.
+    The audio part of each variant is serialised once.
+    """
+
+    def __init__(self, sr: int, samples: int, encoding: str, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.rng = rng
+        self.meta = json.dumps({"sampling_rate": f"{sr}Hz", "vibration_unit": "g", "sound_unit": "raw"})
+        self.sound = []
+        for clip in _sound_variants(rng, sr, samples):
+            if encoding == "pcm16":
+                field = '"sound_pcm16": ' + json.dumps(base64.b64encode(clip.astype("<i2").tobytes()).decode("ascii"))
+            else:
+                field = '"sound_raw": ' + json.dumps(clip.tolist())
+            self.sound.append((field, int(np.abs(clip.astype(np.int32)).max())))
+
+    def packet(self, house_id: str, seq: int) -> str:
+        sound_field, max_amplitude = self.sound[seq % len(self.sound)]
+        vibration = (1.0 + self.rng.normal(0, 0.03, VIBRATION_SAMPLES)).round(4)
+        if seq % 3 == 0:
+            vibration[int(self.rng.integers(0, VIBRATION_SAMPLES))] += 0.4
+        payload = (f'{{"vibration": {{"z": {json.dumps(vibration.tolist())}}}, {sound_field}, '
+                   f'"raw_max_amplitude": {max_amplitude}}}')
+        return (f'{{"house_id": {json.dumps(house_id)}, "timestamp": "{datetime.now().isoformat()}", '
+                f'"meta": {self.meta}, "payload": {payload}}}')
+
+def _notification(con: str, seq: int) -> bytes:
+    cin = {"rn": f"4-load{seq:010d}", "ty": 4, "ri": f"4-load{seq:010d}", "ct": datetime.now().strftime("%Y%m%dT%H%M%S"),
+           "con": con}
+    return json.dumps({"m2m:sgn": {"nev": {"rep": {"m2m:cin": cin}, "net": 3}, "sur": "loadtest"}}).encode("utf-8")
+
+def _percentiles(latencies: list) -> dict:
+    if not latencies:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "max_ms": None}
+    arr = np.asarray(latencies) * 1000.0
+    return {
+        "p50_ms": round(float(np.percentile(arr, 50)), 2),
+        "p95_ms": round(float(np.percentile(arr, 95)), 2),
+        "p99_ms": round(float(np.percentile(arr, 99)), 2),
+        "max_ms": round(float(arr.max()), 2),
+    }
+
+class LoadDriver:
+    def __init__(self, args):
+        self.args = args
+        self.factory = PacketFactory(args.sampling_rate, args.samples, args.encoding, seed=args.seed)
+        self.houses = [f"{args.house_prefix}{i:03d}" for i in range(args.houses)]
+        self.latencies = []
+        self.outcomes = Counter()
+        self.not_sent = 0
+        self._slots = asyncio.Semaphore(args.max_in_flight)
+        self._session: Optional[aiohttp.ClientSession] = None
+        cnt_url = f"{args.mobius}/{CSE_NAME}/{AE_NAME}/{args.container}"
+        self.cin_url = cnt_url
+        self.sub_url = f"{cnt_url}/{args.subscription}"
+
+    async def _setup_mobius(self):
+        headers = {"X-M2M-Origin": "S", "X-M2M-RI": "loadtest", "Content-Type": "application/vnd.onem2m-res+json; ty=23"}
+        async with self._session.delete(self.sub_url, headers=headers):
+            pass  # 404 when there is no earlier subscription
+        body = {"m2m:sub": {"rn": self.args.subscription, "nu": [f"{self.args.target}/notification"], "nct": 1,
+                            "enc": {"net": [3]}}}
+        async with self._session.post(self.cin_url, json=body, headers=headers) as response:
+            if response.status >= 400:
+                raise RuntimeError(f"Subscription on {self.cin_url} failed: HTTP {response.status} {await response.text()}")
+
+    async def _send(self, seq: int, house_id: str):
+        con = self.factory.packet(house_id, seq)
+        if self.args.mode == "mobius":
+            url = self.cin_url
+            headers = {"X-M2M-Origin": "S", "X-M2M-RI": f"load{seq}", "Content-Type": "application/vnd.onem2m-res+json; ty=4"}
+            data = json.dumps({"m2m:cin": {"con": con, "lbl": ["raw"]}}).encode("utf-8")
+        else:
+            url = f"{self.args.target}/notification"
+            headers = {"Content-Type": "application/json"}
+            data = _notification(con, seq)
+        started = time.perf_counter()
+        outcome = "exception"
+        try:
+            async with self._session.post(url, data=data, headers=headers) as response:
+                body = await response.read()
+                if response.status >= 400:
+                    outcome = f"http_{response.status}"
+                elif self.args.mode == "mobius":
+                    outcome = "created"
+                else:
+                    try:
+                        outcome = json.loads(body).get("status", "unknown")
+                    except (ValueError, AttributeError):
+                        outcome = "invalid_response"
+            self.latencies.append(time.perf_counter() - started)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            outcome = type(e).__name__
+        except Exception as e:
+            outcome = f"exception_{type(e).__name__}"
+        finally:
+            self._slots.release()
+        self.outcomes[outcome] += 1
+
+    async def run(self) -> dict:
+        args = self.args
+        timeout = aiohttp.ClientTimeout(total=args.timeout)
+        connector = aiohttp.TCPConnector(limit=args.max_in_flight)
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self._session = session
+            if args.mode == "mobius":
+                await self._setup_mobius()
+
+            interval = 1.0 / args.rate
+            total = int(args.rate * args.duration)
+            tasks = set()
+            started = time.perf_counter()
+            for seq in range(total):
+                # Fixed schedule (open loop); Poisson arrivals with --poisson
+                delay = started + seq * interval - time.perf_counter() if not args.poisson else self._rng_gap(interval)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                if self._slots.locked():
+                    self.not_sent += 1
+                    continue
+                await self._slots.acquire()
+                task = asyncio.create_task(self._send(seq, self.houses[seq % len(self.houses)]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            send_window = time.perf_counter() - started
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            elapsed = time.perf_counter() - started
+
+            emulator = None
+            if args.mode == "mobius":
+                await asyncio.sleep(args.drain)
+                try:
+                    async with session.get(f"{args.mobius}/__stats") as response:
+                        emulator = await response.json()
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    emulator = {"error": str(e)}
+
+        completed = sum(self.outcomes.values())
+        ok = self.outcomes.get("success", 0) + self.outcomes.get("created", 0)
+        return {
+            "mode": args.mode,
+            "target": args.target,
+            "houses": args.houses,
+            "encoding": args.encoding,
+            "samples_per_packet": args.samples,
+            "offered_rate": args.rate,
+            "duration_s": round(send_window, 2),
+            "elapsed_s": round(elapsed, 2),
+            "scheduled": total,
+            "not_sent": self.not_sent,
+            "completed": completed,
+            "throughput_rps": round(completed / elapsed, 2) if elapsed else None,
+            "ok_throughput_rps": round(ok / elapsed, 2) if elapsed else None,
+            "outcomes": dict(self.outcomes),
+            "latency": _percentiles(self.latencies),
+            "emulator": emulator,
+        }
+
+    def _rng_gap(self, interval: float) -> float:
+        return float(self.factory.rng.exponential(interval))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="AI server base URL")
+    parser.add_argument("--mode", choices=("direct", "mobius"), default="direct")
+    parser.add_argument("--mobius", default="http://127.0.0.1:7579", help="emulator base URL (mobius mode)")
+    parser.add_argument("--container", default=CNT_RAW, help="container the sensors write to (mobius mode)")
+    parser.add_argument("--subscription", default="sub_loadtest")
+    parser.add_argument("--houses", type=int, default=10)
+    parser.add_argument("--house-prefix", default="load_")
+    parser.add_argument("--rate", type=float, default=10.0, help="packets per second across all houses")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of sending")
+    parser.add_argument("--poisson", action="store_true", help="exponential inter-arrival gaps instead of a fixed schedule")
+    parser.add_argument("--max-in-flight", type=int, default=256)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--drain", type=float, default=2.0, help="seconds to wait for emulator notifications (mobius mode)")
+    parser.add_argument("--sampling-rate", type=int, default=22050)
+    parser.add_argument("--samples", type=int, default=22050)
+    parser.add_argument("--encoding", choices=("list", "pcm16"), default="list", help="sound_raw int list or base64 sound_pcm16")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(LoadDriver(args).run())
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
@@ -0,0 +1,294 @@
+"""
+Local stand-in for the Mobius oneM2M server, for load tests without onem2m.iotcoss.ac.kr.
+
+    python loadtest/mobius_emulator.py [--port 7579] [--latency-ms 20] [--jitter-ms 10] [--error-rate 0.01]
+
+Point the AI server at it with MOBIUS_URL=http://127.0.0.1:7579 (config.py reads
+it from the environment). Everything is kept in memory. Supported subset:
+
+- POST  /{cse}                      ty=2  create AE
+- POST  /{cse}/{ae}                 ty=3  create container
+- POST  /{cse}/{ae}/{cnt}           ty=4  create content instance (optional rn, 409 if taken; oldest dropped beyond --max-instances)
+- POST  /{cse}/{ae}/{cnt}           ty=23 create subscription ({"m2m:sub": {"rn", "nu", "enc"}})
+- GET   /{cse}/{ae}/{cnt}/la              latest content instance
+- GET   /{cse}/{ae}/{cnt}?rcn=4&ty=4      content instances, newest first, with lim / ofst / cra
+- GET / DELETE /{cse}/{ae}/{cnt}/{sub}    subscription
+- GET   /__stats                          request, error and notification counters
+
+Creating a content instance sends a notification ({"m2m:sgn": {"nev": {"rep":
+{"m2m:cin": ...}, "net": 3}, "sur": ...}}) to every subscription on the container
+whose `enc.net` includes 3 (or is unset), as Mobius does. Parent resources are
+created on first use unless --strict is given. --latency-ms/--jitter-ms delay every
+API response and --error-rate answers that fraction of API requests with HTTP 500.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import random
+import re
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+logger = logging.getLogger("mobius_emulator")
+
+ONEM2M_TIME_FORMAT = "%Y%m%dT%H%M%S"
+_TY_RE = re.compile(r"ty=(\d+)")
+
+def _now_ct() -> str:
+    return datetime.now().strftime(ONEM2M_TIME_FORMAT)
+
+class _Container:
+    def __init__(self, path: str, rn: str, max_instances: int):
+        self.path = path
+        self.rn = rn
+        self.ct = _now_ct()
+        self.instances: deque = deque(maxlen=max_instances)
+        self.names: set = set()  # rn of every instance still held
+        self.subscriptions: Dict[str, dict] = {}
+
+    def resource(self) -> dict:
+        return {"rn": self.rn, "ty": 3, "ri": self.path, "ct": self.ct, "cni": len(self.instances)}
+
+class MobiusEmulator:
+    """
+    In-memory oneM2M resource tree (CSE -> AE -> container -> cin/sub) served over HTTP.
+    """
+
+    def __init__(self, cse_name: str = "Mobius", latency_ms: float = 0.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, max_instances: int = 10000, strict: bool = False,
+                 notify_timeout: float = 10.0):
+        self.cse_name = cse_name
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.max_instances = max_instances
+        self.strict = strict
+        self.notify_timeout = notify_timeout
+        self.aes: Dict[str, dict] = {}
+        self.containers: Dict[str, _Container] = {}
+        self._ri = itertools.count(1)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._notify_tasks: set = set()
+        self._stats = {"requests": 0, "injected_errors": 0, "cin_created": 0, "notifications_sent": 0,
+                       "notifications_failed": 0}
+        self._notify_latency = deque(maxlen=10000)
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._faults], client_max_size=64 * 1024 * 1024)
+        app.router.add_get("/__stats", self.handle_stats)
+        app.router.add_route("*", "/{path:.*}", self.handle)
+        app.on_startup.append(self._on_startup)
+        app.on_cleanup.append(self._on_cleanup)
+        return app
+
+    async def _on_startup(self, app):
+        self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.notify_timeout))
+
+    async def _on_cleanup(self, app):
+        if self._notify_tasks:
+            await asyncio.gather(*self._notify_tasks, return_exceptions=True)
+        await self._session.close()
+
+    @web.middleware
+    async def _faults(self, request: web.Request, handler):
+        if request.path == "/__stats":
+            return await handler(request)
+        self._stats["requests"] += 1
+        delay = max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000.0
+        if delay:
+            await asyncio.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            self._stats["injected_errors"] += 1
+            return self._error(500, "injected error")
+        return await handler(request)
+
+    @staticmethod
+    def _error(status: int, message: str) -> web.Response:
+        return web.json_response({"m2m:dbg": message}, status=status)
+
+    def _new_ri(self, prefix: str) -> str:
+        return f"{prefix}{next(self._ri):010d}"
+
+    def _ensure_ae(self, ae: str) -> Optional[dict]:
+        if ae not in self.aes and not self.strict:
+            self.aes[ae] = {"rn": ae, "ty": 2, "ri": self._new_ri("AE"), "ct": _now_ct(), "api": ae}
+        return self.aes.get(ae)
+
+    def _container(self, ae: str, cnt: str, create: bool) -> Optional[_Container]:
+        path = f"{ae}/{cnt}"
+        if path not in self.containers and create and not self.strict:
+            self._ensure_ae(ae)
+            self.containers[path] = _Container(path, cnt, self.max_instances)
+        return self.containers.get(path)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        parts = [p for p in request.match_info["path"].split("/") if p]
+        if not parts or parts[0] != self.cse_name:
+            return self._error(404, "unknown CSE")
+        parts = parts[1:]
+        if request.method == "POST":
+            return await self._create(request, parts)
+        if request.method == "GET":
+            return self._retrieve(request, parts)
+        if request.method == "DELETE":
+            return self._delete(parts)
+        return self._error(405, "method not supported")
+
+    async def _create(self, request: web.Request, parts: list) -> web.Response:
+        match = _TY_RE.search(request.headers.get("Content-Type", ""))
+        if not match:
+            return self._error(400, "missing ty in Content-Type")
+        ty = int(match.group(1))
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return self._error(400, "invalid JSON body")
+
+        if ty == 2 and not parts:
+            ae = body.get("m2m:ae", {})
+            rn = ae.get("rn") or self._new_ri("AE")
+            if rn in self.aes:
+                return self._error(409, "AE already exists")
+            self.aes[rn] = {"rn": rn, "ty": 2, "ri": self._new_ri("AE"), "ct": _now_ct(), "api": ae.get("api", rn)}
+            return web.json_response({"m2m:ae": self.aes[rn]}, status=201)
+
+        if ty == 3 and len(parts) == 1:
+            if self._ensure_ae(parts[0]) is None:
+                return self._error(404, "AE not found")
+            rn = body.get("m2m:cnt", {}).get("rn") or self._new_ri("cnt")
+            path = f"{parts[0]}/{rn}"
+            if path in self.containers:
+                return self._error(409, "container already exists")
+            self.containers[path] = _Container(path, rn, self.max_instances)
+            return web.json_response({"m2m:cnt": self.containers[path].resource()}, status=201)
+
+        if ty in (4, 23) and len(parts) == 2:
+            container = self._container(parts[0], parts[1], create=True)
+            if container is None:
+                return self._error(404, "container not found")
+            if ty == 4:
+                return self._create_cin(container, body.get("m2m:cin", {}))
+            sub = body.get("m2m:sub", {})
+            rn = sub.get("rn") or self._new_ri("sub")
+            if rn in container.subscriptions:
+                return self._error(409, "subscription already exists")
+            container.subscriptions[rn] = {"rn": rn, "ty": 23, "ri": self._new_ri("sub"), "ct": _now_ct(),
+                                           "nu": list(sub.get("nu") or []), "enc": sub.get("enc") or {},
+                                           "nct": sub.get("nct", 1)}
+            return web.json_response({"m2m:sub": container.subscriptions[rn]}, status=201)
+
+        return self._error(400, f"ty={ty} not supported at this path")
+
+    def _create_cin(self, container: _Container, cin: dict) -> web.Response:
+        if "con" not in cin:
+            return self._error(400, "content instance without con")
+        ri = self._new_ri("4-")
+        rn = cin.get("rn") or ri
+        if rn in container.names:
+            return self._error(409, "content instance already exists")
+        if len(container.instances) == container.instances.maxlen:
+            container.names.discard(container.instances[0]["rn"])
+        container.names.add(rn)
+        resource = {"rn": rn, "ty": 4, "ri": ri, "pi": container.path, "ct": _now_ct(), "lbl": cin.get("lbl", []),
+                    "con": cin["con"], "cs": len(cin["con"]) if isinstance(cin["con"], str) else None}
+        container.instances.append(resource)
+        self._stats["cin_created"] += 1
+        for sub in container.subscriptions.values():
+            nets = sub["enc"].get("net") or [3]
+            if 3 in nets:
+                task = asyncio.create_task(self._notify(container, sub, resource))
+                self._notify_tasks.add(task)
+                task.add_done_callback(self._notify_tasks.discard)
+        return web.json_response({"m2m:cin": resource}, status=201)
+
+    async def _notify(self, container: _Container, sub: dict, resource: dict):
+        body = {"m2m:sgn": {"nev": {"rep": {"m2m:cin": resource}, "net": 3},
+                            "sur": f"{self.cse_name}/{container.path}/{sub['rn']}"}}
+        headers = {"X-M2M-Origin": self.cse_name, "X-M2M-RI": resource["ri"],
+                   "Content-Type": "application/vnd.onem2m-ntfy+json"}
+        for url in sub["nu"]:
+            started = time.perf_counter()
+            try:
+                async with self._session.post(url, json=body, headers=headers) as response:
+                    await response.read()
+                    ok = response.status < 400
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ok = False
+            self._notify_latency.append(time.perf_counter() - started)
+            self._stats["notifications_sent" if ok else "notifications_failed"] += 1
+
+    def _retrieve(self, request: web.Request, parts: list) -> web.Response:
+        if len(parts) == 1:
+            ae = self.aes.get(parts[0])
+            return web.json_response({"m2m:ae": ae}) if ae else self._error(404, "AE not found")
+        container = self._container(parts[0], parts[1], create=False) if len(parts) >= 2 else None
+        if container is None:
+            return self._error(404, "resource not found")
+        if len(parts) == 3:
+            if parts[2] == "la":
+                if not container.instances:
+                    return self._error(404, "no content instance")
+                return web.json_response({"m2m:cin": container.instances[-1]})
+            sub = container.subscriptions.get(parts[2])
+            return web.json_response({"m2m:sub": sub}) if sub else self._error(404, "subscription not found")
+        if len(parts) != 2:
+            return self._error(404, "resource not found")
+
+        query = request.query
+        if query.get("rcn") != "4":
+            return web.json_response({"m2m:cnt": container.resource()})
+        cra = query.get("cra")
+        lim = int(query.get("lim", 0) or 0)
+        ofst = int(query.get("ofst", 0) or 0)
+        cins = [c for c in reversed(container.instances) if not cra or c["ct"] > cra[:15]]
+        cins = cins[ofst:ofst + lim] if lim else cins[ofst:]
+        return web.json_response({"m2m:cnt": {**container.resource(), "cin": cins}})
+
+    def _delete(self, parts: list) -> web.Response:
+        if len(parts) == 3:
+            container = self._container(parts[0], parts[1], create=False)
+            if container is not None and container.subscriptions.pop(parts[2], None) is not None:
+                return web.json_response({}, status=200)
+        if len(parts) == 2 and self.containers.pop(f"{parts[0]}/{parts[1]}", None) is not None:
+            return web.json_response({}, status=200)
+        return self._error(404, "resource not found")
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        latencies = sorted(self._notify_latency)
+
+        def pct(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+        return web.json_response({
+            **self._stats,
+            "notifications_pending": len(self._notify_tasks),
+            "notify_p50_ms": pct(0.50),
+            "notify_p95_ms": pct(0.95),
+            "notify_p99_ms": pct(0.99),
+            "containers": {path: {"instances": len(c.instances), "subscriptions": sorted(c.subscriptions)}
+                           for path, c in self.containers.items()},
+        })
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7579)
+    parser.add_argument("--cse", default="Mobius")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="mean added response latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- jitter around --latency-ms")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API requests answered with HTTP 500")
+    parser.add_argument("--max-instances", type=int, default=10000, help="content instances kept per container")
+    parser.add_argument("--strict", action="store_true", help="404 instead of creating missing AEs/containers")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    emulator = MobiusEmulator(cse_name=args.cse, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              error_rate=args.error_rate, max_instances=args.max_instances, strict=args.strict)
+    web.run_app(emulator.app(), host=args.host, port=args.port, access_log=None)
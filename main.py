@@ -1,30 +1,70 @@
 import numpy as np
 import logging
 import json
+import hmac
 import time
 import os
 import asyncio
 import requests
-import pandas as pd
-import io
-import csv
-import codecs
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, FileResponse
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, NamedTuple
 from datetime import datetime, timedelta, timezone, time as dt_time
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import Response, Request
 # Import Mobius client and configuration
-from mobius_client import create_content_instance, retrieve_all_content_instances, retrieve_latest_content_instance
+from mobius_client import aretrieve_all_content_instances, aretrieve_latest_content_instance, aclose as close_mobius_client
+from config import MOBIUS_URL as MOBIUS_BASE_URL, CSE_NAME, NOTIFICATION_URL
 from config import AE_NAME, MOCK_DATA_MODE, REQUEST_TIMEOUT, CNT_STATUS, CNT_NOISE, CNT_RAW, CNT_APOLOGY
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
+from config import INFERENCE_BACKEND, INFERENCE_XLA, TFLITE_MODEL_PATH
+from config import EVENT_LOG_PATH, EVENT_LOG_BATCH_SIZE, EVENT_LOG_FLUSH_INTERVAL, EVENT_LOG_MAX_QUEUE_SIZE, MOBIUS_SYNC_INTERVAL, MOBIUS_SYNC_PAGE_SIZE, CSV_CHUNK_SIZE
+from config import REPORT_RENDER_WORKERS, REPORT_CHART_CACHE_SIZE, REPORT_PDF_MAX_ROWS, REPORT_PDF_TABLE_CHUNK_ROWS, REPORT_SPOOL_MAX_BYTES
+from config import REPORT_JOB_DIR, REPORT_JOB_MAX_CONCURRENT, REPORT_JOB_MAX_PENDING, REPORT_JOB_TTL_SECONDS
+from config import WS_QUEUE_SIZE, WS_OVERFLOW_POLICY, WS_SEND_TIMEOUT, METRICS_ACTIVE_HOUSE_WINDOW
+from config import PROFILER_ADMIN_TOKEN, PROFILER_MAX_SECONDS, PROFILER_MAX_HZ
+from config import WRITE_BEHIND_MAX_IN_FLIGHT, WRITE_BEHIND_QUEUE_SIZE, WRITE_BEHIND_SPOOL_PATH, WRITE_BEHIND_REPLAY_INTERVAL, WRITE_BEHIND_FSYNC
+from config import WRITE_BEHIND_SPOOL_MAX_BYTES
+from config import INFERENCE_BATCH_WINDOW_MS, INFERENCE_MAX_BATCH_SIZE, INFERENCE_WORKERS, INFERENCE_MAX_QUEUE_SIZE, BLOCKING_IO_WORKERS
 # Import AI model functions
-from ai_engine import load_ai_model_v2, predict_noise_v2, preprocess_audio_for_v2
+from write_behind import MobiusWriteBehind
+from event_log import EventLog
+from mobius_sync import MobiusSync
+from noise_aggregates import NoiseAggregates
+from ws_hub import WebSocketHub
+from ws_codec import ENCODINGS as WS_ENCODINGS
+from notification_decoder import decode_notification, decode_binary_packet, decode_sound, NotificationDecodeError
+from report_jobs import ReportJobManager, ReportJobsBusyError, write_artifact, JOB_DONE
+from profiler import Profiler, ProfilerBusyError, ProfilerUnavailableError
+from metrics import STAGE, PACKETS, SEVERITY, register_gauge, render as render_metrics
+from ai_engine import load_ai_model_v2, get_model_info, InferenceScheduler, InferenceOverloadedError
+
+event_log = EventLog(EVENT_LOG_PATH, batch_size=EVENT_LOG_BATCH_SIZE, flush_interval=EVENT_LOG_FLUSH_INTERVAL,
+                     max_queue_size=EVENT_LOG_MAX_QUEUE_SIZE)
+# 가구별 요일×시간 / 등급 / 소음 종류 / 일별 Lmax 집계 (이벤트 로그 기록 시 증분 갱신)
+noise_aggregates = NoiseAggregates()
+event_log.add_listener(noise_aggregates.add_many)
+
+# 리포트 모듈(차트/CSV/PDF, matplotlib·ReportLab 포함)은 첫 리포트 요청 시에만 로드
+# (수집 전용 워커의 기동 시간과 상주 메모리 절약)
+_report_renderer = None
+
+def load_reports():
+    import report_renderer
+    return report_renderer
+
+def get_report_renderer():
+    global _report_renderer
+    if _report_renderer is None:
+        _report_renderer = load_reports().ReportRenderer(
+            event_log, noise_aggregates, workers=REPORT_RENDER_WORKERS, cache_entries=REPORT_CHART_CACHE_SIZE,
+            table_max_rows=REPORT_PDF_MAX_ROWS, table_chunk_rows=REPORT_PDF_TABLE_CHUNK_ROWS, spool_max_bytes=REPORT_SPOOL_MAX_BYTES,
+        )
+    return _report_renderer
 
-all_analysis_history = []
+mobius_sync = MobiusSync(event_log, container_name=CNT_NOISE, interval=MOBIUS_SYNC_INTERVAL, page_size=MOBIUS_SYNC_PAGE_SIZE)
 MOBIUS_URL = "https://onem2m.iotcoss.ac.kr/Mobius/ae_Namsan/cnt_noise/la"
 HEADERS = {
     "Accept": "application/json",
@@ -43,7 +83,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-from collections import deque
+from noise_metrics import RollingLeq, NoiseMetrics
 
 # --- State Management & Constants ---
 class HouseState(BaseModel):
@@ -58,26 +98,43 @@ class HouseState(BaseModel):
     apology_sent_time: str | None = None
     lmax_exceed_count: int = 0 # Lmax 초과 횟수 카운트
 
+inference_scheduler = InferenceScheduler(
+    window_ms=INFERENCE_BATCH_WINDOW_MS,
+    max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+    num_workers=INFERENCE_WORKERS,
+    max_queue_size=INFERENCE_MAX_QUEUE_SIZE,
+)
+# Mobius 업로드는 응답을 기다리지 않고 백그라운드에서 처리 (장애 시 디스크 저널에 저장 후 재전송)
+mobius_writer = MobiusWriteBehind(
+    journal_path=WRITE_BEHIND_SPOOL_PATH,
+    max_in_flight=WRITE_BEHIND_MAX_IN_FLIGHT,
+    max_queue=WRITE_BEHIND_QUEUE_SIZE,
+    replay_interval=WRITE_BEHIND_REPLAY_INTERVAL,
+    fsync=WRITE_BEHIND_FSYNC,
+    max_spool_bytes=WRITE_BEHIND_SPOOL_MAX_BYTES,
+)
+# 이벤트 루프를 막는 동기 호출은 여기서 실행
+blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_IO_WORKERS, thread_name_prefix="blocking-io")
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(blocking_executor, lambda: func(*args, **kwargs))
+
 house_states: Dict[str, HouseState] = {}
 QUIET_PERIOD_SECONDS = 5
 VIBRATION_PEAK_THRESHOLD = 0.3
 
-# --- Moving Average Buffers ---
-noise_buffer: Dict[str, deque] = {} # {house_id: deque([db, db, ...], maxlen=300)}
+# --- Rolling Leq Engines ---
+noise_metrics: Dict[str, RollingLeq] = {} # {house_id: 최근 5분 시간 버킷 기반 Leq 엔진}
 
-def update_noise_metrics(house_id: str, current_db: float):
-    if house_id not in noise_buffer:
-        noise_buffer[house_id] = deque(maxlen=300) # 최대 5분(1초당 1개 기준 300개)
-    
-    noise_buffer[house_id].append(current_db)
-    data = list(noise_buffer[house_id])
-    
-    # 1분 평균 (최근 60개)
-    avg_1min = sum(data[-60:]) / len(data[-60:]) if len(data) >= 60 else sum(data)/len(data)
-    # 5분 평균 (전체 300개)
-    avg_5min = sum(data) / len(data)
-    
-    return round(avg_1min, 2), round(avg_5min, 2)
+def update_noise_metrics(house_id: str, current_db: float, timestamp: datetime, exceeded: bool = False) -> NoiseMetrics:
+    """
+    패킷 타임스탬프 기준 1분/5분 등가소음도(Leq), 5분 Lmax, Lmax 초과 횟수를 갱신 (패킷당 O(1)).
+    """
+    engine = noise_metrics.get(house_id)
+    if engine is None:
+        engine = noise_metrics[house_id] = RollingLeq()
+    return engine.add(timestamp.timestamp(), current_db, exceeded)
 
 # --- Pydantic Models ---
 class MetaData(BaseModel):
@@ -103,6 +160,8 @@ class AnalysisResult(BaseModel):
     db_level: float
     avg_1min: float = 0.0
     avg_5min: float = 0.0
+    lmax_5min: float = 0.0
+    lmax_exceed_5min: int = 0
     severity: str
     is_external: bool = False
     duration: float = 0.0
@@ -154,19 +213,19 @@ async def mock_data_sender():
     logger.info("MOCK DATA MODE: Starting sender.")
     while True:
         await asyncio.sleep(2)
-        if not active_websocket_connections: continue
+        if not ws_hub.has_clients: continue
         mock_data = await generate_mock_output_data()
         mock_dict = mock_data.dict(exclude_none=True)
         mock_dict["is_mock_data"] = True
-        for connection in active_websocket_connections:
-            try: await connection.send_json(mock_dict)
-            except: pass
+        ws_hub.broadcast(mock_dict, mock_dict.get("house_id"))
 
 app = FastAPI()
 app.add_middleware(
     CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
+warmup_task: Optional[asyncio.Task] = None
+
 @app.on_event("startup")
 async def startup_event():
     # 1. 모의 데이터 생성 태스크 (오타 수정: asyncio.create_task)
@@ -175,15 +234,35 @@ async def startup_event():
         logger.info("📡 모의 데이터 송신 시작...")
 
     # 2. AI 모델 로드
-    if not load_ai_model_v2():
+    if not load_ai_model_v2(backend=INFERENCE_BACKEND, xla=INFERENCE_XLA, tflite_path=TFLITE_MODEL_PATH):
         logger.error("CRITICAL: AI 모델 V2 로드 실패!")
+    inference_scheduler.start()
+    await mobius_writer.start()
+    await run_blocking(noise_aggregates.rebuild, event_log)
+    event_log.start()
+    await mobius_sync.start()
+    await report_jobs.start()
+
+    # 3. 모든 입력 shape 버킷 워밍업 후 Mobius 구독 (워밍업 전 실시간 패킷이 그래프 트레이싱 비용을 치르지 않도록)
+    global warmup_task
+    warmup_task = asyncio.create_task(warm_up_and_subscribe())
+
+async def warm_up_and_subscribe():
+    try:
+        await run_blocking(inference_scheduler.warm_up)
+    except Exception as e:
+        logger.error(f"CRITICAL: 추론 워밍업 실패 (/ready 503 유지): {e}")
+    await run_blocking(subscribe_mobius_notifications)
 
-    # 3. Mobius 자동 구독 설정 (실시간 아두이노 연동용)
-    # 리더님, ngrok 주소 바뀔 때마다 여기를 업데이트해주시면 됩니다.
-    CURRENT_NGROK_URL = "https://88d0c49bd9cc.ngrok-free.app/notification" 
+def subscribe_mobius_notifications():
+    """
+    Mobius 자동 구독 설정 (실시간 아두이노 연동용)
+    """
+    # ngrok 주소가 바뀌면 NOTIFICATION_URL 환경 변수로 지정 (부하 테스트 시 MOBIUS_URL로 로컬 에뮬레이터 지정)
+    CURRENT_NGROK_URL = NOTIFICATION_URL
     import random
     sub_name = f"sub_v3_{random.randint(1, 999)}"
-    sub_url = f"https://onem2m.iotcoss.ac.kr/Mobius/{AE_NAME}/{CNT_NOISE}"
+    sub_url = f"{MOBIUS_BASE_URL}/{CSE_NAME}/{AE_NAME}/{CNT_NOISE}"
     sub_body = {
         "m2m:sub": {
             "rn": sub_name,
@@ -205,6 +284,20 @@ async def startup_event():
     except:
         pass
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    inference_scheduler.stop()
+    blocking_executor.shutdown(wait=False)
+    await mobius_sync.stop()
+    await report_jobs.stop()
+    if _report_renderer is not None:
+        _report_renderer.stop()
+    await mobius_writer.stop()
+    await close_mobius_client()
+    event_log.close()
+
 # --- Helper Functions ---
 def amplitude_to_db(amplitude: int) -> float:
     if amplitude == 0: return 0.0
@@ -215,73 +308,136 @@ def analyze_vibration_peaks(vibration_z_list: np.ndarray, threshold: float = VIB
     peaks = np.where(vibration_z_list > threshold)[0]
     return len(peaks)
 
-def create_waveform_image(audio_signature: List[float]) -> io.BytesIO:
-    if not audio_signature: return None
-    fig, ax = plt.subplots(figsize=(8, 2))
-    ax.plot(audio_signature, color='#3182F6', linewidth=1)
-    ax.set_title('Event Waveform', fontsize=10)
-    ax.axis('off')
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-# --- PDF Imports ---
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import inch, mm
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Image, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.utils import ImageReader
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-
-active_websocket_connections: List[WebSocket] = []
-
-def create_noise_heatmap_image(logs: List[Dict]) -> io.BytesIO:
-    if not logs: return None
-    event_data = []
-    for log in logs:
-        severity = log.get("analysis", {}).get("severity")
-        if severity in ["Red", "Yellow"]:
-            try:
-                ts = datetime.fromisoformat(log.get("timestamp").replace("Z",""))
-                event_data.append({"weekday": ts.weekday(), "hour": ts.hour})
-            except: continue
-    if not event_data: return None
-    df = pd.DataFrame(event_data)
-    heatmap_data = df.pivot_table(index='weekday', columns='hour', aggfunc='size', fill_value=0)
-    heatmap_data = heatmap_data.reindex(index=range(7), columns=range(24), fill_value=0)
-    days = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    fig, ax = plt.subplots(figsize=(8, 3))
-    cax = ax.pcolormesh(heatmap_data.columns, heatmap_data.index, heatmap_data.values, cmap='YlOrRd', shading='auto')
-    fig.colorbar(cax, label='Event Count')
-    ax.set_title('Weekly Heatmap', fontsize=10)
-    ax.set_yticks(np.arange(7) + 0.5)
-    ax.set_yticklabels(days, fontsize=8)
-    ax.invert_yaxis()
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
-
-def create_pie_chart_image(stats: Dict[str, int]) -> io.BytesIO:
-    labels = list(stats.keys())
-    sizes = list(stats.values())
-    if sum(sizes) == 0: return None
-    fig, ax = plt.subplots(figsize=(5, 3))
-    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
-    ax.axis('equal')
-    buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+class PacketGrade(NamedTuple):
+    calc_db: float
+    num_peaks: int
+    metrics: NoiseMetrics
+    severity: str
+    review_msg: str
+    is_external: bool
+    state: HouseState
+
+def grade_packet(house_id: str, timestamp: str, raw_amp: int, vibration_np: np.ndarray, vibration_max: float,
+                 result_label: str, predicted_prob: float) -> PacketGrade:
+    """
+    법적 기준 + 진동 하이브리드 등급 판정과 가구 상태(Loud/Quiet, Lmax 누적) 갱신.
+    """
+    calc_db = amplitude_to_db(raw_amp)
+    num_peaks = analyze_vibration_peaks(vibration_np)
+    
+    current_time = datetime.fromisoformat(timestamp.replace("Z",""))
+    
+    # 시간대 파악 (주간: 06~22시, 야간: 22~06시)
+    current_hour = current_time.hour
+    is_night = current_hour >= 22 or current_hour < 6
+    
+    # [Step 1] 법적 기준치 설정
+    min_threshold = 34.0 if is_night else 39.0
+    max_db_limit = 52.0 if is_night else 57.0 # Lmax 기준
+    suin_limit = 35.0 if is_night else 40.0 # 수인한도
+    airborne_limit = 40.0 if is_night else 45.0 # 공기전달 소음 기준 (5분 평균)
+
+    # [신규] 1분/5분 등가소음도 계산 (Leq_1min, Leq_5min: 에너지 평균, 타임스탬프 기준)
+    metrics = update_noise_metrics(house_id, calc_db, current_time, exceeded=calc_db >= max_db_limit)
+    avg_1min, avg_5min = metrics.leq_1min, metrics.leq_5min
+
+    state = house_states.get(house_id, HouseState())
+
+    # Lmax 초과 횟수 카운트
+    if calc_db >= max_db_limit:
+        state.lmax_exceed_count += 1
+        logger.info(f"⚠️ [Lmax 초과] {calc_db:.1f}dB 감지 (누적: {state.lmax_exceed_count}회)")
+
+    # [신규] 법적 검토 메시지 생성
+    legal_review = []
+    if avg_1min > suin_limit: legal_review.append("환경분쟁조정위 수인한도 초과")
+    elif avg_1min > min_threshold: legal_review.append("직접충격 소음 주의 단계")
+    
+    if avg_5min > airborne_limit: legal_review.append("공기전달 소음 기준 위반")
+    
+    if calc_db > max_db_limit: legal_review.append(f"최고소음도(Lmax) 기준 초과 감지")
+    if state.lmax_exceed_count >= 3: legal_review.append("최고소음도 반복 발생 (분쟁 시 매우 불리)")
+
+    review_msg = " | ".join(legal_review) if legal_review else "법적 기준 이내 (정상)"
+    
+    # [신규] 외부 소음(thunderstorm, car_horn, siren) 예외 처리
+    external_noises = ["thunderstorm", "car_horn", "siren"]
+    is_external = any(ext in result_label.lower() for ext in external_noises)
+
+    if is_external:
+        sev = "Green"
+        logger.info(f"🍃 [{house_id}] 외부 소음 감지({result_label}): 무조건 Green 판정")
+    elif calc_db < min_threshold and avg_1min < min_threshold:
+        # 법적 기준 미달이면 AI가 뭐라고 하든 무조건 Green (기록만 함, 중재 안 함)
+        sev = "Green"
+        logger.info(f"[{house_id}] {calc_db:.1f}dB < {min_threshold}dB: 법적 기준치 미달 (Green)")
+    else:
+        # 기본적으로 기준을 넘었으므로 Yellow로 시작
+        sev = "Yellow"
+        
+        # [Step 2] 진동 하이브리드 격상 로직 (vibration_max 0.2 이상 또는 AI 발망치 고확신 시 Red)
+        is_foot = "footsteps" in result_label.lower()
+        if vibration_max >= 0.2 or (is_foot and predicted_prob > 0.7) or avg_1min > suin_limit:
+            sev = "Red"
+            logger.info(f"🚩 [{house_id}] 격상: 진동, 발망치 또는 수인한도 초과로 Red 판정")
+        
+        # [Step 3] 진동은 없어도 소음 자체가 한계치를 넘은 경우 Red
+        if calc_db >= max_db_limit:
+            sev = "Red"
+            logger.info(f"🚩 [{house_id}] 격상: 최고소음도({calc_db:.1f}dB) 초과로 Red 판정")
+    
+    # 4. State Machine (지속 시간 체크 및 상태 유지)
+    final_sev = sev
+    
+    # 상태 업데이트 (Loud/Quiet 상태 전환)
+    if final_sev in ["Yellow", "Red"]:
+        if state.status == "quiet":
+            state.status = "loud"
+            state.start_time = current_time
+        state.last_loud_time = current_time
+    else:
+        if state.status == "loud" and (current_time - state.last_loud_time).total_seconds() >= 5:
+            state.status = "quiet"
+            state.start_time = None
+    house_states[house_id] = state
+
+    return PacketGrade(calc_db, num_peaks, metrics, final_sev, review_msg, is_external, state)
+
+# 대시보드 WebSocket 전파: 클라이언트별 제한 큐 + 동시 전송 (느린 클라이언트가 핸들러를 막지 않음)
+ws_hub = WebSocketHub(queue_size=WS_QUEUE_SIZE, overflow_policy=WS_OVERFLOW_POLICY, send_timeout=WS_SEND_TIMEOUT)
+
+# --- Prometheus 게이지: /metrics 스크레이프 시점에만 현재 값을 읽음 ---
+# {house_id: 마지막 패킷 수신 시각 (monotonic)}, 오래된 순서 유지 → 윈도우 밖 항목은 앞에서부터 제거
+house_last_seen: "OrderedDict[str, float]" = OrderedDict()
+
+def _prune_house_last_seen(now: float):
+    cutoff = now - METRICS_ACTIVE_HOUSE_WINDOW
+    while house_last_seen:
+        house_id, seen = next(iter(house_last_seen.items()))
+        if seen >= cutoff:
+            break
+        del house_last_seen[house_id]
+
+def touch_house(house_id: str):
+    # 임의의 house_id 가 계속 들어와도 윈도우 안의 집만 남으므로 메모리가 무한히 늘지 않음
+    now = time.monotonic()
+    house_last_seen[house_id] = now
+    house_last_seen.move_to_end(house_id)
+    _prune_house_last_seen(now)
+
+def count_active_houses() -> int:
+    _prune_house_last_seen(time.monotonic())
+    return len(house_last_seen)
+
+register_gauge("noise_inference_queue_depth", "Requests waiting for an inference batch", lambda: inference_scheduler.queue_depth)
+register_gauge("noise_inference_busy_workers", "Inference workers running a batch", lambda: inference_scheduler.busy_workers)
+register_gauge("noise_mobius_write_queue_depth", "Records queued for Mobius upload", lambda: mobius_writer.queue_depth)
+register_gauge("noise_mobius_writes_in_flight", "Mobius uploads in progress", lambda: mobius_writer.in_flight)
+register_gauge("noise_mobius_spooling", "1 while uploads are diverted to the disk journal", lambda: int(mobius_writer.spooling))
+register_gauge("noise_event_log_queue_depth", "Events waiting for the event log writer", lambda: event_log.queue_depth)
+register_gauge("noise_active_houses", f"Houses with a packet in the last {METRICS_ACTIVE_HOUSE_WINDOW:.0f}s", count_active_houses)
+register_gauge("noise_websocket_clients", "Connected dashboard WebSocket clients", lambda: ws_hub.client_count)
+register_gauge("noise_websocket_queued_messages", "Messages queued across all WebSocket clients", lambda: ws_hub.queued_messages)
 
 # --- Endpoints ---
 
@@ -328,12 +484,11 @@ async def handle_apology_notification(request: Request):
             }
             
             # 히스토리에 저장 (리포트용)
-            all_analysis_history.append(data)
+            event_log.append(data)
             
             # WebSocket 전파
-            if active_websocket_connections:
-                await asyncio.gather(*[c.send_json(data) for c in active_websocket_connections], return_exceptions=True)
-                logger.info(f"📢 [사과 전파 완료] {house_id} -> 대시보드")
+            ws_hub.broadcast(data, data.get("house_id"))
+            logger.info(f"📢 [사과 전파 완료] {house_id} -> 대시보드")
 
     except Exception as e:
         logger.error(f"❌ Apology Error: {e}")
@@ -341,44 +496,50 @@ async def handle_apology_notification(request: Request):
     return {"status": "ok"}
 
 @app.post("/notification")
-async def handle_mobius_notification(request: Request): 
+async def handle_mobius_notification(request: Request):
+    started = time.perf_counter()
+    result = await process_mobius_notification(request)
+    # 처리 결과별 카운트 + 핸들러 전체 지연 (JSONResponse는 추론 과부하 503뿐)
+    PACKETS.labels(result.get("status", "unknown") if isinstance(result, dict) else "overloaded").inc()
+    STAGE["total"].observe(time.perf_counter() - started)
+    return result
+
+async def process_mobius_notification(request: Request):
     try:
-        # [수정] 여기서부터 body를 가져옵니다.
-        body = await request.json()
-        if not body:
-            return {"status": "ignored", "reason": "empty body"}
-
-        
-        sgn = body.get("m2m:sgn") or body.get("sgn")
-        if not sgn: return {"status": "ignored"}
-        
-        rep = sgn["nev"]["rep"]
-        raw_con = rep.get("m2m:cin", {}).get("con") or rep.get("cin", {}).get("con")
-        
-        # JSON 문자열인 경우 안전하게 파싱
-        if isinstance(raw_con, str):
-            try:
-                payload_dict = json.loads(raw_con)
-            except json.JSONDecodeError:
-                logger.error("❌ JSON 파싱 실패: 데이터 형식이 올바르지 않습니다.")
-                return {"status": "error", "message": "Invalid JSON in con"}
-        else:
-            payload_dict = raw_con
+        decode_started = time.perf_counter()
+        # body를 bytes 그대로 받아 알림과 con을 한 번에 디코딩 (orjson 사용 가능 시 orjson)
+        body = await request.body()
+        try:
+            if request.headers.get("content-type", "").startswith("application/octet-stream"):
+                # 센서 직접 전송: [u32 헤더 길이][JSON 헤더][int16 LE PCM]
+                payload_dict, audio_np = decode_binary_packet(body)
+            else:
+                payload_dict = decode_notification(body)
+                if payload_dict is None:
+                    return {"status": "ignored", "reason": "empty body"}
+                audio_np = None
+        except NotificationDecodeError as e:
+            logger.error(f"❌ 알림 디코딩 실패: {e}")
+            return {"status": "error", "message": str(e)}
 
         # New Payload Parse
         house_id = payload_dict.get("house_id", "unknown")
         timestamp = payload_dict.get("timestamp", datetime.now().isoformat())
         meta = payload_dict.get("meta", {})
         payload = payload_dict.get("payload", {})
-        # 1. Data Prep & Validation (리더 규리님 수정 버전)
-        # payload_dict에서 실제 데이터가 들어있는 payload 부분을 먼저 가져옵니다.
-        sensor_data = payload_dict.get("payload", {}) 
-        sound_raw = sensor_data.get("sound_raw", []) # payload 안에서 sound_raw 추출
+        # 1. Data Prep & Validation
+        # sound_raw(정수 리스트), sound_pcm16(base64 int16 PCM) 모두 지원. PCM은 np.frombuffer로 복사 없이 해석
         vibration_z = payload.get("vibration", {}).get("z", [])
         raw_max_amplitude = payload.get("raw_max_amplitude", 0)
-
-        audio_np = np.array(sound_raw, dtype=np.float32)
-        print(f"🔍 [DEBUG] 수신된 오디오 샘플 개수: {len(audio_np)}개")
+        if audio_np is None:
+            try:
+                audio_np = decode_sound(payload)
+            except NotificationDecodeError as e:
+                logger.error(f"❌ 오디오 디코딩 실패: {e}")
+                return {"status": "error", "message": str(e)}
+        STAGE["decode"].observe(time.perf_counter() - decode_started)
+        touch_house(house_id)
+        logger.debug(f"수신된 오디오 샘플 개수: {len(audio_np)}개")
         # 3. 데이터 보정 (Zero-Padding)
         # [Validation] Data Length Check
         MIN_REQUIRED_SAMPLES = 10 # Lowered for testing connectivity
@@ -386,127 +547,46 @@ async def handle_mobius_notification(request: Request):
             logger.warning(f"Skipping analysis: Data too short ({len(audio_np)})")
             return {"status": "skipped", "message": "Insufficient data length"}
         if len(audio_np) < 1000:
-            audio_np = np.concatenate([audio_np, np.zeros(1000 - len(audio_np))])
+            audio_np = np.concatenate([audio_np, np.zeros(1000 - len(audio_np), dtype=np.float32)])
+
+        # 2. AI Inference: 패킷 하나를 한 번만 전처리(리샘플 + YAMNet)해서 FeatureBundle로 재사용
+        sr_val = meta.get("sampling_rate", "16000Hz")
+        sr_int = int(str(sr_val).lower().replace("hz",""))
+        # 동시에 들어온 요청들과 묶어서 한 번에 추론 (micro-batching)
+        with STAGE["inference"].time():
+            features, result_label, predicted_prob = await inference_scheduler.analyze(audio_np, sr_int, vibration_z)
+        if features is None:
+            return {"status": "error", "message": "Inference failed"}
 
-        vibration_z = payload_dict.get("payload", {}).get("vibration", {}).get('z', [])
-        vibration_np = np.array(vibration_z)
+        vibration_np = features.vibration_z
         # Calculate pure shock by removing 1.0g gravity component
-        vibration_max = float(np.max(np.abs(vibration_np - 1.0))) if vibration_np.size > 0 else 0.0
+        vibration_max = features.vibration_max
         
         # Signature
-        target_sig_len = 300
-        audio_signature = audio_np.tolist()
-        if len(audio_np) > target_sig_len:
-            indices = np.linspace(0, len(audio_np)-1, target_sig_len).astype(int)
-            audio_signature = audio_np[indices].tolist()
-
-        # 2. AI Inference
-        sr_val = meta.get("sampling_rate", "16000Hz")
-        sr_int = int(str(sr_val).lower().replace("hz",""))
-        audio_input = audio_np.flatten()
-        processed = preprocess_audio_for_v2(audio_np, sr=sr_int)
-        if hasattr(processed, 'numpy'): # 텐서 형태일 경우
-            processed_input = processed.numpy().flatten()
-        else: # 넘파이 형태일 경우
-            processed_input = np.array(processed).flatten()
-        result_label, predicted_prob = predict_noise_v2(processed, sr=sr_int, vibration_z = vibration_z)
+        audio_signature = features.signature(300)
         
         logger.info(f"✅ 분석 성공! 결과: {result_label} ({predicted_prob:.2f})")
     
-        # 3. Grading (법적 기준 + 진동 하이브리드 로직)
-        raw_amp = payload.get("raw_max_amplitude", 0)
-        calc_db = amplitude_to_db(raw_amp)
-        num_peaks = analyze_vibration_peaks(vibration_np)
-        
-        # [신규] 1분/5분 평균 계산 (Leq_1min, Leq_5min)
-        current_time = datetime.fromisoformat(timestamp.replace("Z",""))
-        avg_1min, avg_5min = update_noise_metrics(house_id, calc_db)
-        
-        # 시간대 파악 (주간: 06~22시, 야간: 22~06시)
-        current_hour = current_time.hour
-        is_night = current_hour >= 22 or current_hour < 6
-        
-        # [Step 1] 법적 기준치 설정
-        min_threshold = 34.0 if is_night else 39.0
-        max_db_limit = 52.0 if is_night else 57.0 # Lmax 기준
-        suin_limit = 35.0 if is_night else 40.0 # 수인한도
-        airborne_limit = 40.0 if is_night else 45.0 # 공기전달 소음 기준 (5분 평균)
-
-        state = house_states.get(house_id, HouseState())
-
-        # Lmax 초과 횟수 카운트
-        if calc_db >= max_db_limit:
-            state.lmax_exceed_count += 1
-            logger.info(f"⚠️ [Lmax 초과] {calc_db:.1f}dB 감지 (누적: {state.lmax_exceed_count}회)")
-
-        # [신규] 법적 검토 메시지 생성
-        legal_review = []
-        if avg_1min > suin_limit: legal_review.append("환경분쟁조정위 수인한도 초과")
-        elif avg_1min > min_threshold: legal_review.append("직접충격 소음 주의 단계")
-        
-        if avg_5min > airborne_limit: legal_review.append("공기전달 소음 기준 위반")
-        
-        if calc_db > max_db_limit: legal_review.append(f"최고소음도(Lmax) 기준 초과 감지")
-        if state.lmax_exceed_count >= 3: legal_review.append("최고소음도 반복 발생 (분쟁 시 매우 불리)")
+        # 3. Grading (법적 기준 + 진동 하이브리드 로직) + 4. State Machine
+        with STAGE["grading"].time():
+            grade = grade_packet(house_id, timestamp, raw_max_amplitude, vibration_np, vibration_max,
+                                 result_label, predicted_prob)
+        calc_db, num_peaks, metrics, final_sev, review_msg, is_external, state = grade
+        avg_1min, avg_5min = metrics.leq_1min, metrics.leq_5min
 
-        review_msg = " | ".join(legal_review) if legal_review else "법적 기준 이내 (정상)"
-        
-        # [신규] 외부 소음(thunderstorm, car_horn, siren) 예외 처리
-        external_noises = ["thunderstorm", "car_horn", "siren"]
-        is_external = any(ext in result_label.lower() for ext in external_noises)
-
-        if is_external:
-            sev = "Green"
-            logger.info(f"🍃 [{house_id}] 외부 소음 감지({result_label}): 무조건 Green 판정")
-        elif calc_db < min_threshold and avg_1min < min_threshold:
-            # 법적 기준 미달이면 AI가 뭐라고 하든 무조건 Green (기록만 함, 중재 안 함)
-            sev = "Green"
-            logger.info(f"[{house_id}] {calc_db:.1f}dB < {min_threshold}dB: 법적 기준치 미달 (Green)")
-        else:
-            # 기본적으로 기준을 넘었으므로 Yellow로 시작
-            sev = "Yellow"
-            
-            # [Step 2] 진동 하이브리드 격상 로직 (vibration_max 0.2 이상 또는 AI 발망치 고확신 시 Red)
-            is_foot = "footsteps" in result_label.lower()
-            if vibration_max >= 0.2 or (is_foot and predicted_prob > 0.7) or avg_1min > suin_limit:
-                sev = "Red"
-                logger.info(f"🚩 [{house_id}] 격상: 진동, 발망치 또는 수인한도 초과로 Red 판정")
-            
-            # [Step 3] 진동은 없어도 소음 자체가 한계치를 넘은 경우 Red
-            if calc_db >= max_db_limit:
-                sev = "Red"
-                logger.info(f"🚩 [{house_id}] 격상: 최고소음도({calc_db:.1f}dB) 초과로 Red 판정")
-        
-        # 4. State Machine (지속 시간 체크 및 상태 유지)
-        current_time = datetime.fromisoformat(timestamp.replace("Z",""))
-        
-        final_sev = sev
-        
-        # 상태 업데이트 (Loud/Quiet 상태 전환)
-        if final_sev in ["Yellow", "Red"]:
-            if state.status == "quiet":
-                state.status = "loud"
-                state.start_time = current_time
-            state.last_loud_time = current_time
-        else:
-            if state.status == "loud" and (current_time - state.last_loud_time).total_seconds() >= 5:
-                state.status = "quiet"
-                state.start_time = None
-        house_states[house_id] = state
-        
         # 5. Post & Broadcast
         # [핵심 로직] 확실한 중재 제어: Yellow 또는 Red일 때만 True, Green일 때는 무조건 False
         is_mediation_active = final_sev in ["Yellow", "Red"]
 
         # A. Status to CNT_STATUS (LED 제어용 단순 등급)
         status_data = {
-            "event_id": f"STS_{datetime.now().strftime('%Y%m%d%H%M%S')}", 
+            "event_id": f"STS_{datetime.now().strftime('%Y%m%d%H%M%S%f')}", 
             "house_id": house_id, 
             "grade": final_sev, 
             "db": calc_db, 
             "timestamp": timestamp
         }
-        create_content_instance(status_data, labels=["grade"], container_name=CNT_STATUS)
+        mobius_writer.submit(CNT_STATUS, status_data, labels=["grade"])
         
         # B. Analysis 결과 구성 (상세 데이터)
         analysis_res = AnalysisResult(
@@ -515,6 +595,8 @@ async def handle_mobius_notification(request: Request):
             db_level=float(calc_db), 
             avg_1min=avg_1min,
             avg_5min=avg_5min,
+            lmax_5min=metrics.lmax_5min,
+            lmax_exceed_5min=metrics.exceed_5min,
             severity=final_sev,
             is_external=is_external,
             duration=0.0, 
@@ -525,7 +607,7 @@ async def handle_mobius_notification(request: Request):
         
         # C. 최종 출력 데이터 (중재 상태 확정 및 법적 검토 메시지 포함)
         output_data = OneM2MPlatformOutput(
-            event_id=f"EVT_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+            event_id=f"EVT_{house_id}_{datetime.now().strftime('%Y%m%d%H%M%S%f')}",
             house_id=house_id, 
             timestamp=timestamp, 
             analysis=analysis_res,
@@ -540,43 +622,149 @@ async def handle_mobius_notification(request: Request):
         out_dict["legal_review"] = review_msg
         out_dict["lmax_count"] = state.lmax_exceed_count
         
-        all_analysis_history.append(out_dict)
-        # 세션 내 히스토리가 충분히 유지되도록 제한 상향 (메모리 허용 범위 내)
-        if len(all_analysis_history) > 5000:
-            all_analysis_history.pop(0)
+        # 히스토리: 영구 이벤트 로그에 기록 (리포트/집계용)
+        event_log.append(out_dict)
 
         
         # D. oneM2M 저장: 분석 결과만 기록 (중재 발송 상태를 따로 보낼 필요 없음)
-        create_content_instance(out_dict, labels=["analysis"], container_name=CNT_NOISE)
+        mobius_writer.submit(CNT_NOISE, out_dict, labels=["analysis"])
         
         # E. 대시보드 전파: 실시간으로 중재 발송됨 상태를 화면에 띄움
-        for c in active_websocket_connections: 
-            await c.send_json(out_dict)
+        with STAGE["websocket_broadcast"].time():
+            ws_hub.broadcast(out_dict, house_id)
+        SEVERITY.labels(final_sev).inc()
         
         logger.info(f"🚀 중재 상태: {'발송' if is_mediation_active else '대기'} | 등급: {final_sev}")
         return {"status": "success", "result": result_label, "mediation": is_mediation_active}
 
+    except InferenceOverloadedError as e:
+        logger.warning(f"⏳ 추론 과부하로 요청 거부: {e}")
+        return JSONResponse(status_code=503, content={"status": "overloaded", "message": str(e)})
     except Exception as e: # 여기서 try 블록을 안전하게 닫아줍니다.
         logger.error(f"Error: {e}")
         return {"status": "error"}
     
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, house_id: Optional[str] = None, encoding: str = "json"):
+    """
+    house_id: 구독할 가구 (쉼표 구분, 생략 시 전체). 연결 후 {"action": "subscribe", "house_ids": [...]}로 변경 가능
+    encoding: "json"(기본) | "f16" | "int8" - 분석 이벤트를 바이너리 프레임으로 수신 (ws_codec 참고)
+    """
+    if encoding not in WS_ENCODINGS:
+        await websocket.close(code=1003)
+        return
     await websocket.accept()
-    active_websocket_connections.append(websocket)
+    houses = [h for h in (house_id or "").split(",") if h]
+    client = ws_hub.register(websocket, houses, encoding)
+    try:
+        while True:
+            ws_hub.handle_control(client, await websocket.receive_text())
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.info(f"WebSocket 연결 종료: {e}")
+    finally:
+        await ws_hub.unregister(client)
+
+@app.get("/ready")
+async def readiness():
+    """
+    준비 상태: 모델 로드와 워밍업(모든 입력 shape 버킷)이 끝나야 200, 그 전에는 503
+    """
+    ready = inference_scheduler.ready
+    body = {"ready": ready, "warm_up": inference_scheduler.warm_up_info}
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/stats/inference")
+async def get_inference_stats():
+    return inference_scheduler.stats()
+
+@app.get("/stats/mobius")
+async def get_mobius_writer_stats():
+    return mobius_writer.stats()
+
+@app.get("/stats/event_log")
+async def get_event_log_stats():
+    return await run_blocking(event_log.stats)
+
+@app.get("/stats/mobius_sync")
+async def get_mobius_sync_stats():
+    return mobius_sync.stats()
+
+@app.get("/aggregates/{house_id}")
+async def get_noise_aggregates(house_id: str, start_date: str, end_date: str):
+    """
+    대시보드용 집계: 시간대별/요일×시간 등급 건수, 소음 종류별 건수, 일별 Lmax
+    """
+    start_dt, end_dt = parse_report_range(start_date, end_date)
+    return noise_aggregates.summary(house_id, start_dt, end_dt)
+
+@app.get("/metrics")
+async def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+# --- Admin: 운영 중 샘플링 프로파일 (collapsed stack -> flamegraph.pl / speedscope) ---
+profiler = Profiler(max_seconds=PROFILER_MAX_SECONDS, max_hz=PROFILER_MAX_HZ)
+
+def require_admin(request: Request):
+    # 토큰 미설정 시 엔드포인트 자체를 숨김
+    if not PROFILER_ADMIN_TOKEN:
+        raise HTTPException(404, "Not Found")
+    if not hmac.compare_digest(request.headers.get("x-admin-token", ""), PROFILER_ADMIN_TOKEN):
+        raise HTTPException(403, "Forbidden")
+
+@app.get("/admin/profile")
+async def get_profile(request: Request, seconds: float = 10.0, hz: float = 100.0, mode: str = "sampler",
+                      idle: bool = False, subprocesses: bool = False):
+    """
+    mode: "sampler"(내장, 모든 스레드: inference-worker 등) | "py-spy"(설치 시, subprocesses=true면 리포트 프로세스 풀 포함)
+    idle: 대기 중(락/큐/소켓) 스레드 샘플 포함 여부
+    """
+    require_admin(request)
     try:
-        while True: await websocket.receive_text()
-    except: active_websocket_connections.remove(websocket)
+        result = await profiler.profile(seconds, hz, mode=mode, include_idle=idle, subprocesses=subprocesses)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    except ProfilerBusyError as e:
+        raise HTTPException(409, str(e))
+    except ProfilerUnavailableError as e:
+        raise HTTPException(501, str(e))
+    filename = f"profile-{datetime.now():%Y%m%d-%H%M%S}-{result['mode']}.folded"
+    return Response(content=result["stacks"], media_type="text/plain; charset=utf-8", headers={
+        "Content-Disposition": f"attachment; filename={filename}",
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Seconds": str(result["seconds"]),
+        "X-Profile-Hz": str(result["hz"]),
+    })
+
+@app.get("/admin/profile/status")
+async def get_profile_status(request: Request):
+    require_admin(request)
+    return profiler.stats()
+
+@app.get("/stats/websocket")
+async def get_websocket_stats():
+    return ws_hub.stats()
+
+@app.get("/stats/reports")
+async def get_report_stats():
+    renderer = _report_renderer.stats() if _report_renderer is not None else {"loaded": False}
+    return {"renderer": renderer, "jobs": report_jobs.stats(), "aggregates": noise_aggregates.stats()}
+
+@app.get("/stats/models")
+async def get_model_stats():
+    return get_model_info()
 
 @app.get("/get_latest_noise_data")
 async def get_latest_noise_data():
-    content = retrieve_latest_content_instance()
+    content = await aretrieve_latest_content_instance()
     if content: return content
     return {"analysis": {"result": "대기 중", "db_level": 0, "severity": "Green"}}
 
 @app.get("/logs")
 async def get_logs(limit: int = 100): # 기본값을 100으로 상향하여 초기 로드시 더 많은 히스토리를 가져옴
-    logs = retrieve_all_content_instances(limit=limit)
+    logs = await aretrieve_all_content_instances(limit=limit)
     if logs is not None:
         return {"status": "success", "logs": logs}
     # Only raise 500 if it's truly None (error), but retrieve_all... returns [] on valid empty.
@@ -585,186 +773,80 @@ async def get_logs(limit: int = 100): # 기본값을 100으로 상향하여 초
     # But for now, returning success with empty list is safer for the frontend.
     return {"status": "success", "logs": []}
 
-def get_logs_for_report(house_id, start_dt, end_dt):
-    local_logs = all_analysis_history
-    platform_logs=retrieve_all_content_instances() or []
-    combined_logs = local_logs + platform_logs
-    if not combined_logs: return []
-    
-    filtered = []
-    seen_events = set()
-    for log in combined_logs:
-        eid = log.get("event_id")
-        if eid in seen_events: continue
-        
-        if log.get("house_id") != house_id: continue
-        
-        try:
-            ts_str = log.get("timestamp").replace("Z", "")
-            # UTC/KST 보정이 필요하다면 여기서 timedelta(hours=9)를 더하세요
-            ts = datetime.fromisoformat(ts_str) 
-            if start_dt <= ts <= end_dt: 
-                filtered.append(log)
-                seen_events.add(eid)
-        except: continue
-
-    return sorted(filtered, key=lambda x: x.get("timestamp", ""), reverse=True)
-
-@app.get("/report/csv")
-def get_noise_degree(avg_1min, avg_5min, timestamp_str):
+def iter_csv_report(house_id, start_dt, end_dt, chunk_size=CSV_CHUNK_SIZE):
     """
-    1분/5분 평균 소음과 시간대를 바탕으로 법적 소음 정도를 판정하는 함수
+    이벤트 로그를 시간 역순 커서로 청크 단위 조회하여 CSV 텍스트 조각을 생성 (메모리 사용량 일정)
     """
-    try:
-        # 시간대 파악 (KST 기준 보정 필요시 확인)
-        ts = datetime.fromisoformat(timestamp_str.replace("Z", ""))
-        is_night = ts.hour >= 22 or ts.hour < 6
-    except:
-        is_night = False
-
-    # 1. 직접충격 소음 기준 (1분 평균)
-    threshold_1min = 34 if is_night else 39
-    limit_1min = 35 if is_night else 40  # 수인한도 (참아야 할 한계)
+    return load_reports().iter_csv_report(event_log, house_id, start_dt, end_dt, chunk_size=chunk_size)
 
-    # 2. 공기전달 소음 기준 (5분 평균)
-    threshold_5min = 40 if is_night else 45
-
-    status = []
-
-    # 판정 로직
-    if avg_1min > limit_1min:
-        status.append(f"수인한도 초과(기준:{limit_1min}dB)")
-    elif avg_1min > threshold_1min:
-        status.append(f"법적 주의(기준:{threshold_1min}dB)")
-
-    if avg_5min > threshold_5min:
-        status.append(f"공기전달 소음 위반(기준:{threshold_5min}dB)")
-
-    if not status:
-        return "정상(생활소음 범위)"
-    
-    return " | ".join(status)
-
-
-async def get_csv_report(house_id: str, start_date: str, end_date: str):
+def parse_report_range(start_date: str, end_date: str):
     try:
         start_dt = datetime.strptime(start_date, "%Y-%m-%d")
         end_dt = datetime.combine(datetime.strptime(end_date, "%Y-%m-%d"), dt_time.max)
     except: raise HTTPException(400, "Invalid date")
-    logs = get_logs_for_report(house_id, start_dt, end_dt)
-    output = io.StringIO()
-    output.write(u'\ufeff')
-    writer = csv.writer(output)
-    writer.writerow(['timestamp', 'event', 'result', 'db', '1min_avg', '5min_avg', 'noise_degree', 'legal_review', 'lmax_count', 'prob', 'severity', 'vib_max', 'mediation'])
-    for log in logs:
-        a = log.get("analysis", {})
-        ts = log.get("timestamp")
-        degree = get_noise_degree(a.get("avg_1min", 0), a.get("avg_5min", 0), ts)
-        writer.writerow([
-            ts, log.get("event_id"), a.get("result"), a.get("db_level"),
-            a.get("avg_1min", 0), a.get("avg_5min", 0), degree,
-            log.get("legal_review", ""), log.get("lmax_count", 0),
-            a.get("probability"), a.get("severity"), a.get("vibration_max", 0), log.get("action", {}).get("mediation_sent")
-        ])
-    output.seek(0)
-    return StreamingResponse(iter([output.getvalue()]), media_type="text/csv", headers={"Content-Disposition": "attachment; filename=report.csv"})
-
-try:
-    pdfmetrics.registerFont(TTFont('Pretendard', 'Pretendard.ttf'))
-    FONT_NAME = 'Pretendard'
-except:
-    # 폰트 파일이 없을 경우를 대비한 기본값
-    FONT_NAME = 'Helvetica'
-    logger.error("❌ 한글 폰트 로드 실패! 'Pretendard.ttf' 파일 확인 필요.")
+    return start_dt, end_dt
+
+async def run_report_now(kind: str, start_date: str, end_date: str, house_id: str):
+    # 동기 다운로드도 작업 관리자를 거침 → 비동기 작업과 같은 동시 렌더링/대기 한도 적용, 동일 요청은 병합
+    start_dt, end_dt = parse_report_range(start_date, end_date)
+    try:
+        job = await report_jobs.wait(report_jobs.submit(kind, house_id, start_dt, end_dt))
+    except ReportJobsBusyError as e:
+        return JSONResponse(status_code=503, content={"status": "busy", "message": str(e)})
+    if job.status != JOB_DONE: raise HTTPException(500, f"Report generation failed: {job.error}")
+    return FileResponse(job.path, media_type=REPORT_MEDIA_TYPES[kind], filename=f"report.{kind}")
+
+@app.get("/report/csv")
+async def get_csv_report(house_id: str, start_date: str, end_date: str):
+    return await run_report_now("csv", start_date, end_date, house_id)
 
 @app.get("/report/pdf")
 async def get_pdf_report(house_id: str, start_date: str, end_date: str):
-    try:
-        start_dt = datetime.strptime(start_date, "%Y-%m-%d")
-        end_dt = datetime.combine(datetime.strptime(end_date, "%Y-%m-%d"), dt_time.max)
-    except: raise HTTPException(400, "Invalid date")
+    # 차트는 프로세스 풀에서 병렬 렌더링(캐시), PDF 조립은 스레드에서 수행 (이벤트 루프 비차단)
+    return await run_report_now("pdf", start_date, end_date, house_id)
 
-    logs = get_logs_for_report(house_id, start_dt, end_dt)
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    story = []
-    styles = getSampleStyleSheet()
-
-    korean_style = ParagraphStyle(
-        name='KoreanStyle',
-        fontName=FONT_NAME, # 등록한 폰트 적용
-        fontSize=20,
-        alignment=TA_CENTER,
-        spaceAfter=20
-    )
-    
-    # 제목에 적용
-    story.append(Paragraph(f"층간소음 분석 리포트: {house_id}", korean_style))
-    
-    # 본문용 스타일도 필요하다면 추가
-    body_style = ParagraphStyle(
-        name='BodyStyle',
-        fontName=FONT_NAME,
-        fontSize=10,
-        leading=15
-    )
-    story.append(Paragraph(f"측정 기간: {start_date} ~ {end_date}", body_style))
+# --- Report Jobs (비동기 리포트: 요청 -> 상태 조회 -> 다운로드) ---
+async def produce_pdf_report(house_id, start_dt, end_dt, path):
+    pdf = await get_report_renderer().render_pdf(house_id, start_dt, end_dt, blocking_executor)
+    await run_blocking(write_artifact, path, load_reports().iter_file(pdf))
 
-    
-    # [추가] 층간소음 기준 안내 텍스트
-    story.append(Spacer(1, 10))
-    story.append(Paragraph("<b>[층간소음 및 수인한도 기준 안내]</b>", styles['Normal']))
-    story.append(Paragraph("• 주간(06~22시): 1분 평균 39dB 초과 시 문제 소음 / 수인한도 40dB / 5분 평균 45dB 초과 시 층간소음", styles['Normal']))
-    story.append(Paragraph("• 야간(22~06시): 1분 평균 34dB 초과 시 문제 소음 / 수인한도 35dB / 5분 평균 40dB 초과 시 층간소음", styles['Normal']))
-    story.append(Paragraph("• 소음 예시: 30dB(조용한 주택가), 40dB(낮은 TV), 50dB(보통 대화), 60dB(식당 대화)", styles['Normal']))
-    story.append(Spacer(1, 10))
-
-    # Add Heatmap
-    hm = create_noise_heatmap_image(logs)
-    if hm: story.append(Image(hm, width=6*inch, height=2.5*inch))
-    
-    # Add Waveform of Critical Event
-    max_ev = None
-    for log in logs:
-        sev = log.get("analysis", {}).get("severity")
-        if sev == "Red":
-            max_ev = log
-            break
-    if max_ev:
-        sig = max_ev.get("analysis", {}).get("audio_signature")
-        wf = create_waveform_image(sig)
-        if wf: story.append(Image(wf, width=6*inch, height=1.5*inch))
-        
-    # Add Table of Events
-    if logs:
-        story.append(Spacer(1, 12))
-        story.append(Paragraph("Detailed Event Log", styles['Heading2']))
-        table_data = [['Time', 'Type', 'Max', '1m Avg', '5m Avg', 'Degree', 'Sev']]
-        for log in logs[:20]: # Show last 20 events in PDF for space
-            a = log.get("analysis", {})
-            ts_full = log.get("timestamp")
-            ts = ts_full[11:19]
-            degree = get_noise_degree(a.get("avg_1min", 0), a.get("avg_5min", 0), ts_full)
-            legal = log.get("legal_review", "N/A")
-            table_data.append([
-                ts, a.get("result"), f"{a.get('db_level',0):.1f}", 
-                f"{a.get('avg_1min',0):.1f}", f"{a.get('avg_5min',0):.1f}",
-                degree, a.get("severity")
-            ])
-        t = Table(table_data, colWidths=[0.8*inch, 1.3*inch, 0.5*inch, 0.6*inch, 0.6*inch, 1.3*inch, 0.6*inch])
-        t.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        story.append(t)
-        
-    doc.build(story)
-    buffer.seek(0)
-    return Response(content=buffer.getvalue(), media_type='application/pdf', headers={'Content-Disposition': 'attachment; filename=report.pdf'})
+async def produce_csv_report(house_id, start_dt, end_dt, path):
+    await run_blocking(write_artifact, path, iter_csv_report(house_id, start_dt, end_dt))
+
+REPORT_MEDIA_TYPES = {"pdf": "application/pdf", "csv": "text/csv"}
+
+report_jobs = ReportJobManager(
+    {"pdf": produce_pdf_report, "csv": produce_csv_report}, artifact_dir=REPORT_JOB_DIR,
+    max_concurrent=REPORT_JOB_MAX_CONCURRENT, max_pending=REPORT_JOB_MAX_PENDING, ttl_seconds=REPORT_JOB_TTL_SECONDS,
+)
+
+class ReportJobRequest(BaseModel):
+    kind: str = "pdf"  # "pdf" | "csv"
+    house_id: str
+    start_date: str
+    end_date: str
+
+@app.post("/reports", status_code=202)
+async def create_report_job(req: ReportJobRequest):
+    if req.kind not in REPORT_MEDIA_TYPES:
+        raise HTTPException(400, f"Unknown report kind: {req.kind}")
+    start_dt, end_dt = parse_report_range(req.start_date, req.end_date)
+    try:
+        job = report_jobs.submit(req.kind, req.house_id, start_dt, end_dt)
+    except ReportJobsBusyError as e:
+        return JSONResponse(status_code=503, content={"status": "busy", "message": str(e)})
+    return job.to_dict()
+
+@app.get("/reports/{job_id}")
+async def get_report_job(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None: raise HTTPException(404, "Unknown or expired report job")
+    return job.to_dict()
+
+@app.get("/reports/{job_id}/download")
+async def download_report_job(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None: raise HTTPException(404, "Unknown or expired report job")
+    if job.status != JOB_DONE: raise HTTPException(409, f"Report job is {job.status}")
+    return FileResponse(job.path, media_type=REPORT_MEDIA_TYPES[job.kind], filename=f"report.{job.kind}")
 
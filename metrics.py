@@ -0,0 +1,58 @@
+"""
+Prometheus instrumentation for the analysis pipeline, served at /metrics.
+
+Stage latencies share one histogram, `noise_stage_duration_seconds{stage}`:
+- per packet: decode, inference (awaiting the scheduler: queue wait plus the batch),
+  grading, websocket_broadcast, total (the whole /notification handler)
+- per inference batch: resample, yamnet, classifier
+Each Mobius upload is recorded in `noise_mobius_write_duration_seconds{container, outcome}`.
+
+Label children are bound once at import, so the hot path never resolves labels and
+an observation costs about a microsecond. Gauges (queue depths, active houses,
+WebSocket clients) are read from the live objects only when /metrics is scraped;
+see register_gauge().
+"""
+from typing import Callable
+
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGES = ("decode", "inference", "resample", "yamnet", "classifier", "grading", "websocket_broadcast", "total")
+
+_stage_seconds = Histogram(
+    "noise_stage_duration_seconds", "Latency of each analysis pipeline stage", ["stage"], buckets=LATENCY_BUCKETS,
+)
+STAGE = {name: _stage_seconds.labels(name) for name in STAGES}
+
+PACKETS = Counter("noise_packets_total", "Notifications handled by /notification, by result status", ["status"])
+
+INFERENCE_BATCH_SIZE = Histogram(
+    "noise_inference_batch_size", "Requests per inference batch", buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+
+MOBIUS_WRITE_SECONDS = Histogram(
+    "noise_mobius_write_duration_seconds", "Latency of one Mobius content instance upload (including retries)",
+    ["container", "outcome"], buckets=LATENCY_BUCKETS,
+)
+
+SEVERITY = Counter("noise_graded_packets_total", "Graded packets by severity", ["severity"])
+
+_gauges = {}
+
+def register_gauge(name: str, documentation: str, func: Callable[[], float]):
+    """
+    Gauge whose value is func(), evaluated on every scrape (func must be cheap and thread-safe).
+    Re-registering a name replaces its function.
+    """
+    gauge = _gauges.get(name)
+    if gauge is None:
+        gauge = _gauges[name] = Gauge(name, documentation)
+    gauge.set_function(func)
+
+def render() -> tuple:
+    """
+    Returns:
+        (body, content_type): The Prometheus text exposition of every registered metric.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
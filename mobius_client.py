@@ -1,8 +1,12 @@
 import requests
 import json
 import logging
-from typing import List
+import random
+import asyncio
+import aiohttp
+from typing import List, Optional
 from config import MOBIUS_URL, CSE_NAME, AE_NAME, CONTAINER_NAME, REQUEST_TIMEOUT
+from config import MOBIUS_POOL_LIMIT, MOBIUS_POOL_LIMIT_PER_HOST, MOBIUS_KEEPALIVE_TIMEOUT, MOBIUS_MAX_RETRIES, MOBIUS_RETRY_BACKOFF, MOBIUS_RETRY_BACKOFF_MAX
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +21,80 @@ MOBIUS_HEADERS = {
     "Content-Type": "application/vnd.onem2m-res+json; ty=4" # ty=4 for ContentInstance
 }
 
+def _cin_payload(data: dict, labels: List[str] = None, resource_name: str = None) -> dict:
+    cin_payload = {
+        "con": json.dumps(data)
+    }
+    if labels:
+        cin_payload["lbl"] = labels
+    if resource_name:
+        cin_payload["rn"] = resource_name
+    return {"m2m:cin": cin_payload}
+
+def _retrieve_headers() -> dict:
+    headers = MOBIUS_HEADERS.copy()
+    headers.pop("Content-Type", None)
+    return headers
+
+def _parse_latest(response_json: dict):
+    content_instance = response_json["m2m:cin"]["con"]
+    # con이 이미 dict이면 그대로 리턴, 문자열이면 JSON 파싱 후 리턴
+    if isinstance(content_instance, dict):
+        return content_instance
+    return json.loads(content_instance)
+
+def _parse_cin_list(response_json: dict, target_url: str) -> list:
+    # The response structure for retrieving all children is different
+    # It typically contains a list of 'm2m:cin' resources
+    content_instances = []
+    if "m2m:cnt" in response_json and "cin" in response_json["m2m:cnt"]:
+         for cin_data in response_json["m2m:cnt"]["cin"]:
+             if "con" in cin_data:
+                 content_instances.append(json.loads(cin_data["con"]))
+    elif "m2m:uril" in response_json: # If only URIs are returned, we need to fetch each one
+        logger.warning(f"Mobius returned only URIs for {target_url}. Fetching each ContentInstance individually might be slow.")
+        # This case means Mobius returned only a list of URIs to the CINS, not the CINS themselves.
+        # We would need to iterate and fetch each URI. For simplicity, I'm assuming the direct content return for 'rcn=4' or similar.
+        pass # Handle fetching individual CINS if necessary
+    else: # For other possible structures
+        # Attempt to parse directly if the response is a single m2m:cin or similar
+        if "m2m:cin" in response_json:
+            # This could happen if the limit is 1 and it behaves like /latest
+            content_instances.append(json.loads(response_json["m2m:cin"]["con"]))
+    return content_instances
+
+def _all_cin_url(limit: int = None) -> str:
+    # To retrieve all content instances, we need to query the container for child resources (ContentInstances)
+    # The filter 'ty=4' specifies that we are looking for ContentInstances.
+    # The 'rcn=4' specifies retrieve all child resources.
+    # The 'fu=1' specifies filter usage.
+    # The 'lim' parameter can be used to limit the number of results.
+    target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{CONTAINER_NAME}?fu=1&ty=4&rcn=4"
+    if limit:
+        target_url += f"&lim={limit}"
+    return target_url
+
+def _cin_page_url(container_name: str, created_after: str = None, limit: int = 500, offset: int = 0) -> str:
+    # Incremental listing: 'cra' (createdAfter, oneM2M time "YYYYMMDDTHHMMSS") keeps the result to
+    # instances newer than the sync cursor; 'lim'/'ofst' page through it.
+    target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{container_name}?fu=1&ty=4&rcn=4&lim={limit}&ofst={offset}"
+    if created_after:
+        target_url += f"&cra={created_after}"
+    return target_url
+
+def _parse_cin_records(response_json: dict) -> list:
+    """
+    Like _parse_cin_list, but keeps resource metadata: [{"ri", "ct", "con"}] with con still unparsed.
+    """
+    if "m2m:cnt" in response_json:
+        cins = response_json["m2m:cnt"].get("cin", [])
+    elif "m2m:cin" in response_json:
+        cins = response_json["m2m:cin"]
+        cins = cins if isinstance(cins, list) else [cins]
+    else:
+        cins = []
+    return [{"ri": c.get("ri"), "ct": c.get("ct"), "con": c["con"]} for c in cins if "con" in c]
+
 def create_content_instance(data: dict, labels: List[str] = None, container_name: str = CONTAINER_NAME):
     """
     Creates a ContentInstance (cin) in the specified oneM2M Container on Mobius.
@@ -30,16 +108,7 @@ def create_content_instance(data: dict, labels: List[str] = None, container_name
         requests.Response: The response object from the Mobius server.
     """
     target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{container_name}"
-    
-    cin_payload = {
-        "con": json.dumps(data)
-    }
-    if labels:
-        cin_payload["lbl"] = labels
-
-    payload = {
-        "m2m:cin": cin_payload
-    }
+    payload = _cin_payload(data, labels)
 
     try:
         response = requests.post(target_url, headers=MOBIUS_HEADERS, json=payload, timeout=REQUEST_TIMEOUT)
@@ -64,25 +133,15 @@ def retrieve_latest_content_instance():
     """
     # --- 여기서부터 모든 줄 앞에 '한 탭(또는 공백 4칸)'이 있어야 합니다! ---
     target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{CONTAINER_NAME}/la"
-    
-    headers = MOBIUS_HEADERS.copy()
-    if "Content-Type" in headers:
-        headers.pop("Content-Type")
+    headers = _retrieve_headers()
 
     try:
         response = requests.get(target_url, headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
-        response_json = response.json()
-        content_instance = response_json["m2m:cin"]["con"]
-        
+        content = _parse_latest(response.json())
         logger.info(f"Successfully retrieved latest ContentInstance from {target_url}.")
-        
-        # con이 이미 dict이면 그대로 리턴, 문자열이면 JSON 파싱 후 리턴
-        if isinstance(content_instance, dict):
-            return content_instance
-        
-        return json.loads(content_instance)
+        return content
     
     except requests.exceptions.Timeout:
         logger.error(f"Timeout occurred while retrieving latest content from {target_url}.")
@@ -109,41 +168,16 @@ def retrieve_all_content_instances(limit: int = None):
         list: A list of dictionaries, where each dictionary is the content of a cin.
               Returns an empty list if no instances are found or an error occurs.
     """
-    # To retrieve all content instances, we need to query the container for child resources (ContentInstances)
-    # The filter 'ty=4' specifies that we are looking for ContentInstances.
-    # The 'rcn=4' specifies retrieve all child resources.
-    # The 'fu=1' specifies filter usage.
-    # The 'lim' parameter can be used to limit the number of results.
-    target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{CONTAINER_NAME}?fu=1&ty=4&rcn=4"
-    if limit:
-        target_url += f"&lim={limit}"
-
-    headers = MOBIUS_HEADERS.copy()
-    headers.pop("Content-Type")
+    target_url = _all_cin_url(limit)
+    headers = _retrieve_headers()
+    response_json = None
 
     try:
         response = requests.get(target_url, headers=headers, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         
         response_json = response.json()
-        
-        # The response structure for retrieving all children is different
-        # It typically contains a list of 'm2m:cin' resources
-        content_instances = []
-        if "m2m:cnt" in response_json and "cin" in response_json["m2m:cnt"]:
-             for cin_data in response_json["m2m:cnt"]["cin"]:
-                 if "con" in cin_data:
-                     content_instances.append(json.loads(cin_data["con"]))
-        elif "m2m:uril" in response_json: # If only URIs are returned, we need to fetch each one
-            logger.warning(f"Mobius returned only URIs for {target_url}. Fetching each ContentInstance individually might be slow.")
-            # This case means Mobius returned only a list of URIs to the CINS, not the CINS themselves.
-            # We would need to iterate and fetch each URI. For simplicity, I'm assuming the direct content return for 'rcn=4' or similar.
-            pass # Handle fetching individual CINS if necessary
-        else: # For other possible structures
-            # Attempt to parse directly if the response is a single m2m:cin or similar
-            if "m2m:cin" in response_json:
-                # This could happen if the limit is 1 and it behaves like /latest
-                content_instances.append(json.loads(response_json["m2m:cin"]["con"]))
+        content_instances = _parse_cin_list(response_json, target_url)
         
         logger.info(f"Successfully retrieved {len(content_instances)} ContentInstances from {target_url} (limit={limit}).")
         return content_instances
@@ -161,4 +195,216 @@ def retrieve_all_content_instances(limit: int = None):
     except KeyError as err:
         logger.error(f"KeyError: Could not parse Mobius response for content from {target_url}: {err}")
         logger.debug(f"Response JSON: {response_json}") # Print full response for debugging
-        return []
\ No newline at end of file
+        return []
+
+
+# --- Async client ---
+class MobiusRequestError(Exception):
+    """
+    Raised by AsyncMobiusClient when a request still fails after all retries.
+    """
+    def __init__(self, message: str, status: int = None, body: str = None):
+        super().__init__(message)
+        self.status = status
+        self.body = body
+
+class AsyncMobiusClient:
+    """
+    Async oneM2M client with a keep-alive connection pool shared by all requests.
+
+    Connection errors, timeouts and 5xx/429 responses are retried up to `max_retries`
+    times with exponential backoff and full jitter. Other 4xx responses fail immediately.
+
+    Non-idempotent requests (POST) are retried only when Mobius cannot have acted on
+    them: the connection was never established, or the server answered 429/503. A timeout
+    or a dropped connection after sending may mean the resource was created, so those
+    fail at once instead of creating a duplicate. Content instance creation with a
+    `resource_name` is idempotent (Mobius answers 409 for an existing rn, which counts
+    as success), so it gets the full retry policy, including stale pooled connections.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    NON_IDEMPOTENT_RETRY_STATUSES = {429, 503}
+
+    def __init__(
+        self,
+        limit: int = MOBIUS_POOL_LIMIT,
+        limit_per_host: int = MOBIUS_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = MOBIUS_KEEPALIVE_TIMEOUT,
+        timeout: float = REQUEST_TIMEOUT,
+        max_retries: int = MOBIUS_MAX_RETRIES,
+        backoff: float = MOBIUS_RETRY_BACKOFF,
+        backoff_max: float = MOBIUS_RETRY_BACKOFF_MAX,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _retry_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    async def request(self, method: str, url: str, headers: dict, json_body: dict = None,
+                      idempotent: bool = None) -> dict:
+        """
+        Sends one request with retries and returns the decoded JSON body.
+
+        Args:
+            idempotent: Whether the request may safely be sent twice; defaults to False
+                        for POST and True otherwise.
+
+        Raises:
+            MobiusRequestError: If the request fails after all retries or gets a non-retryable error.
+        """
+        if idempotent is None:
+            idempotent = method.upper() != "POST"
+        retry_statuses = self.RETRY_STATUSES if idempotent else self.NON_IDEMPOTENT_RETRY_STATUSES
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._get_session().request(method, url, headers=headers, json=json_body) as response:
+                    if response.status < 400:
+                        return await response.json(content_type=None)
+                    body = await response.text()
+                    last_error = MobiusRequestError(f"HTTP {response.status} from {url}", response.status, body)
+                    if response.status not in retry_statuses:
+                        raise last_error
+            except aiohttp.ClientConnectorError as err:
+                # Never connected, so nothing was sent: safe to retry any method
+                last_error = MobiusRequestError(f"{type(err).__name__} for {url}: {err}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as err:
+                last_error = MobiusRequestError(f"{type(err).__name__} for {url}: {err}")
+                if not idempotent:
+                    raise last_error
+
+            if attempt < self.max_retries:
+                delay = self._retry_delay(attempt)
+                logger.warning(f"{last_error}; retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})")
+                await asyncio.sleep(delay)
+        raise last_error
+
+    async def create_content_instance(self, data: dict, labels: List[str] = None, container_name: str = CONTAINER_NAME,
+                                      raise_on_error: bool = False, request_id: str = None, resource_name: str = None):
+        """
+        Awaitable create_content_instance. `request_id`, if given, is sent as X-M2M-RI so
+        every attempt at the same record carries the same identifier.
+
+        With a stable `resource_name` (rn) the create is idempotent: retries and replays
+        of an instance that Mobius already stored get 409 Conflict, which is treated as
+        success, so no duplicate instance is created.
+
+        Returns:
+            dict: The created resource as returned by Mobius, or None on failure
+                  (MobiusRequestError is raised instead if raise_on_error is set).
+        """
+        target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{container_name}"
+        try:
+            headers = {**MOBIUS_HEADERS, "X-M2M-RI": request_id} if request_id else MOBIUS_HEADERS
+            result = await self.request("POST", target_url, headers, _cin_payload(data, labels, resource_name),
+                                        idempotent=resource_name is not None)
+            logger.info(f"Successfully created ContentInstance at {target_url}.")
+            return result
+        except MobiusRequestError as err:
+            if err.status == 409 and resource_name:
+                logger.info(f"ContentInstance {resource_name} already exists at {target_url}; not creating it again.")
+                return {"m2m:cin": {"rn": resource_name}}
+            logger.error(f"Error creating ContentInstance at {target_url}: {err}")
+            if err.body:
+                logger.error(f"Response content: {err.body}")
+            if raise_on_error:
+                raise
+            return None
+
+    async def retrieve_latest_content_instance(self):
+        """
+        Awaitable retrieve_latest_content_instance.
+        """
+        target_url = f"{MOBIUS_URL}/{CSE_NAME}/{AE_NAME}/{CONTAINER_NAME}/la"
+        try:
+            content = _parse_latest(await self.request("GET", target_url, _retrieve_headers()))
+            logger.info(f"Successfully retrieved latest ContentInstance from {target_url}.")
+            return content
+        except MobiusRequestError as err:
+            logger.error(f"Error retrieving latest content from {target_url}: {err}")
+            return None
+        except (KeyError, TypeError, json.JSONDecodeError) as err:
+            logger.error(f"Parsing Error: {err}")
+            return None
+
+    async def retrieve_all_content_instances(self, limit: int = None) -> list:
+        """
+        Awaitable retrieve_all_content_instances. Returns [] on error.
+        """
+        target_url = _all_cin_url(limit)
+        try:
+            content_instances = _parse_cin_list(await self.request("GET", target_url, _retrieve_headers()), target_url)
+            logger.info(f"Successfully retrieved {len(content_instances)} ContentInstances from {target_url} (limit={limit}).")
+            return content_instances
+        except MobiusRequestError as err:
+            logger.error(f"Error retrieving ContentInstances from {target_url}: {err}")
+            return []
+        except (KeyError, TypeError, json.JSONDecodeError) as err:
+            logger.error(f"KeyError: Could not parse Mobius response for content from {target_url}: {err}")
+            return []
+
+    async def retrieve_content_instance_page(self, container_name: str = CONTAINER_NAME, created_after: str = None,
+                                             limit: int = 500, offset: int = 0) -> list:
+        """
+        One page of raw content instances created after `created_after`, for incremental sync.
+
+        Returns:
+            list: [{"ri", "ct", "con"}] with `con` unparsed.
+
+        Raises:
+            MobiusRequestError: If the request fails after all retries.
+        """
+        target_url = _cin_page_url(container_name, created_after, limit, offset)
+        return _parse_cin_records(await self.request("GET", target_url, _retrieve_headers()))
+
+_async_client: Optional[AsyncMobiusClient] = None
+
+def get_async_client() -> AsyncMobiusClient:
+    """
+    Process-wide AsyncMobiusClient (one connection pool per process).
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncMobiusClient()
+    return _async_client
+
+async def acreate_content_instance(data: dict, labels: List[str] = None, container_name: str = CONTAINER_NAME):
+    return await get_async_client().create_content_instance(data, labels=labels, container_name=container_name)
+
+async def aretrieve_latest_content_instance():
+    return await get_async_client().retrieve_latest_content_instance()
+
+async def aretrieve_all_content_instances(limit: int = None) -> list:
+    return await get_async_client().retrieve_all_content_instances(limit=limit)
+
+async def aclose():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
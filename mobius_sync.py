@@ -0,0 +1,175 @@
+"""
+Incremental mirror of a Mobius container (cnt_noise) into the local event log.
+
+Instead of downloading and parsing the whole container for every report, a
+background task periodically fetches only content instances created after the
+last sync cursor (oneM2M `cra` filter, paged with `lim`/`ofst`) and inserts them
+into the event log, de-duplicated by (house_id, event_id). The cursor is the newest creation
+time (`ct`) seen so far, stored in the event log's meta table in the same
+transaction as the rows, so a restart resumes where the last sync stopped.
+
+`ct` has one-second resolution, so each sync re-requests the cursor's own second;
+instances already seen in that second are skipped by resource id without parsing.
+Malformed instances (unparsable `con`, missing or mistyped fields) are skipped and
+counted in stats; the cursor still moves past them so they are not refetched.
+
+Instances without an event_id are keyed by resource id (CIN_{ri}). Ids not in the
+current EVT_{house_id}_{time} format (e.g. older EVT_%Y%m%d%H%M%S ids, one-second
+resolution and no house id) are namespaced as {house_id}:{event_id}, keeping the
+original in `mobius_event_id`, so events that several houses produced in the same
+second stay distinct. Current-format ids are left as they are, so events this server
+wrote itself still de-duplicate against their Mobius copies.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import CNT_NOISE
+from event_log import EventLog, is_storable
+from mobius_client import get_async_client, MobiusRequestError
+
+logger = logging.getLogger(__name__)
+
+ONEM2M_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+def _step_back(ct: Optional[str]) -> Optional[str]:
+    """
+    One second before `ct`, so `cra` (strictly created-after) still returns the cursor's second.
+    """
+    if not ct:
+        return None
+    try:
+        return (datetime.strptime(ct[:15], ONEM2M_TIME_FORMAT) - timedelta(seconds=1)).strftime(ONEM2M_TIME_FORMAT)
+    except ValueError:
+        return None
+
+def _namespace_event_id(event: dict, ri: str):
+    """
+    Gives an analysis event an id that is unique across houses (see module docstring).
+    """
+    event_id, house_id = event.get("event_id"), event.get("house_id")
+    if not event_id:
+        event["event_id"] = f"CIN_{ri}"
+    elif isinstance(event_id, str) and isinstance(house_id, str) and house_id and not event_id.startswith(f"EVT_{house_id}_"):
+        event["mobius_event_id"] = event_id
+        event["event_id"] = f"{house_id}:{event_id}"
+
+class MobiusSync:
+    """
+    Keeps EventLog in sync with one Mobius container by periodic incremental fetches.
+    """
+
+    def __init__(self, event_log: EventLog, container_name: str = CNT_NOISE, interval: float = 60.0,
+                 page_size: int = 500):
+        self.event_log = event_log
+        self.container_name = container_name
+        self.interval = interval
+        self.page_size = page_size
+        self.cursor_key = f"mobius_cursor:{container_name}"
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # Resource ids already imported in the cursor's second
+        self._boundary_ris: set = set()
+        self._stats = {"runs": 0, "fetched": 0, "parsed": 0, "skipped": 0, "added": 0}
+        self._cursor: Optional[str] = None
+        self._last_run: Optional[float] = None
+        self._last_error: Optional[str] = None
+
+    async def start(self):
+        self._cursor = await asyncio.to_thread(self.event_log.get_meta, self.cursor_key)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.sync_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Mobius sync error: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def sync_once(self) -> int:
+        """
+        Fetches everything created since the cursor and stores it.
+
+        Returns:
+            int: Number of new events written to the event log.
+        """
+        async with self._lock:
+            client = get_async_client()
+            created_after = _step_back(self._cursor)
+            newest = self._cursor
+            seen = {}  # ri -> ct for this run
+            events = []
+            offset = 0
+            try:
+                while True:
+                    page = await client.retrieve_content_instance_page(
+                        self.container_name, created_after, limit=self.page_size, offset=offset
+                    )
+                    self._stats["fetched"] += len(page)
+                    for cin in page:
+                        ri, ct = cin.get("ri"), cin.get("ct")
+                        if ri in seen or ri in self._boundary_ris:
+                            continue
+                        seen[ri] = ct
+                        if isinstance(ct, str) and (newest is None or ct > newest):
+                            newest = ct
+                        try:
+                            con = cin["con"]
+                            event = con if isinstance(con, dict) else json.loads(con)
+                        except (KeyError, TypeError, json.JSONDecodeError):
+                            self._stats["skipped"] += 1
+                            continue
+                        self._stats["parsed"] += 1
+                        if not isinstance(event, dict):
+                            self._stats["skipped"] += 1
+                            continue
+                        if event.get("event") != "apology":
+                            _namespace_event_id(event, ri)
+                        if not is_storable(event):
+                            self._stats["skipped"] += 1
+                            logger.warning(f"Mobius sync: skipping malformed content instance {ri}")
+                            continue
+                        events.append(event)
+                    if len(page) < self.page_size:
+                        break
+                    offset += self.page_size
+            except MobiusRequestError as err:
+                # Nothing is committed: the cursor stays put and the next run retries the same range
+                self._last_error = str(err)
+                logger.error(f"❌ Mobius sync failed for {self.container_name}: {err}")
+                return 0
+            finally:
+                self._stats["runs"] += 1
+                self._last_run = time.time()
+
+            added = 0
+            if events or newest != self._cursor:
+                added = await asyncio.to_thread(self.event_log.write_now_with_meta, events, self.cursor_key, newest or "")
+            boundary = {ri for ri, ct in seen.items() if ct == newest}
+            self._boundary_ris = boundary | self._boundary_ris if newest == self._cursor else boundary
+            self._cursor = newest
+            self._stats["added"] += added
+            if added:
+                logger.info(f"🔄 Mobius sync {self.container_name}: {added} new events (cursor={newest})")
+            return added
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "container": self.container_name,
+            "cursor": self._cursor,
+            "last_run": self._last_run,
+            "last_error": self._last_error,
+        }
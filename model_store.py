@@ -0,0 +1,198 @@
+"""
+Local model artifact store.
+
+The inference server loads YAMNet, the V2 classifier and its class names from a
+versioned, checksummed store under models/store instead of fetching anything from
+TFHub at startup. The store is populated once, on a machine with network access:
+
+    python model_store.py export --version 1
+    python model_store.py verify
+
+and the resulting directory can then be copied to air-gapped nodes.
+
+Layout:
+    models/store/manifest.json
+    models/store/yamnet/<version>/            (TF SavedModel)
+    models/store/classifier/<version>/noise_classification_v2.keras
+    models/store/class_names/<version>/classes_v2.npy
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import tensorflow as tf
+
+from config import MODEL_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+YAMNET_MODEL_HANDLE = 'https://tfhub.dev/google/yamnet/1'
+
+class ModelStoreError(RuntimeError):
+    """
+    Raised when the store is missing, incomplete or fails checksum verification.
+    """
+
+def _sha256(path: str) -> str:
+    """
+    SHA-256 of a file, or of every file in a directory (relative paths + contents, sorted).
+    """
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = []
+        for root, _, names in os.walk(path):
+            for name in names:
+                files.append(os.path.join(root, name))
+        for file_path in sorted(files):
+            digest.update(os.path.relpath(file_path, path).replace(os.sep, "/").encode("utf-8"))
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(chunk)
+    else:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+def read_manifest(store_dir: str = MODEL_STORE_DIR) -> dict:
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise ModelStoreError(f"No model store manifest at {manifest_path}. Run 'python model_store.py export' first.")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _write_manifest(store_dir: str, manifest: dict):
+    tmp_path = os.path.join(store_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_NAME))
+
+def _register(manifest: dict, store_dir: str, name: str, version: str, rel_path: str, kind: str, source: str):
+    manifest.setdefault("artifacts", {})[name] = {
+        "version": version,
+        "path": rel_path,
+        "kind": kind,
+        "source": source,
+        "sha256": _sha256(os.path.join(store_dir, rel_path)),
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+def export_artifacts(
+    version: str,
+    store_dir: str = MODEL_STORE_DIR,
+    model_path: str = "models/noise_classification_v2.keras",
+    class_names_path: str = "models/classes_v2.npy",
+    yamnet_handle: str = YAMNET_MODEL_HANDLE,
+) -> dict:
+    """
+    One-time export of all model artifacts into the store. Needs network access for YAMNet.
+
+    Returns:
+        dict: The updated manifest.
+    """
+    import tensorflow_hub as hub
+
+    os.makedirs(store_dir, exist_ok=True)
+    try:
+        manifest = read_manifest(store_dir)
+    except ModelStoreError:
+        manifest = {"artifacts": {}}
+
+    # 1. YAMNet: TFHub -> local SavedModel
+    yamnet_rel = os.path.join("yamnet", version)
+    yamnet_dir = os.path.join(store_dir, yamnet_rel)
+    if os.path.exists(yamnet_dir):
+        shutil.rmtree(yamnet_dir)
+    logger.info(f"Exporting YAMNet from {yamnet_handle} to {yamnet_dir}...")
+    tf.saved_model.save(hub.load(yamnet_handle), yamnet_dir)
+    _register(manifest, store_dir, "yamnet", version, yamnet_rel, "saved_model", yamnet_handle)
+
+    # 2. Classifier + class names: copy as-is
+    for name, src, kind in (("classifier", model_path, "keras"), ("class_names", class_names_path, "npy")):
+        if not os.path.exists(src):
+            raise ModelStoreError(f"Artifact source not found: {src}")
+        rel = os.path.join(name, version, os.path.basename(src))
+        os.makedirs(os.path.join(store_dir, os.path.dirname(rel)), exist_ok=True)
+        shutil.copy2(src, os.path.join(store_dir, rel))
+        _register(manifest, store_dir, name, version, rel, kind, src)
+
+    _write_manifest(store_dir, manifest)
+    logger.info(f"✅ Exported model artifacts (version {version}) to {store_dir}")
+    return manifest
+
+def verify_artifacts(store_dir: str = MODEL_STORE_DIR) -> dict:
+    """
+    Checks every artifact in the manifest against its recorded checksum.
+
+    Returns:
+        dict: The manifest, if all artifacts are present and intact.
+    """
+    manifest = read_manifest(store_dir)
+    for name in ("yamnet", "classifier", "class_names"):
+        entry = manifest.get("artifacts", {}).get(name)
+        if entry is None:
+            raise ModelStoreError(f"Artifact '{name}' missing from manifest")
+        path = os.path.join(store_dir, entry["path"])
+        if not os.path.exists(path):
+            raise ModelStoreError(f"Artifact '{name}' not found at {path}")
+        actual = _sha256(path)
+        if actual != entry["sha256"]:
+            raise ModelStoreError(f"Checksum mismatch for '{name}' v{entry['version']}: expected {entry['sha256']}, got {actual}")
+    return manifest
+
+def load_artifacts(store_dir: str = MODEL_STORE_DIR, verify: bool = True) -> dict:
+    """
+    Loads YAMNet, the classifier and class names from the local store only (no network).
+
+    Returns:
+        dict: {"yamnet", "classifier", "class_names"} objects plus "load_seconds" and
+              "versions" per artifact.
+    """
+    started = time.perf_counter()
+    manifest = verify_artifacts(store_dir) if verify else read_manifest(store_dir)
+    verify_seconds = time.perf_counter() - started
+    artifacts = manifest["artifacts"]
+
+    loaders = {
+        "yamnet": tf.saved_model.load,
+        "classifier": tf.keras.models.load_model,
+        "class_names": lambda path: np.load(path, allow_pickle=True),
+    }
+
+    loaded = {"load_seconds": {"verify": round(verify_seconds, 3)}, "versions": {}}
+    for name, loader in loaders.items():
+        entry = artifacts[name]
+        t0 = time.perf_counter()
+        loaded[name] = loader(os.path.join(store_dir, entry["path"]))
+        elapsed = time.perf_counter() - t0
+        loaded["load_seconds"][name] = round(elapsed, 3)
+        loaded["versions"][name] = entry["version"]
+        logger.info(f"Loaded '{name}' v{entry['version']} in {elapsed:.2f}s")
+    return loaded
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Manage the local model artifact store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export_p = sub.add_parser("export", help="Export YAMNet, classifier and class names into the store")
+    export_p.add_argument("--version", required=True)
+    export_p.add_argument("--store-dir", default=MODEL_STORE_DIR)
+    export_p.add_argument("--model-path", default="models/noise_classification_v2.keras")
+    export_p.add_argument("--class-names-path", default="models/classes_v2.npy")
+    export_p.add_argument("--yamnet-handle", default=YAMNET_MODEL_HANDLE)
+    verify_p = sub.add_parser("verify", help="Verify artifact checksums")
+    verify_p.add_argument("--store-dir", default=MODEL_STORE_DIR)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        result = export_artifacts(args.version, args.store_dir, args.model_path, args.class_names_path, args.yamnet_handle)
+    else:
+        result = verify_artifacts(args.store_dir)
+    print(json.dumps(result, indent=2))
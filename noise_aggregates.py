@@ -0,0 +1,183 @@
+"""
+Incrementally maintained per-house noise aggregates for heatmaps, charts and the dashboard.
+
+For every house and calendar day the store keeps:
+- a 24x3 count grid of analysis events by hour and severity (Green/Yellow/Red)
+- counts per classified noise type (`result`)
+- the day's Lmax (highest packet level, dB)
+
+Counters are updated as events are committed to the event log (EventLog listener),
+which covers both locally graded events and events imported from Mobius exactly
+once, and are rebuilt from the event log with a single GROUP BY pass at startup.
+Range queries sum at most one small array per day in the range, independent of the
+number of events, so report charts no longer scan or re-parse the logs.
+"""
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from event_log import EventLog
+
+SEVERITIES = ("Green", "Yellow", "Red")
+_SEVERITY_INDEX = {name: i for i, name in enumerate(SEVERITIES)}
+
+def parse_timestamp(timestamp: str) -> datetime:
+    return datetime.fromisoformat(timestamp.replace("Z", ""))
+
+class _DayAggregate:
+    __slots__ = ("hourly", "classes", "lmax")
+
+    def __init__(self):
+        self.hourly = np.zeros((24, len(SEVERITIES)), dtype=np.int64)
+        self.classes: Counter = Counter()
+        self.lmax: Optional[float] = None
+
+    def update_lmax(self, level: Optional[float]):
+        if level is not None and (self.lmax is None or level > self.lmax):
+            self.lmax = float(level)
+
+class NoiseAggregates:
+    """
+    Per-house, per-day counters of graded analysis events.
+    """
+
+    def __init__(self):
+        self._houses: Dict[str, Dict[date, _DayAggregate]] = {}
+        self._lock = threading.Lock()
+        self._events = 0
+
+    def _day(self, house_id: str, day: date) -> _DayAggregate:
+        days = self._houses.setdefault(house_id, {})
+        agg = days.get(day)
+        if agg is None:
+            agg = days[day] = _DayAggregate()
+        return agg
+
+    def add(self, event: dict):
+        """
+        Counts one analysis event (the dict published to CNT_NOISE). Other events are ignored.
+        """
+        self.add_many([event])
+
+    def add_many(self, events: Iterable[dict]):
+        with self._lock:
+            for event in events:
+                a = event.get("analysis")
+                if event.get("event") == "apology" or not a or not event.get("house_id"):
+                    continue
+                try:
+                    ts = parse_timestamp(event["timestamp"])
+                except (KeyError, AttributeError, ValueError):
+                    continue
+                agg = self._day(event["house_id"], ts.date())
+                severity = _SEVERITY_INDEX.get(a.get("severity"))
+                if severity is not None:
+                    agg.hourly[ts.hour, severity] += 1
+                if a.get("result"):
+                    agg.classes[a["result"]] += 1
+                agg.update_lmax(a.get("db_level"))
+                self._events += 1
+
+    def rebuild(self, event_log: EventLog):
+        """
+        Replaces all counters with the totals currently in the event log.
+        """
+        rollup = event_log.daily_rollup()
+        houses: Dict[str, Dict[date, _DayAggregate]] = {}
+
+        def day_of(house_id, day_str):
+            days = houses.setdefault(house_id, {})
+            day = date.fromisoformat(day_str)
+            if day not in days:
+                days[day] = _DayAggregate()
+            return days[day]
+
+        total = 0
+        for house_id, day_str, hour, severity, n in rollup["hourly"]:
+            if severity in _SEVERITY_INDEX:
+                day_of(house_id, day_str).hourly[hour, _SEVERITY_INDEX[severity]] += n
+            total += n
+        for house_id, day_str, result, n in rollup["classes"]:
+            if result:
+                day_of(house_id, day_str).classes[result] += n
+        for house_id, day_str, lmax in rollup["lmax"]:
+            day_of(house_id, day_str).update_lmax(lmax)
+        with self._lock:
+            self._houses = houses
+            self._events = total
+
+    def _days_in_range(self, house_id: str, start: datetime, end: datetime) -> List[tuple]:
+        days = self._houses.get(house_id, {})
+        first, last = start.date(), end.date()
+        if (last - first).days + 1 > len(days):
+            return sorted((d, agg) for d, agg in days.items() if first <= d <= last)
+        out = []
+        d = first
+        while d <= last:
+            if d in days:
+                out.append((d, days[d]))
+            d += timedelta(days=1)
+        return out
+
+    def heatmap(self, house_id: str, start: datetime, end: datetime,
+                severities: Iterable[str] = ("Red", "Yellow")) -> np.ndarray:
+        """
+        7x24 event counts (weekday x hour, Monday first) for the given severities.
+        """
+        cols = [_SEVERITY_INDEX[s] for s in severities]
+        grid = np.zeros((7, 24), dtype=np.int64)
+        with self._lock:
+            for day, agg in self._days_in_range(house_id, start, end):
+                grid[day.weekday()] += agg.hourly[:, cols].sum(axis=1)
+        return grid
+
+    def class_counts(self, house_id: str, start: datetime, end: datetime) -> Dict[str, int]:
+        total: Counter = Counter()
+        with self._lock:
+            for _, agg in self._days_in_range(house_id, start, end):
+                total.update(agg.classes)
+        return dict(total.most_common())
+
+    def daily_lmax(self, house_id: str, start: datetime, end: datetime) -> List[tuple]:
+        """
+        [(day, lmax_db)] for days in range that have events, oldest first.
+        """
+        with self._lock:
+            return [(day, agg.lmax) for day, agg in self._days_in_range(house_id, start, end) if agg.lmax is not None]
+
+    def summary(self, house_id: str, start: datetime, end: datetime) -> dict:
+        """
+        JSON-ready aggregates for the dashboard.
+        """
+        with self._lock:
+            days = self._days_in_range(house_id, start, end)
+            hourly = np.zeros((24, len(SEVERITIES)), dtype=np.int64)
+            weekly = {name: np.zeros((7, 24), dtype=np.int64) for name in SEVERITIES}
+            classes: Counter = Counter()
+            for day, agg in days:
+                hourly += agg.hourly
+                for i, name in enumerate(SEVERITIES):
+                    weekly[name][day.weekday()] += agg.hourly[:, i]
+                classes.update(agg.classes)
+            daily = [{"date": day.isoformat(), "lmax": agg.lmax, "events": int(agg.hourly.sum())} for day, agg in days]
+        return {
+            "house_id": house_id,
+            "start_date": start.date().isoformat(),
+            "end_date": end.date().isoformat(),
+            "severities": list(SEVERITIES),
+            "hourly": {name: hourly[:, i].tolist() for i, name in enumerate(SEVERITIES)},
+            "weekday_hour": {name: grid.tolist() for name, grid in weekly.items()},
+            "classes": dict(classes.most_common()),
+            "daily": daily,
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "houses": len(self._houses),
+                "days": sum(len(days) for days in self._houses.values()),
+                "events": self._events,
+            }
@@ -0,0 +1,224 @@
+"""
+Rolling acoustic metrics per house, keyed on packet timestamps.
+
+Each house keeps a ring of fixed-width time buckets (1 s by default) covering the
+long window (5 min). Every bucket stores its summed energy 10^(L/10), packet count,
+exceedance count and maximum level, and the engine keeps running sums for the short
+(1 min) and long (5 min) windows. A packet therefore updates Leq_1min, Leq_5min,
+Lmax and exceedance counts in constant time, regardless of how often packets arrive.
+
+Leq is the energy average, 10 * log10(mean(10^(L/10))), not the arithmetic mean of dB.
+Packets may arrive late or out of order: they are added to the bucket of their own
+timestamp as long as it is still inside the long window, and ignored otherwise.
+
+The legal noise-degree judgement used by the reports (get_noise_degree) also lives here.
+"""
+import math
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+class NoiseMetrics(NamedTuple):
+    leq_1min: float
+    leq_5min: float
+    lmax_5min: float
+    exceed_1min: int
+    exceed_5min: int
+    samples_1min: int
+    samples_5min: int
+
+def _leq(energy: float, count: int) -> float:
+    return 10.0 * math.log10(energy / count) if count > 0 and energy > 0 else 0.0
+
+class RollingLeq:
+    """
+    Time-bucketed rolling Leq / Lmax / exceedance engine for one house.
+    """
+
+    def __init__(self, bucket_seconds: float = 1.0, short_window: float = 60.0, long_window: float = 300.0):
+        self.bucket_seconds = bucket_seconds
+        self.n_short = int(round(short_window / bucket_seconds))
+        self.n_long = int(round(long_window / bucket_seconds))
+        n = self.n_long
+        self._ids = np.full(n, -1, dtype=np.int64)
+        self._energy = np.zeros(n, dtype=np.float64)
+        self._count = np.zeros(n, dtype=np.int64)
+        self._exceed = np.zeros(n, dtype=np.int64)
+        self._lmax = np.full(n, -np.inf, dtype=np.float64)
+        self._head: Optional[int] = None
+        self._e_short = self._e_long = 0.0
+        self._c_short = self._c_long = 0
+        self._x_short = self._x_long = 0
+        self._lmax_long = -np.inf
+
+    def _reset(self, head: int):
+        self._ids.fill(-1)
+        self._energy.fill(0.0)
+        self._count.fill(0)
+        self._exceed.fill(0)
+        self._lmax.fill(-np.inf)
+        self._e_short = self._e_long = 0.0
+        self._c_short = self._c_long = 0
+        self._x_short = self._x_long = 0
+        self._lmax_long = -np.inf
+        self._head = head
+
+    def _advance(self, new_head: int):
+        """
+        Moves the window forward to new_head, expiring buckets that fall out of each window.
+        Cost is proportional to elapsed buckets (bounded by n_long), not to packet count.
+        """
+        steps = new_head - self._head
+        if steps >= self.n_long:
+            self._reset(new_head)
+            return
+
+        recompute_lmax = False
+        for bucket_id in range(self._head + 1, new_head + 1):
+            # Bucket leaving the short window
+            short_id = bucket_id - self.n_short
+            short_slot = short_id % self.n_long
+            if self._ids[short_slot] == short_id:
+                self._e_short -= self._energy[short_slot]
+                self._c_short -= self._count[short_slot]
+                self._x_short -= self._exceed[short_slot]
+
+            # Bucket leaving the long window shares the slot of the new bucket
+            slot = bucket_id % self.n_long
+            if self._ids[slot] == bucket_id - self.n_long:
+                self._e_long -= self._energy[slot]
+                self._c_long -= self._count[slot]
+                self._x_long -= self._exceed[slot]
+                if self._lmax[slot] >= self._lmax_long:
+                    recompute_lmax = True
+            self._ids[slot] = bucket_id
+            self._energy[slot] = 0.0
+            self._count[slot] = 0
+            self._exceed[slot] = 0
+            self._lmax[slot] = -np.inf
+
+        # Guard against floating-point drift from repeated subtraction
+        if self._c_short == 0:
+            self._e_short = 0.0
+        if self._c_long == 0:
+            self._e_long = 0.0
+        if recompute_lmax:
+            self._lmax_long = float(self._lmax.max())
+        self._head = new_head
+
+    def add(self, timestamp: float, level_db: float, exceeded: bool = False) -> NoiseMetrics:
+        """
+        Records one packet level (dB) at `timestamp` (epoch seconds).
+
+        Args:
+            exceeded: Whether this packet counts as an Lmax exceedance.
+        """
+        bucket_id = int(math.floor(timestamp / self.bucket_seconds))
+        if self._head is None:
+            self._reset(bucket_id)
+        elif bucket_id > self._head:
+            self._advance(bucket_id)
+        elif bucket_id <= self._head - self.n_long:
+            # Too old for any window
+            return self.snapshot()
+
+        slot = bucket_id % self.n_long
+        if self._ids[slot] != bucket_id:
+            # Untouched slot inside the window (only possible right after a reset)
+            self._ids[slot] = bucket_id
+            self._energy[slot] = 0.0
+            self._count[slot] = 0
+            self._exceed[slot] = 0
+            self._lmax[slot] = -np.inf
+
+        energy = 10.0 ** (level_db / 10.0)
+        hit = 1 if exceeded else 0
+        self._energy[slot] += energy
+        self._count[slot] += 1
+        self._exceed[slot] += hit
+        if level_db > self._lmax[slot]:
+            self._lmax[slot] = level_db
+
+        self._e_long += energy
+        self._c_long += 1
+        self._x_long += hit
+        if level_db > self._lmax_long:
+            self._lmax_long = level_db
+        if bucket_id > self._head - self.n_short:
+            self._e_short += energy
+            self._c_short += 1
+            self._x_short += hit
+        return self.snapshot()
+
+    def snapshot(self) -> NoiseMetrics:
+        return NoiseMetrics(
+            leq_1min=round(_leq(self._e_short, self._c_short), 2),
+            leq_5min=round(_leq(self._e_long, self._c_long), 2),
+            lmax_5min=round(self._lmax_long, 2) if self._c_long else 0.0,
+            exceed_1min=int(self._x_short),
+            exceed_5min=int(self._x_long),
+            samples_1min=int(self._c_short),
+            samples_5min=int(self._c_long),
+        )
+
+# Legal floor-noise limits, (day, night): (1-min caution threshold, 1-min tolerance limit, 5-min airborne threshold)
+NOISE_DEGREE_LIMITS = {False: (39, 40, 45), True: (34, 35, 40)}
+
+def _noise_degree_text(is_night, level_1min, over_5min):
+    """
+    level_1min: 0 normal / 1 caution / 2 over the tolerance limit; over_5min: over the 5-min airborne threshold.
+    """
+    threshold_1min, limit_1min, threshold_5min = NOISE_DEGREE_LIMITS[is_night]
+    status = []
+    if level_1min == 2:
+        status.append(f"수인한도 초과(기준:{limit_1min}dB)")
+    elif level_1min == 1:
+        status.append(f"법적 주의(기준:{threshold_1min}dB)")
+    if over_5min:
+        status.append(f"공기전달 소음 위반(기준:{threshold_5min}dB)")
+    if not status:
+        return "정상(생활소음 범위)"
+    return " | ".join(status)
+
+# [is_night, level_1min, over_5min] -> judgement text, shared by the scalar and batch versions
+_NOISE_DEGREE_TABLE = np.array(
+    [[[_noise_degree_text(bool(n), l1, bool(o5)) for o5 in (0, 1)] for l1 in (0, 1, 2)] for n in (0, 1)],
+    dtype=object,
+)
+
+def get_noise_degree(avg_1min, avg_5min, timestamp_str):
+    """
+    Legal noise degree from the 1-min / 5-min averages and the time of day (22-06 is night).
+    """
+    try:
+        ts = datetime.fromisoformat(timestamp_str.replace("Z", ""))
+        is_night = ts.hour >= 22 or ts.hour < 6
+    except:
+        is_night = False
+
+    threshold_1min, limit_1min, threshold_5min = NOISE_DEGREE_LIMITS[is_night]
+    level_1min = 2 if avg_1min > limit_1min else 1 if avg_1min > threshold_1min else 0
+    return _NOISE_DEGREE_TABLE[int(is_night), level_1min, int(avg_5min > threshold_5min)]
+
+def get_noise_degree_batch(avg_1min, avg_5min, hours):
+    """
+    Vectorised get_noise_degree for a whole chunk of events.
+
+    Args:
+        avg_1min, avg_5min: 1-min / 5-min averages (NaN counts as 0).
+        hours: Local hour of each event (0-23).
+
+    Returns:
+        np.ndarray: Judgement strings (dtype=object).
+    """
+    avg_1min = np.nan_to_num(np.asarray(avg_1min, dtype=np.float64))
+    avg_5min = np.nan_to_num(np.asarray(avg_5min, dtype=np.float64))
+    hours = np.asarray(hours)
+    night = (hours >= 22) | (hours < 6)
+    day_limits, night_limits = NOISE_DEGREE_LIMITS[False], NOISE_DEGREE_LIMITS[True]
+    threshold_1min = np.where(night, night_limits[0], day_limits[0])
+    limit_1min = np.where(night, night_limits[1], day_limits[1])
+    threshold_5min = np.where(night, night_limits[2], day_limits[2])
+    level_1min = np.where(avg_1min > limit_1min, 2, np.where(avg_1min > threshold_1min, 1, 0))
+    return _NOISE_DEGREE_TABLE[night.astype(np.intp), level_1min, (avg_5min > threshold_5min).astype(np.intp)]
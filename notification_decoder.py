@@ -0,0 +1,118 @@
+"""
+Decoding of sensor notifications into (payload dict, float32 audio array).
+
+Sensors post through Mobius, so a packet arrives as a JSON notification whose
+`con` field is itself a JSON string. Both layers are parsed with orjson when it
+is installed (falling back to the standard json module), straight from the
+request bytes.
+
+The audio can be carried three ways inside `payload`:
+- "sound_raw": JSON list of ints (original format; converted with np.asarray)
+- "sound_pcm16": base64 of little-endian int16 PCM, decoded with np.frombuffer,
+  with no per-sample Python work
+- raw bytes: a direct POST with Content-Type application/octet-stream whose body
+  is a u32 LE header length, the JSON packet without audio, then int16 LE PCM
+
+decode_sound() always returns a new float32 array.
+"""
+import base64
+import binascii
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+    loads = orjson.loads  # raises orjson.JSONDecodeError, a ValueError subclass
+    JSON_BACKEND = "orjson"
+except ImportError:
+    import json
+    loads = json.loads
+    JSON_BACKEND = "json"
+
+_PCM16 = np.dtype("<i2")
+_HEADER_LEN = struct.Struct("<I")
+
+class NotificationDecodeError(ValueError):
+    """
+    Raised when a notification or its `con` payload cannot be decoded.
+    """
+
+def decode_notification(body: bytes) -> Optional[dict]:
+    """
+    Parses a Mobius notification and returns the sensor packet in its `con`
+    ({"house_id", "timestamp", "meta", "payload"}).
+
+    Returns:
+        dict: The packet, or None for an empty body or a notification without `sgn`
+        (e.g. subscription verification), which the caller ignores.
+
+    Raises:
+        NotificationDecodeError: If the body or `con` is not valid JSON.
+    """
+    if not body or not body.strip():
+        return None
+    try:
+        notification = loads(body)
+    except ValueError as e:
+        raise NotificationDecodeError(f"Invalid notification JSON: {e}") from e
+    if not notification or not isinstance(notification, dict):
+        return None
+
+    sgn = notification.get("m2m:sgn") or notification.get("sgn")
+    if not sgn:
+        return None
+    try:
+        rep = sgn["nev"]["rep"]
+    except (KeyError, TypeError) as e:
+        raise NotificationDecodeError("no nev.rep in notification") from e
+    con = (rep.get("m2m:cin") or {}).get("con") or (rep.get("cin") or {}).get("con")
+    if isinstance(con, (str, bytes)):
+        try:
+            con = loads(con)
+        except ValueError as e:
+            raise NotificationDecodeError(f"Invalid JSON in con: {e}") from e
+    if not isinstance(con, dict):
+        raise NotificationDecodeError("No content instance in notification")
+    return con
+
+def decode_binary_packet(body: bytes) -> Tuple[dict, np.ndarray]:
+    """
+    Decodes an application/octet-stream packet: u32 LE header length, JSON header, int16 LE PCM.
+
+    Returns:
+        (packet, audio): The JSON packet and its audio as float32.
+    """
+    if len(body) < _HEADER_LEN.size:
+        raise NotificationDecodeError("binary packet too short")
+    (header_len,) = _HEADER_LEN.unpack_from(body)
+    start = _HEADER_LEN.size
+    if start + header_len > len(body):
+        raise NotificationDecodeError("binary packet header length exceeds body")
+    try:
+        packet = loads(body[start:start + header_len])
+    except ValueError as e:
+        raise NotificationDecodeError(f"Invalid binary packet header: {e}") from e
+    pcm = memoryview(body)[start + header_len:]
+    if len(pcm) % _PCM16.itemsize:
+        raise NotificationDecodeError("binary packet PCM length is not a multiple of 2")
+    return packet, np.frombuffer(pcm, dtype=_PCM16).astype(np.float32)
+
+def decode_sound(sensor_data: dict) -> np.ndarray:
+    """
+    Audio samples of one packet's `payload` as float32, from whichever field is present.
+    """
+    pcm_b64 = sensor_data.get("sound_pcm16")
+    if pcm_b64:
+        try:
+            pcm = base64.b64decode(pcm_b64, validate=True)
+        except (binascii.Error, ValueError) as e:
+            raise NotificationDecodeError(f"Invalid base64 in sound_pcm16: {e}") from e
+        if len(pcm) % _PCM16.itemsize:
+            raise NotificationDecodeError("sound_pcm16 length is not a multiple of 2")
+        return np.frombuffer(pcm, dtype=_PCM16).astype(np.float32)
+    sound_raw = sensor_data.get("sound_raw") or []
+    if isinstance(sound_raw, (bytes, bytearray, memoryview)):
+        return np.frombuffer(sound_raw, dtype=_PCM16).astype(np.float32)
+    return np.asarray(sound_raw, dtype=np.float32)
@@ -0,0 +1,193 @@
+"""
+On-demand sampling profiler for the running server.
+
+Two backends, both producing collapsed stacks ("frame;frame;frame count" per line),
+which flamegraph.pl, speedscope and inferno read directly:
+
+- "sampler" (built in): a daemon thread reads sys._current_frames() at `hz` for
+  `seconds` and counts each thread's Python stack, rooted at the thread name
+  (so inference-worker, inference-scheduler, event-log-writer and blocking-io
+  threads are told apart). It costs one stack walk per thread per sample, under
+  the GIL, and never touches the event loop. Child processes cannot be seen.
+- "py-spy" (if the py-spy binary is installed and allowed to ptrace): runs
+  `py-spy record --format raw` against this process, optionally with
+  --subprocesses to include the report-rendering process pool. Native frames
+  and idle detection come from py-spy.
+
+Only one profile runs at a time (ProfilerBusyError otherwise), and the duration
+is capped by the caller.
+"""
+import asyncio
+import math
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from typing import Optional
+
+PROFILER_MODES = ("sampler", "py-spy")
+
+# Leaf frames in these stdlib files mean the thread is parked (waiting on a lock, queue or socket)
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+class ProfilerBusyError(RuntimeError):
+    """
+    Raised when a profile is requested while another one is still running.
+    """
+
+class ProfilerUnavailableError(RuntimeError):
+    """
+    Raised when the requested backend cannot run here (e.g. py-spy not installed).
+    """
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+def _is_idle(frame) -> bool:
+    return frame.f_code.co_filename.endswith(_IDLE_FILES)
+
+def sample_stacks(seconds: float, hz: float = 100.0, include_idle: bool = False, max_depth: int = 128) -> Counter:
+    """
+    Samples every thread of this process (except the caller) for `seconds`.
+
+    Returns:
+        Counter: {collapsed stack: samples}; the collapsed stack starts with the thread name.
+    """
+    interval = 1.0 / hz
+    own_id = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    next_tick = time.perf_counter()
+    while True:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            if not include_idle and _is_idle(frame):
+                continue
+            labels = []
+            while frame is not None and len(labels) < max_depth:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(names.get(thread_id, f"thread-{thread_id}"))
+            counts[";".join(reversed(labels))] += 1
+        frame = None
+        next_tick += interval
+        now = time.perf_counter()
+        if now >= deadline:
+            return counts
+        # If sampling fell behind, skip ticks instead of bursting
+        if next_tick < now:
+            next_tick = now + interval
+        time.sleep(min(next_tick, deadline) - now)
+
+def collapse(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
+
+def py_spy_path() -> Optional[str]:
+    return shutil.which("py-spy")
+
+def run_py_spy(seconds: int, hz: int, subprocesses: bool, include_idle: bool, pid: int = None) -> str:
+    """
+    Records this process (and optionally its children) with py-spy.
+
+    Raises:
+        ProfilerUnavailableError: If py-spy is missing or fails (commonly: no ptrace permission).
+    """
+    binary = py_spy_path()
+    if binary is None:
+        raise ProfilerUnavailableError("py-spy is not installed")
+    fd, out_path = tempfile.mkstemp(suffix=".folded", prefix="pyspy_")
+    os.close(fd)
+    cmd = [binary, "record", "--pid", str(pid or os.getpid()), "--duration", str(seconds), "--rate", str(hz),
+           "--format", "raw", "--output", out_path, "--nonblocking", "--threads"]
+    if subprocesses:
+        cmd.append("--subprocesses")
+    if include_idle:
+        cmd.append("--idle")
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=seconds + 30)
+        if proc.returncode != 0:
+            raise ProfilerUnavailableError(f"py-spy failed ({proc.returncode}): {proc.stderr.strip()[-500:]}")
+        with open(out_path, encoding="utf-8") as f:
+            return f.read()
+    except subprocess.TimeoutExpired as e:
+        raise ProfilerUnavailableError("py-spy did not finish in time") from e
+    finally:
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+
+class Profiler:
+    """
+    Serialises profile requests and runs each one on a dedicated thread.
+    """
+
+    def __init__(self, max_seconds: float = 60.0, max_hz: float = 250.0):
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self._lock = threading.Lock()
+        self._runs = 0
+
+    async def profile(self, seconds: float, hz: float = 100.0, mode: str = "sampler", include_idle: bool = False,
+                      subprocesses: bool = False) -> dict:
+        """
+        Returns:
+            dict: {"mode", "seconds", "hz", "samples", "stacks": collapsed text}
+
+        Raises:
+            ValueError: On an unknown mode or a non-positive or non-finite duration/rate.
+            ProfilerBusyError: If another profile is running.
+            ProfilerUnavailableError: If the py-spy backend cannot run.
+        """
+        if mode not in PROFILER_MODES:
+            raise ValueError(f"Unknown profiler mode: {mode} (expected one of {PROFILER_MODES})")
+        if not (math.isfinite(seconds) and math.isfinite(hz)) or seconds <= 0 or hz <= 0:
+            raise ValueError("seconds and hz must be positive, finite numbers")
+        seconds = min(seconds, self.max_seconds)
+        hz = min(hz, self.max_hz)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError("A profile is already running")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def deliver(setter, value):
+            if not future.done():  # the request may have been cancelled meanwhile
+                setter(value)
+
+        def work():
+            # Runs on its own thread, not the shared executor, so it is never queued behind
+            # real work. The lock is held until the profile really ends, even if the request
+            # that started it goes away.
+            try:
+                if mode == "py-spy":
+                    stacks = run_py_spy(int(round(seconds)) or 1, int(hz), subprocesses, include_idle)
+                    samples = sum(int(line.rsplit(" ", 1)[1]) for line in stacks.splitlines() if " " in line)
+                else:
+                    counts = sample_stacks(seconds, hz, include_idle)
+                    stacks, samples = collapse(counts), sum(counts.values())
+                self._runs += 1
+                result = {"mode": mode, "seconds": seconds, "hz": hz, "samples": samples, "stacks": stacks}
+                loop.call_soon_threadsafe(deliver, future.set_result, result)
+            except Exception as e:
+                loop.call_soon_threadsafe(deliver, future.set_exception, e)
+            finally:
+                self._lock.release()
+
+        threading.Thread(target=work, name="profiler-sampler", daemon=True).start()
+        return await future
+
+    def stats(self) -> dict:
+        return {
+            "running": self._lock.locked(),
+            "runs": self._runs,
+            "max_seconds": self.max_seconds,
+            "max_hz": self.max_hz,
+            "py_spy": py_spy_path(),
+        }
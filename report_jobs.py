@@ -0,0 +1,233 @@
+"""
+Asynchronous report jobs: submit, poll, download.
+
+A report request becomes a job that runs in the background and writes its artifact
+(PDF or CSV) to a file under `artifact_dir`. Clients poll the job status and
+download the file once it is done, so a long render no longer holds an HTTP
+connection open.
+
+- At most `max_concurrent` jobs render at a time (the rest wait as "queued"), and
+  at most `max_pending` jobs may be queued or running; beyond that submit() raises
+  ReportJobsBusyError. This keeps report load from crowding out live notifications.
+- A request identical to a queued or running job (same kind, house and range)
+  returns that job instead of starting a new one.
+- Finished and failed jobs, and their files, are removed `ttl_seconds` after they
+  finish. A failed or cancelled job leaves no file (or `.tmp` file) behind.
+- wait() lets a synchronous endpoint submit a job and return its file, so direct
+  downloads share the same concurrency and pending limits.
+
+Artifacts are produced by per-kind async callables, registered by the server:
+`producer(house_id, start_dt, end_dt, path)` must write the artifact to `path`.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+Producer = Callable[[str, datetime, datetime, str], Awaitable[None]]
+
+def write_artifact(path: str, chunks: Iterable[Union[str, bytes]]):
+    """
+    Writes str (UTF-8) / bytes chunks to `path` atomically (temp file + rename).
+    The temp file is removed if producing or writing the chunks fails.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _discard(tmp_path)
+        raise
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Could not remove report artifact {path}: {e}")
+
+class ReportJobsBusyError(RuntimeError):
+    """
+    Raised by submit() when too many report jobs are already pending.
+    """
+
+@dataclass
+class ReportJob:
+    job_id: str
+    kind: str
+    house_id: str
+    start_dt: datetime
+    end_dt: datetime
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    path: Optional[str] = None
+    size: Optional[int] = None
+    error: Optional[str] = None
+    merged_requests: int = 0
+
+    @property
+    def key(self) -> tuple:
+        return (self.kind, self.house_id, self.start_dt, self.end_dt)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "house_id": self.house_id,
+            "start_date": self.start_dt.strftime("%Y-%m-%d"),
+            "end_date": self.end_dt.strftime("%Y-%m-%d"),
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "size": self.size,
+            "error": self.error,
+            "merged_requests": self.merged_requests,
+        }
+
+class ReportJobManager:
+    """
+    Runs report jobs in the background with bounded concurrency, de-duplication and TTL.
+    """
+
+    def __init__(self, producers: Dict[str, Producer], artifact_dir: str = "data/reports",
+                 max_concurrent: int = 2, max_pending: int = 32, ttl_seconds: float = 3600.0):
+        self.producers = producers
+        self.artifact_dir = artifact_dir
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._jobs: Dict[str, ReportJob] = {}
+        self._active: Dict[tuple, str] = {}  # key -> job_id of the queued/running job
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._cleanup_task: Optional[asyncio.Task] = None
+        self._stats = {"submitted": 0, "merged": 0, "rejected": 0, "done": 0, "failed": 0, "expired": 0}
+        os.makedirs(artifact_dir, exist_ok=True)
+
+    async def start(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop())
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        if self._cleanup_task is not None:
+            tasks.append(self._cleanup_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = {}
+        self._cleanup_task = None
+        for job in list(self._jobs.values()):
+            self._remove(job)
+
+    def submit(self, kind: str, house_id: str, start_dt: datetime, end_dt: datetime) -> ReportJob:
+        """
+        Starts a report job, or returns the identical job that is already queued or running.
+
+        Raises:
+            ValueError: If `kind` has no registered producer.
+            ReportJobsBusyError: If max_pending jobs are already queued or running.
+        """
+        if kind not in self.producers:
+            raise ValueError(f"Unknown report kind: {kind}")
+        key = (kind, house_id, start_dt, end_dt)
+        job_id = self._active.get(key)
+        if job_id is not None:
+            job = self._jobs[job_id]
+            job.merged_requests += 1
+            self._stats["merged"] += 1
+            return job
+        if len(self._active) >= self.max_pending:
+            self._stats["rejected"] += 1
+            raise ReportJobsBusyError(f"{len(self._active)} report jobs pending (limit {self.max_pending})")
+
+        job = ReportJob(job_id=uuid.uuid4().hex, kind=kind, house_id=house_id, start_dt=start_dt, end_dt=end_dt)
+        self._jobs[job.job_id] = job
+        self._active[key] = job.job_id
+        self._stats["submitted"] += 1
+        self._tasks[job.job_id] = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: ReportJob) -> ReportJob:
+        """
+        Waits until `job` is done or failed and returns it. Cancelling the waiter does not
+        cancel the job, which other requests may have been merged into.
+        """
+        task = self._tasks.get(job.job_id)
+        if task is not None:
+            await asyncio.shield(task)
+        return job
+
+    async def _run(self, job: ReportJob):
+        path = os.path.join(self.artifact_dir, f"{job.job_id}.{job.kind}")
+        try:
+            async with self._semaphore:
+                job.status = JOB_RUNNING
+                job.started_at = time.time()
+                await self.producers[job.kind](job.house_id, job.start_dt, job.end_dt, path)
+            job.path = path
+            job.size = os.path.getsize(path)
+            job.status = JOB_DONE
+            self._stats["done"] += 1
+        except asyncio.CancelledError:
+            job.status = JOB_FAILED
+            job.error = "cancelled"
+            raise
+        except Exception as e:
+            logger.exception(f"Report job {job.job_id} ({job.kind}, {job.house_id}) failed: {e}")
+            job.status = JOB_FAILED
+            job.error = str(e)
+            self._stats["failed"] += 1
+        finally:
+            if job.status != JOB_DONE:
+                _discard(path)
+                _discard(path + ".tmp")
+            job.finished_at = time.time()
+            self._active.pop(job.key, None)
+            self._tasks.pop(job.job_id, None)
+
+    def _remove(self, job: ReportJob):
+        self._jobs.pop(job.job_id, None)
+        if job.path:
+            _discard(job.path)
+
+    async def _cleanup_loop(self):
+        while True:
+            await asyncio.sleep(max(1.0, min(60.0, self.ttl_seconds / 4)))
+            cutoff = time.time() - self.ttl_seconds
+            for job in list(self._jobs.values()):
+                if job.finished_at is not None and job.finished_at < cutoff:
+                    self._remove(job)
+                    self._stats["expired"] += 1
+
+    def stats(self) -> dict:
+        counts = {JOB_QUEUED: 0, JOB_RUNNING: 0, JOB_DONE: 0, JOB_FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            **self._stats,
+            "jobs": counts,
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "ttl_seconds": self.ttl_seconds,
+        }
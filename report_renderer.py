@@ -0,0 +1,341 @@
+"""
+Report rendering (PDF and CSV) off the event loop.
+
+main imports this module only on the first report request, so ingest-only
+processes never load it; matplotlib and ReportLab are further imported only
+inside the chart workers and the PDF builder.
+
+Charts (weekly heatmap, critical-event waveform, class distribution pie) are
+rendered in parallel by a process pool: pyplot keeps global state and is not
+thread-safe, and the "spawn" start method keeps the workers free of the
+server's TensorFlow state. Workers receive only small, already-aggregated data
+(a 7x24 count grid and class counts from NoiseAggregates, a 300-point signature)
+and return PNG bytes. The PNGs are cached by (house, range, chart, data version),
+so repeated reports over unchanged data skip matplotlib entirely.
+
+The PDF itself is built with ReportLab on a thread. The event table is streamed
+from the event log in chunks and split into several Tables with a repeated header
+row, so long ranges produce multi-page tables, and the document is written to a
+SpooledTemporaryFile that only moves to disk once it gets large.
+"""
+import asyncio
+import csv
+import io
+import logging
+import multiprocessing
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from event_log import EventLog
+from noise_aggregates import NoiseAggregates
+from noise_metrics import get_noise_degree_batch
+
+logger = logging.getLogger(__name__)
+
+TABLE_HEADER = ['Time', 'Type', 'Max', '1m Avg', '5m Avg', 'Degree', 'Sev']
+TABLE_COLUMNS = ["timestamp", "result", "db_level", "avg_1min", "avg_5min", "severity", "hour"]
+DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+# --- Chart rendering (runs in worker processes) ---
+def _pyplot():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+def _to_png(plt, fig, **kwargs) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', **kwargs)
+    plt.close(fig)
+    return buf.getvalue()
+
+def render_waveform_png(audio_signature: List[float]) -> Optional[bytes]:
+    if not audio_signature: return None
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 2))
+    ax.plot(audio_signature, color='#3182F6', linewidth=1)
+    ax.set_title('Event Waveform', fontsize=10)
+    ax.axis('off')
+    return _to_png(plt, fig, bbox_inches='tight', pad_inches=0)
+
+def render_heatmap_png(counts: List[List[int]]) -> Optional[bytes]:
+    """
+    counts: 7x24 grid of Red/Yellow event counts (weekday x hour, Monday first).
+    """
+    grid = np.asarray(counts)
+    if grid.sum() == 0: return None
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(8, 3))
+    cax = ax.pcolormesh(np.arange(24), np.arange(7), grid, cmap='YlOrRd', shading='auto')
+    fig.colorbar(cax, label='Event Count')
+    ax.set_title('Weekly Heatmap', fontsize=10)
+    ax.set_yticks(np.arange(7) + 0.5)
+    ax.set_yticklabels(DAYS, fontsize=8)
+    ax.invert_yaxis()
+    return _to_png(plt, fig, dpi=150)
+
+def render_pie_png(stats: Dict[str, int]) -> Optional[bytes]:
+    labels = list(stats.keys())
+    sizes = list(stats.values())
+    if sum(sizes) == 0: return None
+    plt = _pyplot()
+    fig, ax = plt.subplots(figsize=(5, 3))
+    ax.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')
+    return _to_png(plt, fig, dpi=150)
+
+class ChartCache:
+    """
+    Thread-safe LRU of rendered chart PNGs (None results are cached too).
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[tuple, Optional[bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return True, self._items[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: tuple, png: Optional[bytes]):
+        with self._lock:
+            self._items[key] = png
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._items),
+                "bytes": sum(len(v) for v in self._items.values() if v),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+@lru_cache(maxsize=1)
+def _font_name() -> str:
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    try:
+        pdfmetrics.registerFont(TTFont('Pretendard', 'Pretendard.ttf'))
+        return 'Pretendard'
+    except Exception:
+        # 폰트 파일이 없을 경우를 대비한 기본값
+        logger.error("❌ 한글 폰트 로드 실패! 'Pretendard.ttf' 파일 확인 필요.")
+        return 'Helvetica'
+
+def iter_file(f, chunk_size: int = 64 * 1024):
+    """
+    Yields a file's content in chunks and closes it (for StreamingResponse).
+    """
+    try:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield data
+    finally:
+        f.close()
+
+# --- CSV ---
+CSV_HEADER = ['timestamp', 'event', 'result', 'db', '1min_avg', '5min_avg', 'noise_degree', 'legal_review', 'lmax_count', 'prob', 'severity', 'vib_max', 'mediation']
+CSV_COLUMNS = ["timestamp", "event_id", "kind", "result", "db_level", "avg_1min", "avg_5min", "legal_review",
+               "lmax_count", "probability", "severity", "vibration_max", "mediation_sent", "hour"]
+
+def iter_csv_report(event_log: EventLog, house_id: str, start_dt: datetime, end_dt: datetime, chunk_size: int = 2000):
+    """
+    Yields the CSV report as text chunks, newest first, reading the event log one
+    keyset page at a time (constant memory).
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    output.write(u'\ufeff')
+    writer.writerow(CSV_HEADER)
+    yield output.getvalue()
+
+    for rows in event_log.iter_chunks(house_id, start_dt, end_dt, CSV_COLUMNS, chunk_size=chunk_size):
+        (timestamps, event_ids, kinds, results, dbs, avg_1, avg_5, legal, lmax, probs, sevs, vib, mediation,
+         hours) = zip(*rows)
+        is_analysis = np.array(kinds) == "analysis"
+        avg_1 = np.array(avg_1, dtype=np.float64)
+        avg_5 = np.array(avg_5, dtype=np.float64)
+        degrees = get_noise_degree_batch(avg_1, avg_5, np.array(hours))
+        avg_1 = np.where(is_analysis, np.nan_to_num(avg_1), 0.0).tolist()
+        avg_5 = np.where(is_analysis, np.nan_to_num(avg_5), 0.0).tolist()
+        vib = [v if a else 0 for v, a in zip(vib, is_analysis)]
+        legal = [l if a else "" for l, a in zip(legal, is_analysis)]
+        lmax = [m if a else 0 for m, a in zip(lmax, is_analysis)]
+        event_ids = [e if a else None for e, a in zip(event_ids, is_analysis)]
+        mediation = [bool(m) if a else None for m, a in zip(mediation, is_analysis)]
+        sevs = [s if a else None for s, a in zip(sevs, is_analysis)]
+
+        output.seek(0)
+        output.truncate()
+        writer.writerows(zip(timestamps, event_ids, results, dbs, avg_1, avg_5, degrees, legal, lmax, probs, sevs, vib, mediation))
+        yield output.getvalue()
+
+class ReportRenderer:
+    """
+    Renders PDF reports from the event log with a chart process pool and a chart cache.
+    """
+
+    def __init__(self, event_log: EventLog, aggregates: NoiseAggregates, workers: int = 2, cache_entries: int = 256,
+                 table_max_rows: int = 5000, table_chunk_rows: int = 500, spool_max_bytes: int = 8 * 1024 * 1024):
+        self.event_log = event_log
+        self.aggregates = aggregates
+        self.workers = workers
+        self.table_max_rows = table_max_rows
+        self.table_chunk_rows = table_chunk_rows
+        self.spool_max_bytes = spool_max_bytes
+        self.cache = ChartCache(cache_entries)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._rendered = 0
+
+    def start(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def stop(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _chart_inputs(self, house_id: str, start_dt: datetime, end_dt: datetime) -> dict:
+        critical = self.event_log.query(house_id, start_dt, end_dt, severities=["Red"], limit=1)
+        signature = critical[0].get("analysis", {}).get("audio_signature") if critical else None
+        return {
+            "version": self.event_log.data_version(house_id, start_dt, end_dt),
+            "heatmap": self.aggregates.heatmap(house_id, start_dt, end_dt, ("Red", "Yellow")).tolist(),
+            "waveform": signature,
+            "pie": self.aggregates.class_counts(house_id, start_dt, end_dt),
+        }
+
+    async def _chart(self, key: tuple, func, arg) -> Optional[bytes]:
+        found, png = self.cache.get(key)
+        if found:
+            return png
+        self.start()
+        png = await asyncio.get_running_loop().run_in_executor(self._pool, func, arg)
+        self.cache.put(key, png)
+        return png
+
+    async def render_pdf(self, house_id: str, start_dt: datetime, end_dt: datetime, io_executor: Executor):
+        """
+        Renders one report without blocking the event loop.
+
+        Returns:
+            tempfile.SpooledTemporaryFile: The PDF, positioned at offset 0. The caller closes it.
+        """
+        loop = asyncio.get_running_loop()
+        inputs = await loop.run_in_executor(io_executor, self._chart_inputs, house_id, start_dt, end_dt)
+        base_key = (house_id, start_dt.timestamp(), end_dt.timestamp(), inputs["version"])
+        heatmap, waveform, pie = await asyncio.gather(
+            self._chart(base_key + ("heatmap",), render_heatmap_png, inputs["heatmap"]),
+            self._chart(base_key + ("waveform",), render_waveform_png, inputs["waveform"]),
+            self._chart(base_key + ("pie",), render_pie_png, inputs["pie"]),
+        )
+        pdf = await loop.run_in_executor(io_executor, self._build_pdf, house_id, start_dt, end_dt, heatmap, waveform, pie)
+        self._rendered += 1
+        return pdf
+
+    def _table_rows(self, house_id: str, start_dt: datetime, end_dt: datetime):
+        """
+        Yields lists of table rows (newest first), at most table_max_rows in total.
+        """
+        remaining = self.table_max_rows
+        for rows in self.event_log.iter_chunks(house_id, start_dt, end_dt, TABLE_COLUMNS,
+                                               chunk_size=min(self.table_chunk_rows, remaining)):
+            rows = rows[:remaining]
+            timestamps, results, dbs, avg_1, avg_5, sevs, hours = zip(*rows)
+            degrees = get_noise_degree_batch(np.array(avg_1, dtype=np.float64), np.array(avg_5, dtype=np.float64), np.array(hours))
+            yield [
+                [ts[11:19], result, f"{db or 0:.1f}", f"{a1 or 0:.1f}", f"{a5 or 0:.1f}", degree, sev]
+                for ts, result, db, a1, a5, degree, sev in zip(timestamps, results, dbs, avg_1, avg_5, degrees, sevs)
+            ]
+            remaining -= len(rows)
+            if remaining <= 0:
+                return
+
+    def _build_pdf(self, house_id: str, start_dt: datetime, end_dt: datetime,
+                   heatmap: Optional[bytes], waveform: Optional[bytes], pie: Optional[bytes]):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.units import inch
+        from reportlab.lib import colors
+        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Image, Spacer
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.enums import TA_CENTER
+
+        font_name = _font_name()
+        out = tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+        doc = SimpleDocTemplate(out, pagesize=A4)
+        story = []
+        styles = getSampleStyleSheet()
+
+        korean_style = ParagraphStyle(name='KoreanStyle', fontName=font_name, fontSize=20, alignment=TA_CENTER, spaceAfter=20)
+        body_style = ParagraphStyle(name='BodyStyle', fontName=font_name, fontSize=10, leading=15)
+        story.append(Paragraph(f"층간소음 분석 리포트: {house_id}", korean_style))
+        story.append(Paragraph(f"측정 기간: {start_dt:%Y-%m-%d} ~ {end_dt:%Y-%m-%d}", body_style))
+
+        # 층간소음 기준 안내 텍스트
+        story.append(Spacer(1, 10))
+        story.append(Paragraph("<b>[층간소음 및 수인한도 기준 안내]</b>", styles['Normal']))
+        story.append(Paragraph("• 주간(06~22시): 1분 평균 39dB 초과 시 문제 소음 / 수인한도 40dB / 5분 평균 45dB 초과 시 층간소음", styles['Normal']))
+        story.append(Paragraph("• 야간(22~06시): 1분 평균 34dB 초과 시 문제 소음 / 수인한도 35dB / 5분 평균 40dB 초과 시 층간소음", styles['Normal']))
+        story.append(Paragraph("• 소음 예시: 30dB(조용한 주택가), 40dB(낮은 TV), 50dB(보통 대화), 60dB(식당 대화)", styles['Normal']))
+        story.append(Spacer(1, 10))
+
+        if heatmap: story.append(Image(io.BytesIO(heatmap), width=6*inch, height=2.5*inch))
+        if waveform: story.append(Image(io.BytesIO(waveform), width=6*inch, height=1.5*inch))
+        if pie: story.append(Image(io.BytesIO(pie), width=4*inch, height=2.4*inch))
+
+        table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        col_widths = [0.8*inch, 1.3*inch, 0.5*inch, 0.6*inch, 0.6*inch, 1.3*inch, 0.6*inch]
+        total = 0
+        for rows in self._table_rows(house_id, start_dt, end_dt):
+            if total == 0:
+                story.append(Spacer(1, 12))
+                story.append(Paragraph("Detailed Event Log", styles['Heading2']))
+            # One Table per chunk keeps ReportLab's page splitting cheap; the header repeats on every page
+            t = Table([TABLE_HEADER] + rows, colWidths=col_widths, repeatRows=1)
+            t.setStyle(table_style)
+            story.append(t)
+            total += len(rows)
+        if total >= self.table_max_rows:
+            story.append(Paragraph(f"(최신 {self.table_max_rows}건만 표시, 전체 내역은 CSV 리포트 참고)", body_style))
+
+        doc.build(story)
+        out.seek(0)
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pool_started": self._pool is not None,
+            "rendered": self._rendered,
+            "chart_cache": self.cache.stats(),
+        }
@@ -0,0 +1,139 @@
+"""
+Cached polyphase resampler for the sensor sample rates (22050 / 44100 Hz -> 16 kHz).
+
+librosa.resample designs its filter on every call. Here the anti-aliasing FIR
+kernel, split into its `up` polyphase branches, is designed once per
+(orig_sr, target_sr) pair; only that (up x taps) table is cached, so memory does
+not grow with packet length or with the number of distinct lengths seen. Output
+samples repeat their phase every `up` samples, so a packet (or a batch of
+equal-length packets) is resampled by one strided gather of input windows and
+one multiply-add against the phase table.
+
+The filter matches scipy.signal.resample_poly's default design (Kaiser window,
+beta=5.0, 10 zero crossings per side), and output alignment matches
+resample_poly as well.
+
+Accuracy: against librosa.resample (default soxr_hq), relative RMS error is
+within RESAMPLE_TOLERANCE (1e-2, i.e. -40 dB) for content band-limited to
+0.8 x the target Nyquist frequency. benchmarks/bench_resample.py checks this.
+"""
+import logging
+from functools import lru_cache
+from math import gcd
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.signal import firwin
+
+logger = logging.getLogger(__name__)
+
+RESAMPLE_TOLERANCE = 1e-2
+KAISER_BETA = 5.0
+ZERO_CROSSINGS = 10
+
+@lru_cache(maxsize=16)
+def _kernel(orig_sr: int, target_sr: int) -> Tuple[int, int, np.ndarray]:
+    """
+    Low-pass FIR kernel for an (orig_sr -> target_sr) conversion.
+
+    Returns:
+        (up, down, h): Rational factors and the filter taps (length 2 * half_len + 1),
+                       scaled by `up` to preserve amplitude.
+    """
+    g = gcd(orig_sr, target_sr)
+    up, down = target_sr // g, orig_sr // g
+    max_rate = max(up, down)
+    half_len = ZERO_CROSSINGS * max_rate
+    h = firwin(2 * half_len + 1, 1.0 / max_rate, window=("kaiser", KAISER_BETA)) * up
+    return up, down, h
+
+@lru_cache(maxsize=16)
+def _phases(orig_sr: int, target_sr: int) -> Tuple[int, int, int, np.ndarray, np.ndarray]:
+    """
+    Polyphase table for an (orig_sr -> target_sr) conversion.
+
+    Output sample m = c * up + r (cycle c, residue r) is
+    sum_k xp[base[r] + c * down + k] * weights[r, k], where xp is the input with
+    taps - 1 leading zeros: the taps are the polyphase branch of h centred on
+    position m * down of the upsampled signal, reversed to match window order.
+
+    Returns:
+        (up, down, taps, base, weights): base is (up,) int64, weights (up, taps) float32.
+    """
+    up, down, h = _kernel(orig_sr, target_sr)
+    half_len = (h.size - 1) // 2
+    taps = -(-h.size // up)
+
+    padded = np.zeros(taps * up)
+    padded[:h.size] = h
+    poly = padded.reshape(taps, up).T  # poly[phase, j] = h[phase + j * up]
+
+    base, phase = np.divmod(np.arange(up, dtype=np.int64) * down + half_len, up)
+    weights = np.ascontiguousarray(poly[phase][:, ::-1], dtype=np.float32)
+    base.setflags(write=False)
+    weights.setflags(write=False)
+    return up, down, taps, base, weights
+
+def resample_batch(batch: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resamples a (B, N) batch of equal-length waveforms.
+
+    Returns:
+        np.ndarray: (B, ceil(N * target_sr / orig_sr)) float32.
+    """
+    batch = np.asarray(batch, dtype=np.float32)
+    if orig_sr == target_sr:
+        return batch
+    up, down, taps, base, weights = _phases(orig_sr, target_sr)
+    n_in = batch.shape[-1]
+    n_out = -(-n_in * up // down)
+    if n_out == 0:
+        return np.zeros((batch.shape[0], 0), dtype=np.float32)
+    cycles = -(-n_out // up)
+    starts = base[None, :] + (np.arange(cycles, dtype=np.int64) * down)[:, None]  # (cycles, up)
+    right = max(0, int(starts[-1, -1]) + 1 - n_in)
+    xp = np.pad(batch, ((0, 0), (taps - 1, right)))
+    windows = np.lib.stride_tricks.sliding_window_view(xp, taps, axis=-1)  # view, no copy
+    out = np.einsum("bcut,ut->bcu", windows[:, starts], weights)
+    return out.reshape(batch.shape[0], -1)[:, :n_out]
+
+def resample(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    Resamples a single 1-D waveform.
+    """
+    audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+    if orig_sr == target_sr:
+        return audio
+    return resample_batch(audio[None, :], orig_sr, target_sr)[0]
+
+def resample_many(waveforms: List[np.ndarray], orig_srs: List[int], target_sr: int) -> List[Optional[np.ndarray]]:
+    """
+    Resamples waveforms of mixed rates and lengths, batching those that share
+    (orig_sr, length) into one call.
+
+    Failures are isolated: if a group fails, its waveforms are retried one by one,
+    and any that still fail come back as None (logged) while the rest succeed.
+    """
+    out: List[Optional[np.ndarray]] = [None] * len(waveforms)
+    groups = {}
+    for i, (wf, sr) in enumerate(zip(waveforms, orig_srs)):
+        try:
+            flat = np.asarray(wf, dtype=np.float32).reshape(-1)
+            groups.setdefault((int(sr), flat.size), []).append((i, flat))
+        except (TypeError, ValueError) as e:
+            logger.error(f"Cannot resample waveform {i}: {e}")
+    for (sr, _), members in groups.items():
+        try:
+            resampled = resample_batch(np.stack([flat for _, flat in members]), sr, target_sr)
+            for row, (i, _) in enumerate(members):
+                out[i] = resampled[row]
+        except Exception:
+            for i, flat in members:
+                try:
+                    out[i] = resample_batch(flat[None, :], sr, target_sr)[0]
+                except Exception as e:
+                    logger.error(f"Error resampling waveform {i} ({sr}Hz -> {target_sr}Hz): {e}")
+    return out
+
+def cache_info() -> dict:
+    return {"kernels": _kernel.cache_info()._asdict(), "phases": _phases.cache_info()._asdict()}
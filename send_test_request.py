@@ -2,45 +2,56 @@ import requests
 import json
 import time
 import random
+import math
 from datetime import datetime
 
-# The URL of your FastAPI server's predict endpoint
-URL = "http://localhost:8000/predict"
+# The URL of your FastAPI server's Mobius notification endpoint
+URL = "http://localhost:8000/notification"
+SAMPLING_RATE = 22050
 
 def generate_dummy_data():
-    """Generates a dummy data payload in the NewPayload format."""
+    """Generates a dummy sensor packet in the NewPayload format (1 s of raw sound ints)."""
     
     # Simulate some vibration data with occasional peaks
-    vibration_data = [random.uniform(0.5, 1.5) for _ in range(10)]
+    vibration_data = [random.uniform(0.95, 1.05) for _ in range(100)]
     if random.random() < 0.3: # 30% chance of a significant peak
-        peak_index = random.randint(0, 9)
-        vibration_data[peak_index] = random.uniform(2.5, 4.0)
+        peak_index = random.randint(0, 99)
+        vibration_data[peak_index] = random.uniform(1.3, 1.6)
 
-    # Simulate some sound feature data
-    sound_features = [random.random() for _ in range(20)]
+    # Simulate raw microphone samples: a low hum plus a short impact
+    freq = random.uniform(80, 400)
+    sound_raw = [int(2000 * math.sin(2 * math.pi * freq * i / SAMPLING_RATE) + random.gauss(0, 200))
+                 for i in range(SAMPLING_RATE)]
+    impact = random.randint(0, SAMPLING_RATE - 800)
+    for i in range(800):
+        sound_raw[impact + i] += int(12000 * math.exp(-i / 120.0))
 
     payload = {
         "house_id": "Below_301",
-        "timestamp": datetime.now().isoformat() + "Z",
+        "timestamp": datetime.now().isoformat(),
         "meta": {
-            "sampling_rate": "22050Hz",
+            "sampling_rate": f"{SAMPLING_RATE}Hz",
             "vibration_unit": "g",
-            "sound_unit": "dB"
+            "sound_unit": "raw"
         },
         "payload": {
             "vibration": {
                 "z": vibration_data
             },
-            "sound_features": sound_features,
-            "raw_max_decibel": random.uniform(50.0, 85.0)
+            "sound_raw": sound_raw,
+            "raw_max_amplitude": max(abs(v) for v in sound_raw)
         }
     }
     return payload
 
+def wrap_notification(data):
+    """Wraps a sensor packet the way Mobius delivers it: a subscription notification whose cin `con` is a JSON string."""
+    return {"m2m:sgn": {"nev": {"rep": {"m2m:cin": {"con": json.dumps(data)}}, "net": 3}, "sur": "test"}}
+
 def send_request(data):
     """Sends a POST request to the server with the given data."""
     try:
-        response = requests.post(URL, headers={"Content-Type": "application/json"}, data=json.dumps(data))
+        response = requests.post(URL, headers={"Content-Type": "application/json"}, data=json.dumps(wrap_notification(data)))
         response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx) 
         
         print("Request successful!")
@@ -62,8 +73,8 @@ if __name__ == "__main__":
     print("--- Sending a test request to the AI Server ---")
     dummy_data = generate_dummy_data()
     
-    print("\nGenerated Payload:")
-    print(json.dumps(dummy_data, indent=2))
+    print("\nGenerated Payload (sound_raw truncated):")
+    print(json.dumps({**dummy_data, "payload": {**dummy_data["payload"], "sound_raw": dummy_data["payload"]["sound_raw"][:10]}}, indent=2))
     
     print(f"\nSending POST request to {URL}...")
     send_request(dummy_data)
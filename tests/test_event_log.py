@@ -0,0 +1,44 @@
+import sqlite3
+
+from event_log import EventLog
+
+def _analysis(house_id: str, event_id: str, timestamp: str = "2026-01-01T10:00:00") -> dict:
+    return {"event_id": event_id, "house_id": house_id, "timestamp": timestamp,
+            "analysis": {"severity": "Red", "result": "Footstep", "db_level": 60.0}}
+
+def _rows(path) -> list:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT house_id, event_id FROM events ORDER BY house_id").fetchall()
+    finally:
+        conn.close()
+
+def test_same_event_id_in_two_houses_is_kept(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    log = EventLog(path)
+
+    # Legacy ids have one-second resolution and no house id
+    assert log.write_now([_analysis("101", "EVT_20260101100000"), _analysis("102", "EVT_20260101100000")]) == 2
+    assert log.write_now([_analysis("101", "EVT_20260101100000")]) == 0
+    assert _rows(path) == [("101", "EVT_20260101100000"), ("102", "EVT_20260101100000")]
+
+def test_event_id_only_key_is_migrated(tmp_path):
+    path = str(tmp_path / "events.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE events (
+            event_id TEXT PRIMARY KEY, house_id TEXT NOT NULL, ts REAL NOT NULL, timestamp TEXT NOT NULL,
+            kind TEXT NOT NULL, severity TEXT, result TEXT, probability REAL, db_level REAL, avg_1min REAL,
+            avg_5min REAL, vibration_max REAL, mediation_sent INTEGER, legal_review TEXT, lmax_count INTEGER,
+            payload TEXT NOT NULL
+        );
+        CREATE INDEX idx_events_house_ts ON events(house_id, ts);
+        INSERT INTO events (event_id, house_id, ts, timestamp, kind, payload)
+            VALUES ('EVT_20260101100000', '101', 0, '2026-01-01T10:00:00', 'analysis', '{}');
+    """)
+    conn.close()
+
+    log = EventLog(path)
+    assert log.write_now([_analysis("102", "EVT_20260101100000")]) == 1
+    assert _rows(path) == [("101", "EVT_20260101100000"), ("102", "EVT_20260101100000")]
+    assert log.stats()["rows"] == 2
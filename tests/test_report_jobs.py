@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import pytest
+
+from datetime import datetime
+
+from report_jobs import JOB_DONE, JOB_FAILED, ReportJobManager, write_artifact
+
+START = datetime(2026, 1, 1)
+END = datetime(2026, 1, 2)
+
+def _failing_chunks():
+    yield "header\n"
+    raise ValueError("render failed")
+
+def test_write_artifact_removes_tmp_on_failure(tmp_path):
+    path = str(tmp_path / "report.csv")
+    with pytest.raises(ValueError):
+        write_artifact(path, _failing_chunks())
+    assert os.listdir(tmp_path) == []
+
+def test_failed_job_leaves_no_files(tmp_path):
+    async def produce(house_id, start_dt, end_dt, path):
+        with open(path + ".tmp", "w") as f:
+            f.write("partial")
+        raise RuntimeError("render failed")
+
+    async def scenario():
+        manager = ReportJobManager({"csv": produce}, artifact_dir=str(tmp_path))
+        await manager.start()
+        try:
+            return await manager.wait(manager.submit("csv", "101", START, END))
+        finally:
+            await manager.stop()
+
+    job = asyncio.run(scenario())
+    assert job.status == JOB_FAILED
+    assert os.listdir(tmp_path) == []
+
+def test_wait_returns_finished_job(tmp_path):
+    async def produce(house_id, start_dt, end_dt, path):
+        write_artifact(path, [f"{house_id}\n"])
+
+    async def scenario():
+        manager = ReportJobManager({"csv": produce}, artifact_dir=str(tmp_path))
+        await manager.start()
+        try:
+            first = manager.submit("csv", "101", START, END)
+            second = manager.submit("csv", "101", START, END)
+            job = await manager.wait(second)
+            with open(job.path) as f:
+                return first, job, f.read()
+        finally:
+            await manager.stop()
+
+    first, job, content = asyncio.run(scenario())
+    assert job is first and job.status == JOB_DONE
+    assert content == "101\n"
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("prometheus_client")
+
+from write_behind import SpoolJournal  # noqa: E402
+
+def _record(seq: int) -> dict:
+    return {"seq": seq, "container": "cnt_noise", "labels": None, "data": {"n": seq}}
+
+def _line(seq: int) -> bytes:
+    return (json.dumps(_record(seq)) + "\n").encode("utf-8")
+
+def _drain(journal: SpoolJournal) -> list:
+    seqs = []
+    while True:
+        entry = journal.peek()
+        if entry is None:
+            return seqs
+        record, next_offset = entry
+        seqs.append(record["seq"])
+        journal.commit(next_offset)
+
+def test_corrupt_line_is_quarantined_and_skipped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_bytes(_line(1) + b'{"seq": 2, "container": \n' + b"\xff\xfe not json\n" + _line(3))
+    journal = SpoolJournal(str(path))
+
+    assert _drain(journal) == [1, 3]
+    assert journal.corrupt == 2
+    assert (tmp_path / "journal.jsonl.corrupt").read_bytes().count(b"\n") == 2
+    assert journal.pending_bytes() == 0
+
+def test_partial_trailing_line_is_repaired_on_open(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_bytes(_line(1) + b'{"seq": 2, "contai')
+    journal = SpoolJournal(str(path))
+
+    assert path.read_bytes() == _line(1)
+    assert journal.corrupt == 1
+
+    # New records start on a fresh line instead of being glued onto the partial one
+    assert journal.append(_record(3))
+    assert journal.flush(timeout=5)
+    journal.close()
+    assert _drain(journal) == [1, 3]
+
+def test_partial_line_without_any_newline_is_dropped(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    path.write_bytes(b'{"seq": 1, "con')
+    journal = SpoolJournal(str(path))
+
+    assert path.read_bytes() == b""
+    assert journal.peek() is None
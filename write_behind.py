@@ -0,0 +1,462 @@
+"""
+Write-behind pipeline for Mobius uploads (CNT_STATUS / CNT_NOISE).
+
+The notification handler hands records to MobiusWriteBehind.submit(), which never
+waits on the network. Background workers upload with at most `max_in_flight`
+concurrent requests. When an upload fails because Mobius is slow or unreachable,
+the record goes to an append-only JSONL journal on disk and the writer switches to
+spooling mode: every later record is appended to the journal as well, so ordering
+is preserved. A replay task drains the journal in order once Mobius answers again,
+then returns to direct uploads.
+
+Records that Mobius rejects permanently (4xx other than 429) are logged and dropped,
+since replaying them would never succeed.
+
+Each record has a stable id, sent as the content instance's resource name (rn) on
+every attempt. If an upload times out after Mobius stored it, the retry or later
+replay gets 409 Conflict, which counts as uploaded, so each record is created at
+most once while it is still in the container.
+
+No journal I/O runs on the event loop. Appends go to an in-memory buffer, and a
+writer thread writes them in batches, with one optional fsync per batch. Replay
+reads and offset commits run in worker threads. The journal is capped at
+`max_spool_bytes`. Once the cap is reached, new records are dropped (newest
+first), counted in stats, and reported with an error log.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import List, Optional, Tuple
+
+from mobius_client import get_async_client, MobiusRequestError
+from metrics import MOBIUS_WRITE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+class SpoolJournal:
+    """
+    Append-only JSONL journal with a persisted read offset.
+
+    The offset file records how many bytes of the journal have been replayed, so a
+    restart resumes where replay stopped. The journal is truncated once fully drained.
+
+    append() only buffers the line. The "spool-writer" thread writes buffered lines in
+    order, in batches. `appended` and `written` count records, so callers can tell
+    whether everything appended so far has reached the file.
+
+    Damaged data never blocks replay. A partial last line (left by a crash or a failed
+    write) is moved to `<path>.corrupt` on open and after a failed write, so later
+    appends start on a fresh line. Lines that do not decode to a record are moved there
+    as well, and the offset skips past them.
+    """
+
+    def __init__(self, path: str, fsync: bool = False, max_bytes: Optional[int] = None):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()       # file contents and offset
+        self._cond = threading.Condition()  # buffer and counters
+        self._buffer: deque = deque()
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        self.appended = 0
+        self.written = 0
+        self.write_errors = 0
+        self.corrupt = 0
+        self.corrupt_path = path + ".corrupt"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._repair_tail()
+        try:
+            self._size = os.path.getsize(path)  # file bytes plus buffered bytes, until truncation
+        except FileNotFoundError:
+            self._size = 0
+
+    def _quarantine(self, data: bytes, reason: str):
+        self.corrupt += 1
+        logger.error(f"🗑️ Spool journal: {reason} ({len(data)} bytes) moved to {self.corrupt_path}")
+        try:
+            with open(self.corrupt_path, "ab") as f:
+                f.write(data if data.endswith(b"\n") else data + b"\n")
+        except OSError as e:
+            logger.error(f"❌ Could not write {self.corrupt_path}: {e}")
+
+    def _repair_tail(self, size: Optional[int] = None):
+        """
+        Truncates the journal to its last complete line (or to `size`, the length before a
+        failed write), quarantining the cut bytes. Caller holds self._lock.
+        """
+        try:
+            with open(self.path, "r+b") as f:
+                end = f.seek(0, os.SEEK_END)
+                if size is None:
+                    if end == 0:
+                        return
+                    # Scan back to the last newline
+                    keep = end
+                    while keep > 0:
+                        step = min(65536, keep)
+                        f.seek(keep - step)
+                        chunk = f.read(step)
+                        newline = chunk.rfind(b"\n")
+                        if newline != -1:
+                            keep = keep - step + newline + 1
+                            break
+                        keep -= step
+                    size = keep
+                if size >= end:
+                    return
+                f.seek(size)
+                tail = f.read()
+                f.truncate(size)
+        except FileNotFoundError:
+            return
+        self._quarantine(tail, "partial trailing record")
+
+    def append(self, record: dict) -> bool:
+        """
+        Buffers one record for the writer thread. Never touches the disk.
+
+        Returns:
+            bool: False if the record was not accepted because the journal is at max_bytes.
+        """
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        size = len(line.encode("utf-8"))
+        with self._cond:
+            if self.max_bytes and self._size + size > self.max_bytes:
+                return False
+            self._size += size
+            self._buffer.append(line)
+            self.appended += 1
+            if self._thread is None:
+                self._closing = False
+                self._thread = threading.Thread(target=self._write_loop, name="spool-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._buffer and not self._closing:
+                    self._cond.wait()
+                if not self._buffer:
+                    return
+                lines = list(self._buffer)
+                self._buffer.clear()
+            with self._lock:
+                try:
+                    before = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("".join(lines))
+                        f.flush()
+                        if self.fsync:
+                            os.fsync(f.fileno())
+                except OSError as e:
+                    self.write_errors += len(lines)
+                    logger.error(f"❌ Spool journal write failed, {len(lines)} records lost: {e}")
+                    # Drop whatever part of the batch did reach the file, so no half line remains
+                    try:
+                        self._repair_tail(before)
+                    except OSError as repair_error:
+                        logger.error(f"❌ Spool journal repair failed: {repair_error}")
+            with self._cond:
+                self.written += len(lines)
+                self._cond.notify_all()
+
+    def counts(self) -> Tuple[int, int]:
+        """
+        Returns (appended, written) record counts.
+        """
+        with self._cond:
+            return self.appended, self.written
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until every record appended before the call has been written.
+        """
+        with self._cond:
+            target = self.appended
+            return self._cond.wait_for(lambda: self.written >= target, timeout=timeout)
+
+    def close(self, timeout: float = 30.0):
+        """
+        Writes everything buffered and stops the writer thread.
+        """
+        with self._cond:
+            thread = self._thread
+            self._closing = True
+            self._cond.notify_all()
+        if thread is not None:
+            thread.join(timeout=timeout)
+        with self._cond:
+            self._thread = None
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _write_offset(self, offset: int):
+        tmp_path = self.offset_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+        os.replace(tmp_path, self.offset_path)
+
+    def pending_bytes(self) -> int:
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                return 0
+            return max(0, size - self._read_offset())
+
+    def peek(self) -> Optional[tuple]:
+        """
+        Returns (record, next_offset) for the oldest unreplayed record, or None if drained.
+        Undecodable lines are quarantined and skipped (the offset is committed past them).
+        """
+        with self._lock:
+            offset = self._read_offset()
+            while True:
+                try:
+                    with open(self.path, "rb") as f:
+                        f.seek(offset)
+                        line = f.readline()
+                except FileNotFoundError:
+                    return None
+                if not line:
+                    return None
+                if not line.endswith(b"\n"):
+                    # Only a crash can leave this (the writer holds the lock while writing)
+                    self._repair_tail()
+                    return None
+                try:
+                    record = json.loads(line.decode("utf-8"))
+                    if isinstance(record, dict) and "container" in record and "data" in record:
+                        return record, offset + len(line)
+                    reason = "malformed record"
+                except (UnicodeDecodeError, ValueError):
+                    reason = "undecodable record"
+                self._quarantine(line, f"{reason} at offset {offset}")
+                offset += len(line)
+                self._write_offset(offset)
+
+    def commit(self, next_offset: int):
+        """
+        Marks everything before next_offset as replayed; truncates the journal when drained.
+        """
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if next_offset >= size:
+                open(self.path, "w").close()
+                self._write_offset(0)
+                with self._cond:
+                    self._size -= size
+            else:
+                self._write_offset(next_offset)
+
+class MobiusWriteBehind:
+    """
+    Accepts analysis/status records immediately and uploads them in the background.
+    """
+
+    def __init__(self, journal_path: str, max_in_flight: int = 8, max_queue: int = 10000,
+                 replay_interval: float = 5.0, fsync: bool = False, max_spool_bytes: Optional[int] = None):
+        self.journal = SpoolJournal(journal_path, fsync=fsync, max_bytes=max_spool_bytes)
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.replay_interval = replay_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wake_replay: Optional[asyncio.Event] = None
+        self._spooling = False
+        self._in_flight = 0
+        self._seq = 0
+        self._stats = {"submitted": 0, "uploaded": 0, "spooled": 0, "replayed": 0, "dropped": 0,
+                       "spool_full_dropped": 0}
+        self._last_error: Optional[str] = None
+        self._last_error_time: Optional[float] = None
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._wake_replay = asyncio.Event()
+        # Leftovers from a previous run must be replayed before any new uploads
+        self._spooling = await asyncio.to_thread(self.journal.peek) is not None
+        if self._spooling:
+            pending = await asyncio.to_thread(self.journal.pending_bytes)
+            logger.warning(f"📼 Mobius spool journal has pending records ({pending} bytes); replaying first")
+        self._tasks = [asyncio.create_task(self._upload_worker(i)) for i in range(self.max_in_flight)]
+        self._tasks.append(asyncio.create_task(self._replay_loop()))
+
+    async def stop(self):
+        """
+        Stops background tasks; anything not yet uploaded is spooled for the next run.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._spool(self._queue.get_nowait())
+        await asyncio.to_thread(self.journal.close)
+
+    def submit(self, container_name: str, data: dict, labels: List[str] = None):
+        """
+        Queues one content instance for upload. Never blocks on Mobius.
+        """
+        self._seq += 1
+        record = {"seq": self._seq, "rid": uuid.uuid4().hex, "container": container_name, "labels": labels, "data": data,
+                  "queued_at": time.time()}
+        self._stats["submitted"] += 1
+        if self._spooling or self._queue is None:
+            self._spool(record)
+            return
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self._spool(record)
+
+    def _spool(self, record: dict):
+        if not self.journal.append(record):
+            self._stats["spool_full_dropped"] += 1
+            dropped = self._stats["spool_full_dropped"]
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.error(f"🚨 Mobius spool journal full ({self.journal.max_bytes} bytes): "
+                             f"{dropped} records dropped so far (seq={record.get('seq')})")
+        else:
+            self._stats["spooled"] += 1
+        if not self._spooling:
+            self._spooling = True
+            logger.warning("📼 Mobius unavailable: spooling uploads to disk journal")
+        if self._wake_replay is not None:
+            self._wake_replay.set()
+
+    async def _upload(self, record: dict) -> bool:
+        """
+        Returns True when the record is done (uploaded or permanently rejected),
+        False when it should be retried later.
+        """
+        self._in_flight += 1
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            rid = record.get("rid") or f"{record.get('seq')}-{int(record.get('queued_at', 0) * 1e6)}"
+            await get_async_client().create_content_instance(
+                record["data"], labels=record.get("labels"), container_name=record["container"], raise_on_error=True,
+                request_id=f"wb-{rid}", resource_name=f"wb-{rid}",
+            )
+            outcome = "uploaded"
+            return True
+        except MobiusRequestError as err:
+            if err.status is not None and 400 <= err.status < 500 and err.status != 429:
+                self._stats["dropped"] += 1
+                outcome = "rejected"
+                logger.error(f"🗑️ Mobius rejected record seq={record.get('seq')} ({err.status}); dropping")
+                return True
+            self._last_error = str(err)
+            self._last_error_time = time.time()
+            return False
+        finally:
+            self._in_flight -= 1
+            MOBIUS_WRITE_SECONDS.labels(record["container"], outcome).observe(time.perf_counter() - started)
+
+    async def _upload_worker(self, worker_id: int):
+        while True:
+            record = await self._queue.get()
+            try:
+                if self._spooling:
+                    # Keep order behind already-spooled records
+                    self._spool(record)
+                elif await self._upload(record):
+                    self._stats["uploaded"] += 1
+                else:
+                    self._spool(record)
+            except asyncio.CancelledError:
+                self._spool(record)
+                raise
+            except Exception as e:
+                logger.exception(f"Write-behind worker {worker_id} error: {e}")
+                self._spool(record)
+            finally:
+                self._queue.task_done()
+
+    async def _replay_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake_replay.wait(), timeout=self.replay_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_replay.clear()
+            if not self._spooling:
+                continue
+            try:
+                await self._replay()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.exception(f"Spool replay error: {e}")
+            if self._spooling:
+                # Mobius still down: back off before the next attempt
+                await asyncio.sleep(self.replay_interval)
+
+    async def _replay(self):
+        while True:
+            appended, written = self.journal.counts()
+            entry = await asyncio.to_thread(self.journal.peek)
+            if entry is None:
+                # Drained only if every record appended before the peek had reached the file,
+                # and nothing was appended since (appends happen on this loop, so nothing can
+                # slip in between this check and leaving spooling mode).
+                if written == appended and self.journal.counts()[0] == appended:
+                    self._spooling = False
+                    logger.info("✅ Mobius spool journal drained; resuming direct uploads")
+                    return
+                await asyncio.to_thread(self.journal.flush)
+                continue
+            record, next_offset = entry
+            if not await self._upload(record):
+                return
+            await asyncio.to_thread(self.journal.commit, next_offset)
+            self._stats["replayed"] += 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def spooling(self) -> bool:
+        return self._spooling
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "spooling": self._spooling,
+            "spool_pending_bytes": self.journal.pending_bytes(),
+            "spool_max_bytes": self.journal.max_bytes,
+            "spool_write_errors": self.journal.write_errors,
+            "spool_corrupt": self.journal.corrupt,
+            "last_error": self._last_error,
+            "last_error_time": self._last_error_time,
+        }
@@ -0,0 +1,151 @@
+"""
+Compact binary encoding of analysis events for the dashboard WebSocket.
+
+JSON text frames remain the default. A connection opts in with `/ws?encoding=f16`
+or `/ws?encoding=int8` (or the control message {"action": "encoding", "encoding": ...});
+it then receives analysis events as binary frames, and every other message
+(apologies, mock status, ...) as JSON text frames as before.
+
+Binary frame layout (little-endian), version 1:
+
+    header  magic "NE" | version u8 | flags u8
+            probability, db_level, avg_1min, avg_5min, lmax_5min, vibration_max, duration: f32 x 7
+            severity u8 (0 Green, 1 Yellow, 2 Red, 255 unknown)
+            vibration_peaks, lmax_count, lmax_exceed_5min: u16 x 3
+            signature_len u16 | signature_scale f32
+    strings event_id, house_id, timestamp, result, legal_review: each u16 byte length + UTF-8
+    signature  float16[signature_len]                      (flags & 1 == 0)
+               int8[signature_len], value = q * scale      (flags & 1 == 1)
+
+flags: 1 = int8 signature, 2 = mediation_sent, 4 = is_external, 8 = is_mock_data.
+
+A 300-point signature takes 600 bytes as float16 and 300 as int8, against roughly
+2.5-6 KB as JSON floats.
+"""
+import json
+import struct
+from typing import Optional, Union
+
+import numpy as np
+
+ENCODINGS = ("json", "f16", "int8")
+MAGIC = b"NE"
+VERSION = 1
+
+FLAG_INT8 = 1
+FLAG_MEDIATION = 2
+FLAG_EXTERNAL = 4
+FLAG_MOCK = 8
+
+_SEVERITIES = ("Green", "Yellow", "Red")
+_SEVERITY_CODES = {name: i for i, name in enumerate(_SEVERITIES)}
+_HEADER = struct.Struct("<2sBB7fB3HHf")
+_STRING_FIELDS = ("event_id", "house_id", "timestamp", "result", "legal_review")
+_U16_MAX = 0xFFFF
+
+def _u16(value) -> int:
+    return max(0, min(_U16_MAX, int(value or 0)))
+
+def _pack_str(value) -> bytes:
+    data = ("" if value is None else str(value)).encode("utf-8")[:_U16_MAX]
+    return struct.pack("<H", len(data)) + data
+
+def encode_event(event: dict, encoding: str = "f16") -> Optional[bytes]:
+    """
+    Encodes one analysis event as a binary frame.
+
+    Returns:
+        bytes: The frame, or None if `event` is not an analysis event (send it as JSON).
+    """
+    a = event.get("analysis")
+    if not isinstance(a, dict) or "event_id" not in event:
+        return None
+
+    signature = np.asarray(a.get("audio_signature") or [], dtype=np.float32)[:_U16_MAX]
+    flags = 0
+    scale = 1.0
+    if encoding == "int8":
+        flags |= FLAG_INT8
+        peak = float(np.abs(signature).max()) if signature.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        sig_bytes = np.clip(np.rint(signature / scale), -127, 127).astype(np.int8).tobytes()
+    else:
+        sig_bytes = signature.astype("<f2").tobytes()
+    if event.get("action", {}).get("mediation_sent"):
+        flags |= FLAG_MEDIATION
+    if a.get("is_external"):
+        flags |= FLAG_EXTERNAL
+    if event.get("is_mock_data"):
+        flags |= FLAG_MOCK
+
+    header = _HEADER.pack(
+        MAGIC, VERSION, flags,
+        float(a.get("probability") or 0.0), float(a.get("db_level") or 0.0),
+        float(a.get("avg_1min") or 0.0), float(a.get("avg_5min") or 0.0),
+        float(a.get("lmax_5min") or 0.0), float(a.get("vibration_max") or 0.0),
+        float(a.get("duration") or 0.0),
+        _SEVERITY_CODES.get(a.get("severity"), 255),
+        _u16(a.get("vibration_peaks")), _u16(event.get("lmax_count")), _u16(a.get("lmax_exceed_5min")),
+        signature.size, scale,
+    )
+    strings = b"".join(_pack_str(event.get(name) if name != "result" else a.get("result")) for name in _STRING_FIELDS)
+    return header + strings + sig_bytes
+
+def decode_event(frame: bytes) -> dict:
+    """
+    Inverse of encode_event (signature values come back as float32-rounded Python floats).
+    """
+    view = memoryview(frame)
+    (magic, version, flags, probability, db_level, avg_1min, avg_5min, lmax_5min, vibration_max, duration,
+     severity, vibration_peaks, lmax_count, lmax_exceed_5min, sig_len, scale) = _HEADER.unpack_from(view)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a v{VERSION} event frame")
+    offset = _HEADER.size
+    strings = {}
+    for name in _STRING_FIELDS:
+        (length,) = struct.unpack_from("<H", view, offset)
+        offset += 2
+        strings[name] = bytes(view[offset:offset + length]).decode("utf-8")
+        offset += length
+    if flags & FLAG_INT8:
+        signature = np.frombuffer(view, dtype=np.int8, count=sig_len, offset=offset).astype(np.float32) * scale
+    else:
+        signature = np.frombuffer(view, dtype="<f2", count=sig_len, offset=offset).astype(np.float32)
+
+    event = {
+        "event_id": strings["event_id"],
+        "house_id": strings["house_id"],
+        "timestamp": strings["timestamp"],
+        "analysis": {
+            "result": strings["result"],
+            "probability": probability,
+            "db_level": db_level,
+            "avg_1min": avg_1min,
+            "avg_5min": avg_5min,
+            "lmax_5min": lmax_5min,
+            "lmax_exceed_5min": lmax_exceed_5min,
+            "severity": _SEVERITIES[severity] if severity < len(_SEVERITIES) else None,
+            "is_external": bool(flags & FLAG_EXTERNAL),
+            "duration": duration,
+            "vibration_peaks": vibration_peaks,
+            "vibration_max": vibration_max,
+            "audio_signature": signature.tolist(),
+        },
+        "action": {"mediation_sent": bool(flags & FLAG_MEDIATION), "target": _SEVERITIES[severity] if severity < len(_SEVERITIES) else None},
+        "legal_review": strings["legal_review"],
+        "lmax_count": lmax_count,
+    }
+    if flags & FLAG_MOCK:
+        event["is_mock_data"] = True
+    return event
+
+def encode_message(message: dict, encoding: str) -> Union[str, bytes]:
+    """
+    Frame payload for one connection encoding: bytes for analysis events on binary
+    encodings, JSON text otherwise.
+    """
+    if encoding != "json":
+        frame = encode_event(message, encoding)
+        if frame is not None:
+            return frame
+    return json.dumps(message, ensure_ascii=False)
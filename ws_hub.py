@@ -0,0 +1,229 @@
+"""
+WebSocket broadcast hub for the live dashboard.
+
+broadcast() never waits on a client: each connection has its own bounded send
+queue, drained by its own sender task, so sends to different clients run
+concurrently and a slow or dead dashboard cannot delay the notification handler.
+A message is serialised once per broadcast, not once per client.
+
+When a client's queue is full the overflow policy decides what happens:
+- "drop_oldest": discard the oldest queued message and enqueue the new one
+- "drop_newest": discard the new message
+- "disconnect":  close the connection (code 1013, try again later)
+
+Clients receive every house's events unless they subscribe to specific houses,
+either with `?house_id=a,b` on connect or by sending
+{"action": "subscribe" | "unsubscribe" | "set", "house_ids": [...]}.
+
+Each connection also has a frame encoding (see ws_codec): "json" by default, or a
+binary encoding negotiated with `?encoding=` or {"action": "encoding", "encoding": ...}.
+A broadcast is encoded at most once per encoding in use and the same payload is
+queued for every subscriber of that encoding.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import time
+from typing import Dict, Iterable, Optional, Set
+
+from fastapi import WebSocket
+
+from ws_codec import ENCODINGS, encode_message
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "disconnect")
+
+class WebSocketClient:
+    """
+    One dashboard connection: its house filter, send queue, sender task and lag metrics.
+    """
+
+    def __init__(self, client_id: int, websocket: WebSocket, houses: Optional[Set[str]], queue_size: int,
+                 encoding: str = "json"):
+        self.client_id = client_id
+        self.websocket = websocket
+        self.houses = houses  # None = all houses
+        self.encoding = encoding
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.connected_at = time.time()
+        self.closed = False
+        self.sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+
+    def wants(self, house_id: Optional[str]) -> bool:
+        return self.houses is None or house_id is None or house_id in self.houses
+
+    def stats(self) -> dict:
+        oldest_age = 0.0
+        if not self.queue.empty():
+            oldest_age = time.monotonic() - self.queue._queue[0][0]
+        return {
+            "client_id": self.client_id,
+            "houses": sorted(self.houses) if self.houses is not None else None,
+            "encoding": self.encoding,
+            "queue_depth": self.queue.qsize(),
+            "sent": self.sent,
+            "bytes_sent": self.bytes_sent,
+            "dropped": self.dropped,
+            "last_lag_ms": round(self.last_lag * 1000, 2),
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "oldest_queued_ms": round(oldest_age * 1000, 2),
+            "connected_seconds": round(time.time() - self.connected_at, 1),
+        }
+
+class WebSocketHub:
+    """
+    Fan-out of dashboard messages to all connected clients with per-client bounded queues.
+    """
+
+    def __init__(self, queue_size: int = 256, overflow_policy: str = "drop_oldest", send_timeout: float = 5.0):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy} (expected one of {OVERFLOW_POLICIES})")
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.send_timeout = send_timeout
+        self._clients: Dict[int, WebSocketClient] = {}
+        self._ids = itertools.count(1)
+        self._stats = {"broadcasts": 0, "dropped": 0, "overflow_disconnects": 0, "send_failures": 0}
+
+    @property
+    def has_clients(self) -> bool:
+        return bool(self._clients)
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    @property
+    def queued_messages(self) -> int:
+        return sum(c.queue.qsize() for c in list(self._clients.values()))
+
+    def register(self, websocket: WebSocket, houses: Optional[Iterable[str]] = None,
+                 encoding: str = "json") -> WebSocketClient:
+        """
+        Adds an accepted connection and starts its sender task.
+
+        Raises:
+            ValueError: If `encoding` is not one of ws_codec.ENCODINGS.
+        """
+        if encoding not in ENCODINGS:
+            raise ValueError(f"Unknown encoding: {encoding} (expected one of {ENCODINGS})")
+        client = WebSocketClient(next(self._ids), websocket, set(houses) if houses else None, self.queue_size, encoding)
+        client.task = asyncio.create_task(self._sender(client))
+        self._clients[client.client_id] = client
+        return client
+
+    async def unregister(self, client: WebSocketClient):
+        client.closed = True
+        if self._clients.pop(client.client_id, None) is None:
+            return
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+            await asyncio.gather(client.task, return_exceptions=True)
+
+    def handle_control(self, client: WebSocketClient, text: str):
+        """
+        Applies a subscription message sent by the client. Unknown messages are ignored.
+        """
+        try:
+            msg = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if not isinstance(msg, dict) or "action" not in msg:
+            return
+        house_ids = {str(h) for h in msg.get("house_ids") or []}
+        action = msg["action"]
+        if action == "subscribe":
+            client.houses = (client.houses or set()) | house_ids
+        elif action == "unsubscribe" and client.houses is not None:
+            client.houses -= house_ids
+        elif action == "set":
+            client.houses = house_ids or None
+        elif action == "encoding" and msg.get("encoding") in ENCODINGS:
+            client.encoding = msg["encoding"]
+
+    def broadcast(self, message: dict, house_id: Optional[str] = None):
+        """
+        Queues `message` for every client subscribed to `house_id` (all clients if None).
+        Never blocks.
+        """
+        if not self._clients:
+            return
+        self._stats["broadcasts"] += 1
+        payloads = {}
+        now = time.monotonic()
+        for client in list(self._clients.values()):
+            if client.closed or not client.wants(house_id):
+                continue
+            payload = payloads.get(client.encoding)
+            if payload is None:
+                payload = payloads[client.encoding] = encode_message(message, client.encoding)
+            self._enqueue(client, (now, payload))
+
+    def _enqueue(self, client: WebSocketClient, item: tuple):
+        try:
+            client.queue.put_nowait(item)
+            return
+        except asyncio.QueueFull:
+            pass
+        if self.overflow_policy == "drop_oldest":
+            client.queue.get_nowait()
+            client.queue.put_nowait(item)
+            self._count_drop(client)
+        elif self.overflow_policy == "drop_newest":
+            self._count_drop(client)
+        else:
+            client.closed = True
+            self._stats["overflow_disconnects"] += 1
+            logger.warning(f"🔌 WebSocket client {client.client_id} fell {self.queue_size} messages behind; disconnecting")
+            asyncio.create_task(self._close(client, code=1013))
+
+    def _count_drop(self, client: WebSocketClient):
+        client.dropped += 1
+        self._stats["dropped"] += 1
+
+    async def _close(self, client: WebSocketClient, code: int = 1000):
+        await self.unregister(client)
+        try:
+            await client.websocket.close(code=code)
+        except Exception:
+            pass
+
+    async def _sender(self, client: WebSocketClient):
+        try:
+            while True:
+                enqueued_at, payload = await client.queue.get()
+                if isinstance(payload, bytes):
+                    await asyncio.wait_for(client.websocket.send_bytes(payload), timeout=self.send_timeout)
+                else:
+                    await asyncio.wait_for(client.websocket.send_text(payload), timeout=self.send_timeout)
+                client.sent += 1
+                client.bytes_sent += len(payload)
+                client.last_lag = time.monotonic() - enqueued_at
+                client.max_lag = max(client.max_lag, client.last_lag)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Dead socket or send timeout: drop the client without affecting anyone else
+            client.closed = True
+            self._stats["send_failures"] += 1
+            logger.info(f"WebSocket client {client.client_id} send failed ({type(e).__name__}); disconnecting")
+            asyncio.create_task(self._close(client, code=1011))
+
+    def stats(self) -> dict:
+        clients = [c.stats() for c in self._clients.values()]
+        return {
+            **self._stats,
+            "clients": len(clients),
+            "bytes_sent": sum(c["bytes_sent"] for c in clients),
+            "queue_size": self.queue_size,
+            "overflow_policy": self.overflow_policy,
+            "max_lag_ms": max((c["max_lag_ms"] for c in clients), default=0.0),
+            "connections": clients,
+        }